@@ -0,0 +1,136 @@
+import argparse
+import time
+from pathlib import Path
+
+from common.codecs import (
+    Codec,
+    GzipCodec,
+    ZstdCodec,
+    decompress,
+    train_dictionary,
+)
+from common.constants import BaseConstants, CompressionConstants
+
+
+def read_samples(raw_dir: Path, file_prefix: str) -> list[bytes]:
+    """Read the uncompressed raw pages to benchmark the codecs on.
+
+    :param raw_dir: Directory with the raw pages.
+    :param file_prefix: Prefix of the files to read.
+    :return: List of pages.
+    """
+    samples = [
+        decompress(filepath.read_bytes())
+        for filepath in sorted(raw_dir.iterdir())
+        if filepath.name.startswith(file_prefix)
+    ]
+
+    return samples
+
+
+def benchmark_codec(
+    codec: Codec, samples: list[bytes], dictionary_path: Path | None = None
+) -> dict:
+    """Measure the compression ratio and speed of a codec.
+
+    :param codec: Codec to benchmark.
+    :param samples: List of pages.
+    :param dictionary_path: Path to the zstd dictionary of the codec,
+        the configured one if not specified.
+    :return: Benchmark results.
+    """
+    raw_size = sum(len(sample) for sample in samples)
+
+    start = time.perf_counter()
+    compressed_samples = [codec.compress(sample) for sample in samples]
+    compress_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for compressed_sample in compressed_samples:
+        decompress(compressed_sample, dictionary_path=dictionary_path)
+    decompress_time = time.perf_counter() - start
+
+    compressed_size = sum(len(sample) for sample in compressed_samples)
+
+    results = {
+        "ratio": raw_size / compressed_size,
+        "compress_mb_s": raw_size / compress_time / 2**20,
+        "decompress_mb_s": raw_size / decompress_time / 2**20,
+    }
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the codecs of the raw pages."
+    )
+    parser.add_argument(
+        "--raw-dir", type=Path, default=BaseConstants.RAW_DATA_DIR
+    )
+    parser.add_argument("--file-prefix", default="book_details")
+    parser.add_argument(
+        "--train-dictionary",
+        action="store_true",
+        help="Train a candidate zstd dictionary on the pages and save it "
+        "to the dictionary path.",
+    )
+    parser.add_argument(
+        "--dictionary-path",
+        type=Path,
+        default=BaseConstants.DATA_DIR.joinpath("goodreads.candidate.zdict"),
+        help="Path to save the trained dictionary to, never the one the "
+        "raw pages are compressed with, which they need to be read.",
+    )
+    args = parser.parse_args()
+
+    if args.dictionary_path.resolve() == (
+        CompressionConstants.ZSTD_DICTIONARY_PATH.resolve()
+    ):
+        raise SystemExit(
+            "The dictionary path must not be the one of the raw pages"
+        )
+
+    samples = read_samples(raw_dir=args.raw_dir, file_prefix=args.file_prefix)
+
+    if not samples:
+        raise SystemExit(f"No '{args.file_prefix}' pages in '{args.raw_dir}'")
+
+    codecs = {f"gzip-{level}": GzipCodec(level=level) for level in (1, 6, 9)}
+    codecs |= {f"zstd-{level}": ZstdCodec(level=level) for level in (3, 9)}
+
+    if args.train_dictionary:
+        # Train on the first half of the pages and benchmark on the
+        # other half, so the ratio is not flattered by seen pages.
+        train_dictionary(
+            samples=samples[::2],
+            filepath=args.dictionary_path,
+            overwrite=True,
+        )
+        samples = samples[1::2]
+
+        codecs["zstd-3-dict"] = ZstdCodec(
+            level=3, dictionary_path=args.dictionary_path
+        )
+
+    print(
+        f"{'codec':<12}{'ratio':>8}"
+        f"{'compress MB/s':>16}{'decompress MB/s':>18}"
+    )
+
+    for name, codec in codecs.items():
+        results = benchmark_codec(
+            codec=codec,
+            samples=samples,
+            dictionary_path=args.dictionary_path,
+        )
+
+        print(
+            f"{name:<12}{results['ratio']:>8.2f}"
+            f"{results['compress_mb_s']:>16.1f}"
+            f"{results['decompress_mb_s']:>18.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import argparse
+import re
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from benchmarks.compression_benchmark import read_samples
+from common.constants import (
+    BaseConstants,
+    BookConstants,
+    PopularListConstants,
+)
+from parsers.base_parser import BaseParser
+from parsers.book_parser import BookParser
+from parsers.popular_list_parser import PopularListParser
+
+
+def parse_popular_lists_with_soup(html_data: bytes) -> list[dict]:
+    """Parse the popular lists from the BeautifulSoup tree of a page,
+    the way the parser did before the streaming extractor.
+
+    :param html_data: HTML data of the page.
+    :return: List of popular lists.
+    """
+    soup = BaseParser.get_soup(html_data=html_data)
+    popular_lists_data = []
+
+    for cell in soup.find_all(name="div", attrs={"class": "cell"}):
+        list_title_tag = cell.find(name="a", attrs={"class": "listTitle"})
+        list_full_details = cell.find(
+            name="div", attrs={"class": "listFullDetails"}
+        ).text.strip()
+        books, voters = list_full_details.split("—")
+
+        popular_lists_data.append(
+            {
+                "book_list": list_title_tag.text.strip(),
+                "book_list_url": (
+                    f"{BaseConstants.BASE_URL}{list_title_tag.get('href')}"
+                ),
+                "books": books,
+                "voters": voters,
+            }
+        )
+
+    return popular_lists_data
+
+
+def parse_books_with_soup(html_data: bytes) -> list[dict]:
+    """Parse the books from the BeautifulSoup tree of a page, the way
+    the parser did before the streaming extractor.
+
+    :param html_data: HTML data of the page.
+    :return: List of books.
+    """
+    soup = BaseParser.get_soup(html_data=html_data)
+    books_data = []
+
+    for tr_tag in soup.find_all(name="tr", attrs={"itemscope": ""}):
+        book_title_tag = tr_tag.find(name="a", attrs={"class": "bookTitle"})
+        author_name_tag = tr_tag.find(name="a", attrs={"class": "authorName"})
+        mini_rating = tr_tag.find(
+            name="span", attrs={"class": "minirating"}
+        ).text.strip()
+        avg_rating, ratings = mini_rating.split("—")
+
+        score_tag = tr_tag.find(name="a", string=re.compile(r"^score:"))
+        people_voted_tag = tr_tag.find(
+            name="a", string=re.compile(r"people voted$")
+        )
+
+        books_data.append(
+            {
+                "book_title": book_title_tag.text.strip(),
+                "book_url": (
+                    f"{BaseConstants.BASE_URL}{book_title_tag.get('href')}"
+                ),
+                "author_name": author_name_tag.text.strip(),
+                "avg_rating": avg_rating,
+                "ratings": ratings,
+                "score": score_tag.text.strip() if score_tag else None,
+                "people_voted": (
+                    people_voted_tag.text.strip() if people_voted_tag else None
+                ),
+            }
+        )
+
+    return books_data
+
+
+def benchmark_parse(
+    parse_func: Callable[[bytes], list[dict]], samples: list[bytes]
+) -> tuple[list[list[dict]], float]:
+    """Parse the pages and measure the speed.
+
+    :param parse_func: Function parsing the HTML data of a page.
+    :param samples: List of pages.
+    :return: Parsed rows of each page and the pages parsed per second.
+    """
+    start = time.perf_counter()
+    parsed_samples = [parse_func(sample) for sample in samples]
+    elapsed = time.perf_counter() - start
+
+    return parsed_samples, len(samples) / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the streaming extractor of the list pages "
+        "against the BeautifulSoup tree, checking that the rows match."
+    )
+    parser.add_argument(
+        "--raw-dir", type=Path, default=BaseConstants.RAW_DATA_DIR
+    )
+    args = parser.parse_args()
+
+    pages = {
+        PopularListConstants.FILE_PREFIX: (
+            parse_popular_lists_with_soup,
+            PopularListParser().parse_popular_lists,
+        ),
+        BookConstants.FILE_PREFIX: (
+            parse_books_with_soup,
+            BookParser().parse_books,
+        ),
+    }
+
+    print(
+        f"{'pages':<16}{'count':>8}{'soup p/s':>12}"
+        f"{'stream p/s':>12}{'speedup':>10}{'match':>8}"
+    )
+
+    for file_prefix, (soup_func, stream_func) in pages.items():
+        samples = read_samples(raw_dir=args.raw_dir, file_prefix=file_prefix)
+
+        if not samples:
+            continue
+
+        soup_rows, soup_speed = benchmark_parse(
+            parse_func=soup_func, samples=samples
+        )
+        stream_rows, stream_speed = benchmark_parse(
+            parse_func=stream_func, samples=samples
+        )
+
+        print(
+            f"{file_prefix:<16}{len(samples):>8}{soup_speed:>12.1f}"
+            f"{stream_speed:>12.1f}{stream_speed / soup_speed:>10.2f}"
+            f"{str(soup_rows == stream_rows):>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+from common.constants import BaseConstants
+
+# Code run in a fresh interpreter for each entry point: the pipeline
+# startup and the imports a spawned parse worker does.
+ENTRY_POINTS = {
+    "interpreter": "pass",
+    "main": "import main",
+    "parse_worker": "import parsers.book_details_parser",
+}
+
+
+def measure_startup(code: str, runs: int) -> float:
+    """Measure the time a fresh interpreter takes to run the code.
+
+    :param code: Code to run.
+    :param runs: Number of runs.
+    :return: Median time in milliseconds.
+    """
+    timings = []
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=BaseConstants.BASE_DIR,
+            check=True,
+        )
+        end = time.perf_counter()
+
+        timings.append((end - start) * 1000)
+
+    return statistics.median(timings)
+
+
+def get_slowest_imports(code: str, top: int) -> list[tuple[str, float]]:
+    """Get the slowest packages imported by the code, as reported by
+    '-X importtime'.
+
+    :param code: Code to run.
+    :param top: Number of packages to return.
+    :return: List of the package names and their cumulative import
+        times in milliseconds.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BaseConstants.BASE_DIR,
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+
+    imports: dict[str, float] = {}
+
+    for line in result.stderr.splitlines():
+        _, _, fields = line.partition("import time:")
+        _, cumulative, name = fields.split("|")
+        name = name.strip()
+
+        # Submodules are counted in the cumulative time of their
+        # top-level package.
+        if not cumulative.strip().isdigit() or "." in name:
+            continue
+
+        imports[name] = max(imports.get(name, 0), int(cumulative) / 1000)
+
+    slowest_imports = sorted(
+        imports.items(), key=lambda item: item[1], reverse=True
+    )
+
+    return slowest_imports[:top]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the startup of the pipeline and the parse "
+        "workers."
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=5,
+        help="Number of the slowest imports to show per entry point.",
+    )
+    args = parser.parse_args()
+
+    print(f"{'entry point':<40}{'startup ms':>12}")
+
+    for name, code in ENTRY_POINTS.items():
+        startup = measure_startup(code=code, runs=args.runs)
+        print(f"{name:<40}{startup:>12.1f}")
+
+        for module, cumulative in get_slowest_imports(code=code, top=args.top):
+            print(f"  {module:<38}{cumulative:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
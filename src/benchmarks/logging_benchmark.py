@@ -0,0 +1,84 @@
+import argparse
+import time
+from typing import TextIO
+
+import structlog
+
+from common.log_sink import configure_logging
+
+
+class SlowStream:
+    """Stream that blocks on every write, like a stdout whose reader
+    lags behind.
+    """
+
+    def __init__(self, stream: TextIO, write_delay: float) -> None:
+        self._stream = stream
+        self._write_delay = write_delay
+
+    def write(self, text: str) -> int:
+        time.sleep(self._write_delay)
+
+        return self._stream.write(text)
+
+    def flush(self) -> None:
+        self._stream.flush()
+
+
+def log_failures(failures: int) -> float:
+    """Log the failed requests of an outage the way the scrapers do.
+
+    :param failures: Number of the failed requests.
+    :return: Time spent by the caller in microseconds per event.
+    """
+    logger = structlog.get_logger(__name__)
+
+    start = time.perf_counter()
+
+    for i in range(failures):
+        logger.error(
+            "Failed to get data",
+            url=f"https://www.goodreads.com/book/show/{i}",
+            status_code=503,
+        )
+
+    end = time.perf_counter()
+
+    return (end - start) / failures * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the cost of logging the failed requests "
+        "for the caller, synchronously and through the log sink."
+    )
+    parser.add_argument("--failures", type=int, default=20000)
+    parser.add_argument(
+        "--write-delay",
+        type=float,
+        default=0.0001,
+        help="Time in seconds every write to the output blocks for.",
+    )
+    args = parser.parse_args()
+
+    with open("/dev/null", mode="w") as devnull:
+        stream = SlowStream(stream=devnull, write_delay=args.write_delay)
+
+        structlog.configure(
+            logger_factory=structlog.PrintLoggerFactory(file=stream),
+            cache_logger_on_first_use=False,
+        )
+        synchronous = log_failures(failures=args.failures)
+
+        structlog.reset_defaults()
+        sink = configure_logging(stream=stream)
+        sampled = log_failures(failures=args.failures)
+        sink.close()
+
+    print(f"{'logging':<20}{'us per event':>14}")
+    print(f"{'synchronous':<20}{synchronous:>14.2f}")
+    print(f"{'sampled, queued':<20}{sampled:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import argparse
+import random
+import time
+
+from common.dataset_lookup import DatasetLookup
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the indexed lookups of a processed dataset "
+        "against reading its whole partition, checking that the rows "
+        "match."
+    )
+    parser.add_argument("--dataset", default="books")
+    parser.add_argument("--date", default=None)
+    parser.add_argument("--keys", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    lookup = DatasetLookup(name=args.dataset, partition_date=args.date)
+    key_column = lookup.index.column
+
+    start = time.perf_counter()
+    df = lookup.dataset.read(
+        start_date=lookup.partition_date, end_date=lookup.partition_date
+    ).drop(columns="date")
+    full_read_ms = (time.perf_counter() - start) * 1000
+
+    all_keys = df[key_column].dropna().unique().tolist()
+    rng = random.Random(args.seed)
+
+    print(
+        f"{'keys':>6}{'full read ms':>14}{'cold ms':>10}"
+        f"{'warm ms':>10}{'row groups':>12}{'match':>8}"
+    )
+
+    for num_keys in args.keys:
+        keys = rng.sample(all_keys, min(num_keys, len(all_keys)))
+        lookup = DatasetLookup(
+            name=args.dataset, partition_date=lookup.partition_date
+        )
+        # The index is loaded once, outside the timings.
+        _ = lookup.index
+
+        start = time.perf_counter()
+        rows = lookup.lookup(keys=keys)
+        cold_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        lookup.lookup(keys=keys)
+        warm_ms = (time.perf_counter() - start) * 1000
+
+        expected_rows = df[df[key_column].isin(keys)]
+        is_match = sorted(rows[key_column]) == sorted(
+            expected_rows[key_column]
+        )
+
+        print(
+            f"{len(keys):>6}{full_read_ms:>14.1f}{cold_ms:>10.1f}"
+            f"{warm_ms:>10.2f}{lookup.misses:>12}{str(is_match):>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+import argparse
+import asyncio
+import time
+
+from scrapers.proxy_pool import Proxy, ProxyPool
+
+# Target of the requests: the stand-in proxies answer themselves, so
+# the host is never resolved.
+TARGET_URL = "http://benchmark.invalid/book/show/{}"
+RATE_LIMIT_TOLERANCE = 0.2
+
+
+class StandInProxy:
+    """Local HTTP proxy that answers every request itself after the
+    latency, and at most the rate limit per second, like an egress
+    endpoint the source throttles.
+    """
+
+    def __init__(
+        self,
+        latency: float,
+        rate_limit: float,
+        body: bytes = b"ok",
+        headers: bytes = b"",
+    ) -> None:
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.body = body
+        self.headers = headers
+        self.requests = 0
+        self.throttled = 0
+        self._last_request_at = 0.0
+        self._server: asyncio.Server | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.sockets[0].getsockname()[:2]
+
+        return f"http://{host}:{port}"
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(
+            self._handle, host="127.0.0.1", port=0
+        )
+
+    async def stop(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Answer the requests of a keep-alive connection.
+
+        :param reader: Stream of the connection to read from.
+        :param writer: Stream of the connection to write to.
+        :return: None.
+        """
+        while True:
+            try:
+                await reader.readuntil(b"\r\n\r\n")
+            except asyncio.IncompleteReadError:
+                break
+
+            now = time.monotonic()
+            # Allow some jitter of the arrival times, as the sources do.
+            is_throttled = (
+                now - self._last_request_at
+                < (1 - RATE_LIMIT_TOLERANCE) / self.rate_limit
+            )
+
+            self.requests += 1
+            self._last_request_at = now
+
+            await asyncio.sleep(delay=self.latency)
+
+            if is_throttled:
+                self.throttled += 1
+                writer.write(
+                    b"HTTP/1.1 429 Too Many Requests\r\n"
+                    b"Content-Length: 0\r\n\r\n"
+                )
+            else:
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\n"
+                    + self.headers
+                    + f"Content-Length: {len(self.body)}\r\n\r\n".encode()
+                    + self.body
+                )
+
+            await writer.drain()
+
+        writer.close()
+
+
+async def fetch(pool: ProxyPool, url: str) -> bool:
+    """Request the URL through the pool.
+
+    :param pool: Proxy pool.
+    :param url: URL to request.
+    :return: True if the request succeeded.
+    """
+    proxy = await pool.acquire()
+    start = time.perf_counter()
+    is_success = False
+
+    try:
+        response = await proxy.client.get(url=url)
+        is_success = response.is_success
+    finally:
+        await pool.release(
+            proxy=proxy,
+            success=is_success,
+            latency=time.perf_counter() - start,
+        )
+
+    return is_success
+
+
+async def benchmark_pool(
+    num_proxies: int,
+    requests: int,
+    latency: float,
+    rate_limit: float,
+    max_connections: int,
+) -> dict:
+    """Send the requests through a pool of stand-in proxies.
+
+    :param num_proxies: Number of the stand-in proxies.
+    :param requests: Number of requests to send.
+    :param latency: Latency of the stand-in proxies in seconds.
+    :param rate_limit: Requests per second each stand-in proxy allows.
+    :param max_connections: Maximum number of concurrent requests per
+        proxy.
+    :return: Throughput and the throttled requests.
+    """
+    stand_ins = [
+        StandInProxy(latency=latency, rate_limit=rate_limit)
+        for _ in range(num_proxies)
+    ]
+
+    for stand_in in stand_ins:
+        await stand_in.start()
+
+    pool = ProxyPool(
+        proxies=[
+            Proxy(url=stand_in.url, request_delay=1 / rate_limit)
+            for stand_in in stand_ins
+        ]
+    )
+
+    start = time.perf_counter()
+
+    async with pool.open(max_connections=max_connections):
+        results = await asyncio.gather(
+            *(
+                fetch(pool=pool, url=TARGET_URL.format(i))
+                for i in range(requests)
+            )
+        )
+
+    elapsed = time.perf_counter() - start
+
+    for stand_in in stand_ins:
+        await stand_in.stop()
+
+    result = {
+        "proxies": num_proxies,
+        "requests_per_second": requests / elapsed,
+        "succeeded": sum(results),
+        "throttled": sum(stand_in.throttled for stand_in in stand_ins),
+    }
+
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the throughput of the proxy pool against "
+        "local stand-in proxies."
+    )
+    parser.add_argument(
+        "--proxies",
+        type=int,
+        nargs="+",
+        default=[1, 2, 4, 8],
+        help="Numbers of the stand-in proxies to benchmark.",
+    )
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.05,
+        help="Latency of a stand-in proxy in seconds.",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=20.0,
+        help="Requests per second a stand-in proxy allows.",
+    )
+    parser.add_argument("--max-connections", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'proxies':<10}{'req/s':>10}{'succeeded':>12}{'throttled':>12}")
+
+    for num_proxies in args.proxies:
+        result = asyncio.run(
+            benchmark_pool(
+                num_proxies=num_proxies,
+                requests=args.requests,
+                latency=args.latency,
+                rate_limit=args.rate_limit,
+                max_connections=args.max_connections,
+            )
+        )
+        print(
+            f"{result['proxies']:<10}"
+            f"{result['requests_per_second']:>10.1f}"
+            f"{result['succeeded']:>12}"
+            f"{result['throttled']:>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
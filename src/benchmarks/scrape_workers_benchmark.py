@@ -0,0 +1,194 @@
+import argparse
+import asyncio
+import gzip
+import multiprocessing
+import tempfile
+import time
+from multiprocessing.connection import Connection
+from pathlib import Path
+
+from benchmarks.proxy_pool_benchmark import TARGET_URL, StandInProxy
+from common.constants import BaseConstants, ProxyConstants
+from scrapers.book_details_scraper import BookDetailsScraper
+
+# Row of a books list page, repeated to make up a page of a realistic
+# size.
+PAGE_ROW = (
+    b'<tr itemscope itemtype="http://schema.org/Book"><td>'
+    b'<a class="bookTitle" href="/book/show/1">Title</a>'
+    b'<a class="authorName" href="/author/show/1">Author</a>'
+    b'<span class="minirating">4.1 avg rating \xe2\x80\x94 1,234 ratings'
+    b"</span></td></tr>\n"
+)
+# Payload of a books details page, which its content hash is taken of.
+NEXT_DATA = (
+    b'<script id="__NEXT_DATA__" type="application/json">'
+    b'{"props":{"pageProps":{"apolloState":{}}}}</script>\n'
+)
+
+
+def serve_stand_in(
+    latency: float, rate_limit: float, page_size: int, conn: Connection
+) -> None:
+    """Run a stand-in source in its own process, so it does not compete
+    with the scrapers for their event loop, and report its counts once
+    told to stop.
+
+    :param latency: Latency of the source in seconds.
+    :param rate_limit: Requests per second the source allows.
+    :param page_size: Size of the page in bytes before the gzip
+        encoding.
+    :param conn: Connection to report the URL and the counts through.
+    :return: None.
+    """
+
+    async def serve() -> None:
+        page = NEXT_DATA + PAGE_ROW * (page_size // len(PAGE_ROW) + 1)
+        stand_in = StandInProxy(
+            latency=latency,
+            rate_limit=rate_limit,
+            body=gzip.compress(page),
+            headers=b"Content-Encoding: gzip\r\n",
+        )
+        await stand_in.start()
+
+        conn.send(stand_in.url)
+        await asyncio.to_thread(conn.recv)
+
+        await stand_in.stop()
+        conn.send((stand_in.requests, stand_in.throttled))
+
+    asyncio.run(serve())
+
+
+def benchmark_workers(
+    workers: int,
+    pages: int,
+    latency: float,
+    rate_limit: float,
+    page_size: int,
+    max_connections: int,
+) -> dict:
+    """Scrape the pages from a stand-in source with the scrape workers,
+    as books details pages, whose content hashes must not depend on the
+    number of the workers.
+
+    :param workers: Number of the scrape workers.
+    :param pages: Number of pages to scrape.
+    :param latency: Latency of the source in seconds.
+    :param rate_limit: Requests per second the source allows.
+    :param page_size: Size of a page in bytes.
+    :param max_connections: Maximum number of concurrent requests.
+    :return: Throughput, the throttled requests and the content
+        hashes of the pages.
+    """
+    conn, child_conn = multiprocessing.Pipe()
+    process = multiprocessing.Process(
+        target=serve_stand_in,
+        args=(latency, rate_limit, page_size, child_conn),
+    )
+    process.start()
+
+    ProxyConstants.PROXIES = [conn.recv()]
+    BaseConstants.SCRAPE_WORKERS = workers
+    BaseConstants.MAX_CONNECTIONS = max_connections
+    BaseConstants.REQUEST_DELAY = 1 / rate_limit
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        BaseConstants.RAW_DATA_DIR = Path(data_dir, "raw")
+        BaseConstants.STATE_DIR = Path(data_dir, "state")
+        urls = [TARGET_URL.format(i) for i in range(pages)]
+
+        start = time.perf_counter()
+        content_hashes = asyncio.run(
+            BookDetailsScraper().save_data(
+                urls=urls, batch=1, file_prefix="page"
+            )
+        )
+        elapsed = time.perf_counter() - start
+
+    conn.send(None)
+    requests, throttled = conn.recv()
+    process.join()
+
+    result = {
+        "workers": workers,
+        "pages_per_second": pages / elapsed,
+        "requests": requests,
+        "throttled": throttled,
+        "content_hashes": content_hashes,
+    }
+
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the throughput of the scrape workers "
+        "against a local stand-in source, checking that together they "
+        "keep to its rate limit and that the content hashes of the "
+        "pages are the ones of a single worker."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=[1, 2, 4],
+        help="Numbers of the scrape workers to benchmark.",
+    )
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.05,
+        help="Latency of the source in seconds.",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=1000.0,
+        help="Requests per second the source allows.",
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=256 * 1024,
+        help="Size of a page in bytes.",
+    )
+    parser.add_argument("--max-connections", type=int, default=100)
+    args = parser.parse_args()
+
+    print(
+        f"{'workers':<10}{'pages/s':>10}{'requests':>12}{'throttled':>12}"
+        f"{'hashes match':>14}"
+    )
+
+    expected_hashes = None
+
+    for workers in args.workers:
+        result = benchmark_workers(
+            workers=workers,
+            pages=args.pages,
+            latency=args.latency,
+            rate_limit=args.rate_limit,
+            page_size=args.page_size,
+            max_connections=args.max_connections,
+        )
+        # The hashes of the first run are the reference, so it should
+        # be run with a single worker.
+        if expected_hashes is None:
+            expected_hashes = result["content_hashes"]
+
+        is_match = result["content_hashes"] == expected_hashes
+
+        print(
+            f"{result['workers']:<10}"
+            f"{result['pages_per_second']:>10.1f}"
+            f"{result['requests']:>12}"
+            f"{result['throttled']:>12}"
+            f"{str(is_match):>14}"
+        )
+
+
+if __name__ == "__main__":
+    main()
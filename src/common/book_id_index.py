@@ -0,0 +1,197 @@
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from common.constants import BaseConstants, BookIdIndexConstants
+
+
+class BookIdIndex:
+    """Persistent set of Goodreads book IDs.
+
+    The IDs are stored in an open-addressing hash table of 'uint64'
+    slots that is memory-mapped from disk, so membership checks and
+    appends take constant time without loading the whole index into
+    memory. Zero marks an empty slot since book IDs start at one.
+    """
+
+    BOOK_ID_PATTERN = r"/book/show/(\d+)"
+    HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+    def __init__(self, filepath: Path | None = None) -> None:
+        if filepath is None:
+            filepath = BaseConstants.STATE_DIR.joinpath(
+                f"{BookIdIndexConstants.FILE_PREFIX}.npy"
+            )
+
+        self._filepath = filepath
+        self._table = self._open_table()
+        self._size = int(np.count_nonzero(self._table))
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _open_table(self) -> np.memmap:
+        """Open the hash table file, creating an empty one if needed.
+
+        :return: Memory-mapped hash table.
+        """
+        if self._filepath.exists():
+            return np.lib.format.open_memmap(self._filepath, mode="r+")
+
+        os.makedirs(self._filepath.parent, exist_ok=True)
+
+        table = self._create_table(
+            filepath=self._filepath,
+            capacity=BookIdIndexConstants.INITIAL_CAPACITY,
+        )
+
+        return table
+
+    @staticmethod
+    def _create_table(filepath: Path, capacity: int) -> np.memmap:
+        """Create an empty hash table file.
+
+        :param filepath: Path to the file.
+        :param capacity: Number of slots, must be a power of two.
+        :return: Memory-mapped hash table.
+        """
+        table = np.lib.format.open_memmap(
+            filepath, mode="w+", dtype=np.uint64, shape=(capacity,)
+        )
+
+        return table
+
+    @classmethod
+    def get_book_ids(cls, books_urls: pd.Series) -> np.ndarray:
+        """Get the Goodreads book IDs from the books URLs.
+
+        :param books_urls: Books URLs.
+        :return: Array of book IDs, zero if the URL has no ID.
+        """
+        book_ids = books_urls.str.extract(cls.BOOK_ID_PATTERN, expand=False)
+        book_ids = book_ids.fillna("0").astype(np.uint64).to_numpy()
+
+        return book_ids
+
+    def _hash(self, book_ids: np.ndarray, capacity: int) -> np.ndarray:
+        """Get the home slots of the book IDs.
+
+        :param book_ids: Array of book IDs.
+        :param capacity: Number of slots of the table.
+        :return: Array of slots.
+        """
+        shift = np.uint64(64 - (capacity.bit_length() - 1))
+        slots = (book_ids * self.HASH_MULTIPLIER) >> shift
+
+        return slots.astype(np.int64)
+
+    def _find_slots(
+        self, table: np.ndarray, book_ids: np.ndarray
+    ) -> np.ndarray:
+        """Find the slot holding each book ID, or the first empty slot
+        of its probe sequence if the ID is not in the table.
+
+        :param table: Hash table to probe.
+        :param book_ids: Array of book IDs.
+        :return: Array of slots.
+        """
+        mask = len(table) - 1
+        slots = self._hash(book_ids=book_ids, capacity=len(table))
+        found_slots = np.empty_like(slots)
+        pending = np.arange(len(book_ids))
+
+        while pending.size:
+            values = table[slots[pending]]
+            resolved = (values == book_ids[pending]) | (values == 0)
+
+            found_slots[pending[resolved]] = slots[pending[resolved]]
+
+            pending = pending[~resolved]
+            slots[pending] = (slots[pending] + 1) & mask
+
+        return found_slots
+
+    def _insert(self, table: np.ndarray, book_ids: np.ndarray) -> None:
+        """Insert book IDs that are not in the table yet.
+
+        :param table: Hash table to insert into.
+        :param book_ids: Array of unique book IDs.
+        :return: None.
+        """
+        pending = book_ids
+
+        while pending.size:
+            slots = self._find_slots(table=table, book_ids=pending)
+
+            # Several IDs may land on the same empty slot, only the
+            # first one takes it and the rest keep probing.
+            free_slots, first_idx = np.unique(slots, return_index=True)
+            table[free_slots] = pending[first_idx]
+
+            inserted = np.zeros(len(pending), dtype=bool)
+            inserted[first_idx] = True
+            pending = pending[~inserted]
+
+    def _grow(self, min_size: int) -> None:
+        """Rehash the table into a larger file to keep the load factor
+        below the limit.
+
+        :param min_size: Number of IDs the table needs to hold.
+        :return: None.
+        """
+        capacity = len(self._table)
+
+        while min_size > capacity * BookIdIndexConstants.MAX_LOAD_FACTOR:
+            capacity *= 2
+
+        tmp_filepath = self._filepath.with_suffix(".tmp.npy")
+        table = self._create_table(filepath=tmp_filepath, capacity=capacity)
+
+        self._insert(table=table, book_ids=self._table[self._table != 0])
+        table.flush()
+
+        del self._table
+        os.replace(tmp_filepath, self._filepath)
+
+        self._table = table
+
+    def contains(self, book_ids: np.ndarray) -> np.ndarray:
+        """Check which book IDs are in the index.
+
+        :param book_ids: Array of book IDs.
+        :return: Boolean array, True if the ID is in the index.
+        """
+        book_ids = np.asarray(book_ids, dtype=np.uint64)
+        slots = self._find_slots(table=self._table, book_ids=book_ids)
+
+        return (self._table[slots] == book_ids) & (book_ids != 0)
+
+    def add(self, book_ids: np.ndarray) -> None:
+        """Add book IDs to the index.
+
+        :param book_ids: Array of book IDs.
+        :return: None.
+        """
+        book_ids = np.unique(np.asarray(book_ids, dtype=np.uint64))
+        book_ids = book_ids[book_ids != 0]
+        book_ids = book_ids[~self.contains(book_ids=book_ids)]
+
+        if not book_ids.size:
+            return
+
+        min_size = self._size + len(book_ids)
+
+        if min_size > len(self._table) * BookIdIndexConstants.MAX_LOAD_FACTOR:
+            self._grow(min_size=min_size)
+
+        self._insert(table=self._table, book_ids=book_ids)
+        self._size = min_size
+
+    def save(self) -> None:
+        """Flush the index to disk.
+
+        :return: None.
+        """
+        self._table.flush()
@@ -0,0 +1,366 @@
+import json
+import os
+import shutil
+from datetime import date
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pandas.util import hash_pandas_object
+from structlog import get_logger
+
+from common.constants import (
+    BaseConstants,
+    ChangeCaptureConstants,
+    DatasetConstants,
+)
+
+
+class ChangeCapture:
+    """Daily deltas of a dataset: the rows inserted, updated and deleted
+    since the previous run, so downstream loads are proportional to the
+    change volume rather than the size of the dataset.
+
+    Each run keeps a snapshot of the dataset in the state directory,
+    holding only the key columns and a hash of the key and of the rows
+    of each key. The rows of the current run are compared with the
+    snapshot by joining on the key hash, without reading the previous
+    partition of the dataset. The deltas are written to
+    'delta/<dataset>/date=<date>/' along with a manifest.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        key_columns: list[str],
+        is_partial: bool = False,
+        state_dir: Path | None = None,
+        base_dir: Path | None = None,
+    ) -> None:
+        """Create the change capture of a dataset.
+
+        :param name: Name of the dataset.
+        :param key_columns: Columns identifying a row across runs.
+        :param is_partial: Whether a run holds only a part of the rows,
+            e.g. the books details re-scraped that day, so the missing
+            keys are kept rather than deleted.
+        :param state_dir: Directory of the snapshots, the state
+            directory if not specified.
+        :param base_dir: Directory of the deltas, the delta directory
+            if not specified.
+        """
+        self.name = name
+        self.key_columns = key_columns
+        self.is_partial = is_partial
+        self.path = (base_dir or BaseConstants.DELTA_DIR).joinpath(name)
+        self._state_dir = state_dir or BaseConstants.STATE_DIR
+        self._logger = get_logger(__name__)
+
+    @staticmethod
+    def get_snapshot_filenames(name: str) -> list[str]:
+        """Get the names of the snapshot files of a dataset: the latest
+        one and the one before it, which a rerun of the same date is
+        compared with.
+
+        :param name: Name of the dataset.
+        :return: List of filenames.
+        """
+        filenames = [
+            f"{ChangeCaptureConstants.FILE_PREFIX}_{name}{suffix}.parquet"
+            for suffix in ("", ".previous")
+        ]
+
+        return filenames
+
+    def get_partition_dir(self, partition_date: str | date) -> Path:
+        """Get a path to the directory of the deltas of a date.
+
+        :param partition_date: Date of the deltas.
+        :return: Path to the directory.
+        """
+        partition_dir = self.path.joinpath(f"date={partition_date}")
+
+        return partition_dir
+
+    @staticmethod
+    def _get_hashable(df: pd.DataFrame) -> pd.DataFrame:
+        """Replace the values pandas cannot hash, e.g. the lists of the
+        books details, with their JSON representation.
+
+        :param df: Dataframe to make hashable.
+        :return: Hashable dataframe.
+        """
+        unhashable_columns = [
+            column
+            for column in df.select_dtypes(include="object").columns
+            if df[column]
+            .map(lambda value: isinstance(value, list | dict))
+            .any()
+        ]
+
+        if not unhashable_columns:
+            return df
+
+        df = df.copy()
+
+        for column in unhashable_columns:
+            df[column] = df[column].map(
+                lambda value: (
+                    json.dumps(value, sort_keys=True, default=str)
+                    if isinstance(value, list | dict)
+                    else value
+                )
+            )
+
+        return df
+
+    def _get_hashes(self, df: pd.DataFrame) -> tuple[np.ndarray, pd.Series]:
+        """Hash the key of each row and the rows of each key. A key may
+        have several rows, e.g. a book in several lists, so the hashes
+        of its rows are summed and the key changes when any of them
+        does.
+
+        :param df: Dataframe to hash.
+        :return: Key hash of each row, and the hash of the rows of each
+            key indexed by the key hash.
+        """
+        key_hashes = hash_pandas_object(
+            df.reindex(columns=self.key_columns), index=False
+        ).to_numpy()
+        row_hashes = hash_pandas_object(
+            self._get_hashable(df=df), index=False
+        ).to_numpy()
+
+        # The sum of unsigned integers wraps around, which keeps it
+        # a hash of the rows regardless of their order.
+        key_row_hashes = (
+            pd.Series(row_hashes, index=key_hashes).groupby(level=0).sum()
+        )
+
+        return key_hashes, key_row_hashes
+
+    def _read_snapshot(
+        self, partition_date: str
+    ) -> tuple[pd.DataFrame | None, str | None]:
+        """Read the latest snapshot taken before the date.
+
+        :param partition_date: Date of the current run.
+        :return: Snapshot indexed by the key hash and its date, None if
+            there is none.
+        """
+        for filename in self.get_snapshot_filenames(name=self.name):
+            filepath = self._state_dir.joinpath(filename)
+
+            if not filepath.exists():
+                continue
+
+            table = pq.read_table(filepath)
+            snapshot_date = table.schema.metadata[b"date"].decode()
+
+            if snapshot_date < partition_date:
+                snapshot = table.to_pandas().set_index(
+                    ChangeCaptureConstants.KEY_HASH
+                )
+
+                return snapshot, snapshot_date
+
+        return None, None
+
+    def _write_snapshot(
+        self,
+        df: pd.DataFrame,
+        key_hashes: np.ndarray,
+        key_row_hashes: pd.Series,
+        previous_snapshot: pd.DataFrame | None,
+        partition_date: str,
+    ) -> None:
+        """Write the snapshot of the current run. The latest snapshot
+        of an earlier date is kept as the previous one.
+
+        :param df: Dataframe of the current run.
+        :param key_hashes: Key hash of each row.
+        :param key_row_hashes: Hash of the rows of each key indexed by
+            the key hash.
+        :param previous_snapshot: Snapshot the rows were compared with,
+            whose keys missing from a partial run are carried over.
+        :param partition_date: Date of the current run.
+        :return: None.
+        """
+        filepath, previous_filepath = (
+            self._state_dir.joinpath(filename)
+            for filename in self.get_snapshot_filenames(name=self.name)
+        )
+
+        snapshot = df.reindex(columns=self.key_columns)
+        snapshot[ChangeCaptureConstants.KEY_HASH] = key_hashes
+        snapshot = snapshot.drop_duplicates(
+            subset=ChangeCaptureConstants.KEY_HASH
+        )
+        snapshot[ChangeCaptureConstants.ROW_HASH] = key_row_hashes.loc[
+            snapshot[ChangeCaptureConstants.KEY_HASH]
+        ].to_numpy()
+
+        if self.is_partial and previous_snapshot is not None:
+            missing_keys = previous_snapshot.index.difference(
+                key_row_hashes.index
+            )
+            missing_snapshot = (
+                previous_snapshot.loc[missing_keys]
+                .rename_axis(ChangeCaptureConstants.KEY_HASH)
+                .reset_index()
+            )
+            snapshot = pd.concat(
+                [snapshot, missing_snapshot], ignore_index=True
+            )
+
+        table = pa.Table.from_pandas(df=snapshot, preserve_index=False)
+        table = table.replace_schema_metadata({"date": partition_date})
+
+        os.makedirs(self._state_dir, exist_ok=True)
+
+        tmp_filepath = filepath.with_name(f".{filepath.name}.tmp")
+        pq.write_table(table, tmp_filepath)
+
+        if filepath.exists():
+            snapshot_date = pq.read_schema(filepath).metadata[b"date"].decode()
+
+            if snapshot_date < partition_date:
+                os.replace(filepath, previous_filepath)
+
+        os.replace(tmp_filepath, filepath)
+
+    def capture(
+        self, df: pd.DataFrame, partition_date: str | date | None = None
+    ) -> dict[str, Any]:
+        """Write the deltas of the dataframe against the latest snapshot
+        taken before the date, and take the snapshot of the date.
+
+        The inserted and updated rows are written in full, the deleted
+        ones by their key columns. Without a snapshot, e.g. on the
+        first run, all rows are inserted. Nothing is deleted from
+        a partial dataset.
+
+        :param df: Dataframe of the current run.
+        :param partition_date: Date of the current run, the current date
+            if not specified.
+        :return: Manifest of the changes.
+        """
+        partition_date = str(partition_date or BaseConstants.CURRENT_DATE)
+
+        key_hashes, key_row_hashes = self._get_hashes(df=df)
+        snapshot, snapshot_date = self._read_snapshot(
+            partition_date=partition_date
+        )
+
+        if snapshot is None:
+            inserted_keys = key_row_hashes.index
+            updated_keys = key_row_hashes.index[:0]
+            deleted_rows = pd.DataFrame(columns=self.key_columns)
+        else:
+            previous_row_hashes = snapshot[ChangeCaptureConstants.ROW_HASH]
+            kept_keys = key_row_hashes.index.intersection(
+                previous_row_hashes.index
+            )
+
+            inserted_keys = key_row_hashes.index.difference(
+                previous_row_hashes.index
+            )
+            updated_keys = kept_keys[
+                key_row_hashes.loc[kept_keys].to_numpy()
+                != previous_row_hashes.loc[kept_keys].to_numpy()
+            ]
+            deleted_keys = previous_row_hashes.index.difference(
+                key_row_hashes.index
+            )
+            deleted_rows = snapshot.loc[
+                deleted_keys[:0] if self.is_partial else deleted_keys,
+                self.key_columns,
+            ]
+
+        changes = {
+            "insert": df[np.isin(key_hashes, inserted_keys)],
+            "update": df[np.isin(key_hashes, updated_keys)],
+            "delete": deleted_rows,
+        }
+
+        manifest = self._write_deltas(
+            changes=changes,
+            partition_date=partition_date,
+            previous_date=snapshot_date,
+            rows=len(df),
+        )
+
+        self._write_snapshot(
+            df=df,
+            key_hashes=key_hashes,
+            key_row_hashes=key_row_hashes,
+            previous_snapshot=snapshot,
+            partition_date=partition_date,
+        )
+
+        self._logger.info(
+            "Captured the changes",
+            dataset=self.name,
+            snapshot_date=snapshot_date,
+            **{
+                kind: change["rows"]
+                for kind, change in manifest["changes"].items()
+            },
+        )
+
+        return manifest
+
+    def _write_deltas(
+        self,
+        changes: dict[str, pd.DataFrame],
+        partition_date: str,
+        previous_date: str | None,
+        rows: int,
+    ) -> dict[str, Any]:
+        """Replace the deltas of the date with the changes, and write
+        the manifest describing them last.
+
+        :param changes: Rows of each kind of change.
+        :param partition_date: Date of the current run.
+        :param previous_date: Date of the snapshot the rows were
+            compared with, None if there was none.
+        :param rows: Number of rows of the current run.
+        :return: Manifest of the changes.
+        """
+        partition_dir = self.get_partition_dir(partition_date=partition_date)
+
+        shutil.rmtree(partition_dir, ignore_errors=True)
+        os.makedirs(partition_dir, exist_ok=True)
+
+        manifest = {
+            "dataset": self.name,
+            "date": partition_date,
+            "previous_date": previous_date,
+            "key_columns": self.key_columns,
+            "partial": self.is_partial,
+            "rows": rows,
+            "changes": {},
+        }
+
+        for kind, change_df in changes.items():
+            filename = f"{kind}.parquet"
+
+            pq.write_table(
+                pa.Table.from_pandas(df=change_df, preserve_index=False),
+                partition_dir.joinpath(filename),
+                compression=DatasetConstants.COMPRESSION,
+            )
+
+            manifest["changes"][kind] = {
+                "file": filename,
+                "rows": len(change_df),
+            }
+
+        partition_dir.joinpath(ChangeCaptureConstants.MANIFEST).write_text(
+            json.dumps(manifest, indent=2)
+        )
+
+        return manifest
@@ -0,0 +1,241 @@
+import gzip
+from abc import ABC, abstractmethod
+from collections.abc import Buffer
+from functools import cache
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from common.constants import CompressionConstants
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def _require_zstandard() -> None:
+    """Make sure the optional 'zstandard' dependency is installed.
+
+    :return: None.
+    """
+    if zstandard is None:
+        raise RuntimeError(
+            "The 'zstd' codec requires the 'zstandard' package, install "
+            "the project with the 'zstd' extra"
+        )
+
+
+def _load_dictionary(filepath: Path) -> "zstandard.ZstdCompressionDict | None":
+    """Load a trained zstd dictionary if it exists.
+
+    :param filepath: Path to the dictionary.
+    :return: Dictionary or None if there is no such file.
+    """
+    if not filepath.exists():
+        return None
+
+    dictionary = zstandard.ZstdCompressionDict(filepath.read_bytes())
+
+    return dictionary
+
+
+@cache
+def _get_zstd_decompressor(
+    dictionary_path: Path,
+) -> "zstandard.ZstdDecompressor":
+    """Get a zstd decompressor, reused across the files of a process.
+
+    :param dictionary_path: Path to the shared dictionary.
+    :return: Decompressor.
+    """
+    dictionary = _load_dictionary(filepath=dictionary_path)
+    decompressor = zstandard.ZstdDecompressor(dict_data=dictionary)
+
+    return decompressor
+
+
+@cache
+def _get_zstd_dictionary_id(dictionary_path: Path) -> int:
+    """Get the ID of a zstd dictionary, which the frames compressed
+    with it carry in their header.
+
+    :param dictionary_path: Path to the shared dictionary.
+    :return: ID of the dictionary, 0 if there is no such file.
+    """
+    dictionary = _load_dictionary(filepath=dictionary_path)
+
+    if dictionary is None:
+        return 0
+
+    return dictionary.dict_id()
+
+
+class Codec(ABC):
+    """Codec of the raw pages. A codec missing any of the abstract
+    members fails when it is created, not while the pages are saved.
+    """
+
+    @property
+    @abstractmethod
+    def name(self) -> str:
+        """Name of the codec, which it is configured by."""
+
+    @property
+    @abstractmethod
+    def extension(self) -> str:
+        """Extension of the files compressed with the codec."""
+
+    @abstractmethod
+    def compress(self, data: bytes) -> bytes:
+        """Compress the data.
+
+        :param data: Data to compress.
+        :return: Compressed data.
+        """
+
+
+class GzipCodec(Codec):
+    name = "gzip"
+    extension = "gz"
+
+    def __init__(self, level: int) -> None:
+        self._level = level
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress the data into a gzip member.
+
+        :param data: Data to compress.
+        :return: Compressed data.
+        """
+        compressed_data = gzip.compress(
+            data, compresslevel=self._level, mtime=0
+        )
+
+        return compressed_data
+
+
+class ZstdCodec(Codec):
+    name = "zstd"
+    extension = "zst"
+
+    def __init__(
+        self, level: int, dictionary_path: Path | None = None
+    ) -> None:
+        _require_zstandard()
+
+        dictionary = None
+
+        if dictionary_path is not None:
+            dictionary = _load_dictionary(filepath=dictionary_path)
+
+        self._compressor = zstandard.ZstdCompressor(
+            level=level, dict_data=dictionary, write_content_size=True
+        )
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress the data into a zstd frame.
+
+        :param data: Data to compress.
+        :return: Compressed data.
+        """
+        compressed_data = self._compressor.compress(data)
+
+        return compressed_data
+
+
+def get_codec(name: str | None = None, level: int | None = None) -> Codec:
+    """Get the codec to compress the raw pages with.
+
+    :param name: Name of the codec, 'gzip' or 'zstd', the configured
+        one if not specified.
+    :param level: Compression level, the configured one if not
+        specified.
+    :return: Codec.
+    """
+    if name is None:
+        name = CompressionConstants.CODEC
+
+    if level is None:
+        level = CompressionConstants.LEVEL
+
+    if name == GzipCodec.name:
+        return GzipCodec(level=level)
+
+    if name == ZstdCodec.name:
+        return ZstdCodec(
+            level=level,
+            dictionary_path=CompressionConstants.ZSTD_DICTIONARY_PATH,
+        )
+
+    raise ValueError(f"Unknown compression codec '{name}'")
+
+
+def decompress(data: Buffer, dictionary_path: Path | None = None) -> bytes:
+    """Decompress the data, detecting the codec by its magic number.
+    Data in neither format is returned as it is.
+
+    :param data: Data to decompress, any object supporting the buffer
+        protocol (e.g. a memory-mapped file) is read without a copy.
+    :param dictionary_path: Path to the zstd dictionary, the configured
+        one if not specified.
+    :return: Decompressed data.
+    """
+    magic = bytes(data[: len(ZSTD_MAGIC)])
+
+    if magic.startswith(GZIP_MAGIC):
+        return gzip.decompress(data)
+
+    if magic.startswith(ZSTD_MAGIC):
+        _require_zstandard()
+
+        if dictionary_path is None:
+            dictionary_path = CompressionConstants.ZSTD_DICTIONARY_PATH
+
+        frame_dictionary_id = zstandard.get_frame_parameters(data).dict_id
+        dictionary_id = _get_zstd_dictionary_id(
+            dictionary_path=dictionary_path
+        )
+
+        if frame_dictionary_id and frame_dictionary_id != dictionary_id:
+            raise ValueError(
+                f"The data was compressed with the zstd dictionary "
+                f"'{frame_dictionary_id}', but '{dictionary_path}' holds "
+                f"'{dictionary_id or 'none'}'"
+            )
+
+        decompressor = _get_zstd_decompressor(dictionary_path=dictionary_path)
+
+        return decompressor.decompress(data)
+
+    return bytes(data)
+
+
+def train_dictionary(
+    samples: list[bytes], filepath: Path, overwrite: bool = False
+) -> None:
+    """Train a shared zstd dictionary on sample pages and save it. The
+    pages compressed with a dictionary can only be decompressed with
+    it, so an existing dictionary is kept unless told otherwise.
+
+    :param samples: Uncompressed sample pages.
+    :param filepath: Path to save the dictionary to.
+    :param overwrite: Whether to replace an existing dictionary.
+    :return: None.
+    """
+    _require_zstandard()
+
+    if filepath.exists() and not overwrite:
+        raise FileExistsError(
+            f"There is a zstd dictionary at '{filepath}' already"
+        )
+
+    dictionary = zstandard.train_dictionary(
+        CompressionConstants.ZSTD_DICTIONARY_SIZE, samples
+    )
+
+    filepath.write_bytes(dictionary.as_bytes())
+
+    _get_zstd_decompressor.cache_clear()
+    _get_zstd_dictionary_id.cache_clear()
@@ -0,0 +1,301 @@
+import argparse
+import math
+import os
+import tomllib
+from datetime import date
+from pathlib import Path
+from typing import Any
+
+from common.constants import (
+    ArchiveConstants,
+    BaseConstants,
+    CompressionConstants,
+    ConfigConstants,
+    DatasetConstants,
+    DeadlineConstants,
+    FreshnessConstants,
+    PredicateConstants,
+    ProxyConstants,
+)
+
+# Settings that can be changed at runtime: the constants attribute
+# each one overrides, its type and its description.
+SETTINGS = {
+    "run_date": (
+        BaseConstants,
+        "CURRENT_DATE",
+        str,
+        "Date of the run as YYYY-MM-DD, which names the raw data "
+        "directory, the partitions and the archive, today if not set.",
+    ),
+    "archive_mode": (
+        ArchiveConstants,
+        "MODE",
+        str,
+        "Record the responses to the archive of the run date with "
+        "'record', or serve them from it without any network with "
+        "'replay'.",
+    ),
+    "max_connections": (
+        BaseConstants,
+        "MAX_CONNECTIONS",
+        int,
+        "Maximum number of concurrent HTTP connections per proxy.",
+    ),
+    "max_keepalive_connections": (
+        BaseConstants,
+        "MAX_KEEPALIVE_CONNECTIONS",
+        int,
+        "Maximum number of idle HTTP connections to keep alive.",
+    ),
+    "request_delay": (
+        BaseConstants,
+        "REQUEST_DELAY",
+        float,
+        "Delay in seconds between starting two requests through the "
+        "same proxy.",
+    ),
+    "pages": (
+        BaseConstants,
+        "PAGES",
+        int,
+        "Maximum number of pages per paginated source.",
+    ),
+    "batch_size": (
+        BaseConstants,
+        "BATCH_SIZE",
+        int,
+        "Number of URLs scraped per batch.",
+    ),
+    "max_workers": (
+        BaseConstants,
+        "MAX_WORKERS",
+        int,
+        "Number of parse and upload workers.",
+    ),
+    "scrape_workers": (
+        BaseConstants,
+        "SCRAPE_WORKERS",
+        int,
+        "Number of processes the requests are spread over, each with "
+        "its own event loop, under the same rate limits.",
+    ),
+    "auto_tune": (
+        BaseConstants,
+        "AUTO_TUNE",
+        bool,
+        "Size the workers from the CPU quota and tune the number of "
+        "HTTP connections while scraping.",
+    ),
+    "time_budget": (
+        DeadlineConstants,
+        "TIME_BUDGET",
+        float,
+        "Time budget of the run in seconds: the scraping stops early "
+        "to leave time for parsing and uploading what was scraped.",
+    ),
+    "daily_budget": (
+        FreshnessConstants,
+        "DAILY_BUDGET",
+        int,
+        "Maximum number of books details pages scraped per run.",
+    ),
+    "excluded_genre_prefixes": (
+        PredicateConstants,
+        "EXCLUDED_GENRE_PREFIXES",
+        list,
+        "Genre prefixes of the books whose details pages are skipped, "
+        "comma-separated in the environment.",
+    ),
+    "language": (
+        PredicateConstants,
+        "LANGUAGE",
+        str,
+        "Language of the books whose details pages are kept, e.g. 'English'.",
+    ),
+    "min_ratings": (
+        PredicateConstants,
+        "MIN_RATINGS",
+        int,
+        "Minimum number of ratings of the books whose details pages are kept.",
+    ),
+    "proxies": (
+        ProxyConstants,
+        "PROXIES",
+        list,
+        "Egress proxy URLs, comma-separated in the environment. The "
+        "config file may give each one its own 'max_connections' and "
+        "'request_delay'.",
+    ),
+    "compression_codec": (
+        CompressionConstants,
+        "CODEC",
+        str,
+        "Codec of the raw pages, 'gzip' or 'zstd'.",
+    ),
+    "compression_level": (
+        CompressionConstants,
+        "LEVEL",
+        int,
+        "Compression level of the raw pages.",
+    ),
+    "stream_books_details": (
+        DatasetConstants,
+        "STREAM_BOOKS_DETAILS",
+        bool,
+        "Stream the parsed books details straight to S3 instead of "
+        "writing them to the local disk.",
+    ),
+    "s3_endpoint_url": (
+        BaseConstants,
+        "S3_ENDPOINT_URL",
+        str,
+        "Endpoint URL of S3, e.g. of a local S3 stand-in.",
+    ),
+}
+
+
+def _parse_bool(value: str | bool) -> bool:
+    """Parse a boolean setting given as a string.
+
+    :param value: Value to parse.
+    :return: Parsed value.
+    """
+    if isinstance(value, bool):
+        return value
+
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _cast(name: str, value: Any) -> Any:
+    """Cast a setting value to its type.
+
+    :param name: Name of the setting.
+    :param value: Value to cast.
+    :return: Cast value.
+    """
+    _, _, setting_type, _ = SETTINGS[name]
+
+    if setting_type is bool:
+        return _parse_bool(value=value)
+
+    if setting_type is list and isinstance(value, str):
+        return [item.strip() for item in value.split(",") if item.strip()]
+
+    return setting_type(value)
+
+
+def add_config_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the command line flags of the settings to a parser.
+
+    :param parser: Parser to add the flags to.
+    :return: None.
+    """
+    parser.add_argument(
+        "--config",
+        type=Path,
+        default=os.environ.get(ConfigConstants.FILE_ENV),
+        help="Path to a TOML file with the settings.",
+    )
+
+    for name, (_, _, setting_type, description) in SETTINGS.items():
+        flag = f"--{name.replace('_', '-')}"
+
+        if setting_type is bool:
+            parser.add_argument(
+                flag, action=argparse.BooleanOptionalAction, help=description
+            )
+        elif setting_type is list:
+            parser.add_argument(flag, nargs="+", help=description)
+        else:
+            parser.add_argument(flag, type=setting_type, help=description)
+
+
+def load_config(args: argparse.Namespace) -> dict[str, Any]:
+    """Resolve the settings from the defaults, the config file, the
+    environment variables and the command line flags, in the order
+    of increasing precedence.
+
+    :param args: Parsed command line flags.
+    :return: Resolved settings.
+    """
+    config = {
+        name: getattr(constants, attr)
+        for name, (constants, attr, _, _) in SETTINGS.items()
+    }
+
+    if args.config is not None:
+        with open(args.config, mode="rb") as f:
+            file_config = tomllib.load(f)
+
+        config |= {
+            name: _cast(name=name, value=value)
+            for name, value in file_config.items()
+            if name in SETTINGS
+        }
+
+    for name in SETTINGS:
+        env_name = f"{ConfigConstants.ENV_PREFIX}{name.upper()}"
+        env_value = os.environ.get(env_name)
+
+        if env_value is not None:
+            config[name] = _cast(name=name, value=env_value)
+
+        arg_value = getattr(args, name, None)
+
+        if arg_value is not None:
+            config[name] = arg_value
+
+    return config
+
+
+def get_cpu_count() -> int:
+    """Get the number of CPUs available to the container, taking the
+    cgroup CPU quota into account.
+
+    :return: Number of CPUs.
+    """
+    cpu_count = os.process_cpu_count() or 1
+    cpu_max = Path("/sys/fs/cgroup/cpu.max")
+
+    if cpu_max.exists():
+        quota, period = cpu_max.read_text().split()
+
+        if quota != "max":
+            cpu_count = min(cpu_count, math.ceil(int(quota) / int(period)))
+
+    return max(cpu_count, 1)
+
+
+def apply_config(config: dict[str, Any]) -> dict[str, Any]:
+    """Apply the settings to the constants used across the project.
+
+    :param config: Resolved settings.
+    :return: Applied settings.
+    """
+    if config["auto_tune"]:
+        config["max_workers"] = get_cpu_count()
+
+    if config["archive_mode"] not in (
+        None,
+        ArchiveConstants.RECORD,
+        ArchiveConstants.REPLAY,
+    ):
+        raise ValueError(f"Unknown archive mode '{config['archive_mode']}'")
+
+    config["run_date"] = date.fromisoformat(config["run_date"]).isoformat()
+
+    for name, value in config.items():
+        constants, attr, _, _ = SETTINGS[name]
+
+        setattr(constants, attr, value)
+
+    # The directories of the run date are derived from it.
+    BaseConstants.RAW_DATA_DIR = BaseConstants.DATA_DIR.joinpath(
+        "raw", BaseConstants.CURRENT_DATE
+    )
+    BaseConstants.PROCESSED_DATA_DIR = BaseConstants.DATASET_DIR.joinpath(
+        BaseConstants.CURRENT_DATE
+    )
+
+    return config
@@ -8,13 +8,20 @@ class BaseConstants:
     DATA_DIR = BASE_DIR.joinpath("data")
     CURRENT_DATE = datetime.now(tz=timezone.utc).strftime(format="%Y-%m-%d")
     RAW_DATA_DIR = DATA_DIR.joinpath("raw", CURRENT_DATE)
-    PROCESSED_DATA_DIR = DATA_DIR.joinpath("processed", CURRENT_DATE)
+    DATASET_DIR = DATA_DIR.joinpath("processed")
+    DELTA_DIR = DATA_DIR.joinpath("delta")
+    PROCESSED_DATA_DIR = DATASET_DIR.joinpath(CURRENT_DATE)
+    STATE_DIR = DATA_DIR.joinpath("state")
     MAX_CONNECTIONS = 10
     MAX_KEEPALIVE_CONNECTIONS = 10
+    REQUEST_DELAY = 0.1
     PAGES = 100
     BATCH_SIZE = 1000
     MAX_WORKERS = 10
+    SCRAPE_WORKERS = 1
+    AUTO_TUNE = False
     S3_BUCKET = "book-scraping-data"
+    S3_ENDPOINT_URL: str | None = None
     HEADERS = [
         {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -70,11 +77,186 @@ class BaseConstants:
 class PopularListConstants:
     FILE_PREFIX = "popular_lists"
     PATH_PARAMETER = f"list/{FILE_PREFIX}"
+    ROW_MARKER = b'class="cell"'
+    KEY_COLUMNS = ["book_list_url"]
+    NUMERIC_COLUMNS = {"books": "Int64", "voters": "Int64"}
 
 
 class BookConstants:
     FILE_PREFIX = "books"
+    ROW_MARKER = b"schema.org/Book"
+    KEY_COLUMNS = ["book_url"]
+    NUMERIC_COLUMNS = {
+        "avg_rating": "Float64",
+        "ratings": "Int64",
+        "score": "Int64",
+        "people_voted": "Int64",
+    }
 
 
 class BookDetailsConstants:
     FILE_PREFIX = "book_details"
+    # Tables the books details are split into, with the columns that
+    # identify a row. Entities are keyed by their Apollo keys.
+    TABLES = {
+        "books": ["id"],
+        "works": ["id"],
+        "contributors": ["id"],
+        "series": ["id"],
+        "users": ["id"],
+        "reviews": ["id"],
+        "book_contributors": ["book_id", "contributor_id", "role"],
+        "book_series": ["book_id", "series_id"],
+        "book_genres": ["book_id", "genre_name"],
+        "social_signals": ["book_id", "name"],
+    }
+
+
+class PredicateConstants:
+    # Books details pages are skipped when a book has a genre starting
+    # with one of the prefixes, is in another language or has fewer
+    # ratings. The language filter is off if None, the ratings one if 0.
+    EXCLUDED_GENRE_PREFIXES = ["rus"]
+    LANGUAGE: str | None = None
+    MIN_RATINGS = 0
+    # Key of the parse result of a skipped page, naming the predicate
+    # that rejected it.
+    REJECTED_BY = "rejected_by"
+
+
+class FreshnessConstants:
+    FILE_PREFIX = "book_freshness"
+    INITIAL_INTERVAL_DAYS = 2
+    MIN_INTERVAL_DAYS = 1
+    MAX_INTERVAL_DAYS = 32
+    DAILY_BUDGET = 25000
+
+
+class BookIdIndexConstants:
+    FILE_PREFIX = "book_ids"
+    INITIAL_CAPACITY = 2**20
+    MAX_LOAD_FACTOR = 0.5
+
+
+class ChangeCaptureConstants:
+    FILE_PREFIX = "change_capture"
+    KEY_HASH = "_key_hash"
+    ROW_HASH = "_row_hash"
+    MANIFEST = "manifest.json"
+
+
+class ArchiveConstants:
+    FILE_PREFIX = "http_archive"
+    DIR = BaseConstants.DATA_DIR.joinpath("archive")
+    RECORD = "record"
+    REPLAY = "replay"
+    # Whether the responses are recorded to or replayed from the
+    # archive of the run date, neither if None.
+    MODE: str | None = None
+
+
+class ParseCacheConstants:
+    FILE_PREFIX = "parse_cache"
+    MAX_AGE_DAYS = 30
+    MAX_SIZE = 512 * 1024 * 1024
+
+
+class LogConstants:
+    LEVEL = "info"
+    QUEUE_SIZE = 10000
+    WRITE_BATCH_SIZE = 1000
+    CLOSE_TIMEOUT = 5.0
+    # Warnings and errors with the same message are kept at most this
+    # many times per window in seconds.
+    SAMPLED_LEVELS = {"warning", "error", "critical", "exception"}
+    SAMPLE_MAX_EVENTS = 10
+    SAMPLE_WINDOW = 60.0
+
+
+class ConfigConstants:
+    ENV_PREFIX = "BOOK_SCRAPING_"
+    FILE_ENV = f"{ENV_PREFIX}CONFIG"
+    RUN_SUMMARY_FILE_PREFIX = "run_summary"
+    MIN_CONNECTIONS = 1
+    MAX_CONNECTIONS = 200
+    MIN_THROUGHPUT_GAIN = 0.05
+    ERROR_RATE_TOLERANCE = 0.02
+
+
+class CompressionConstants:
+    CODEC = "gzip"
+    LEVEL = 6
+    ZSTD_DICTIONARY_PATH = BaseConstants.STATE_DIR.joinpath("goodreads.zdict")
+    ZSTD_DICTIONARY_SIZE = 112640
+
+
+class DeadlineConstants:
+    # Time budget of the run in seconds, unlimited if None.
+    TIME_BUDGET: float | None = None
+    # Share of the budget kept for the parse and upload stages.
+    RESERVE = 0.2
+    # Relative time of the scrape stages, in the order they run.
+    STAGE_WEIGHTS = {
+        PopularListConstants.FILE_PREFIX: 1,
+        BookConstants.FILE_PREFIX: 3,
+        BookDetailsConstants.FILE_PREFIX: 6,
+    }
+
+
+class PipelineConstants:
+    FINGERPRINTS_FILE_PREFIX = "stage_fingerprints"
+
+
+class DatasetConstants:
+    FILE_PREFIX = "part"
+    COMPRESSION = "gzip"
+    MAX_ROWS_PER_FILE = 1_000_000
+    ROW_GROUP_SIZE = 100_000
+    TARGET_FILE_SIZE = 128 * 1024 * 1024
+    SMALL_FILE_RATIO = 0.5
+    STREAM_BOOKS_DETAILS = False
+    # S3 requires all parts of a multipart upload but the last one to
+    # be at least 5 MiB.
+    S3_PART_SIZE = 8 * 1024 * 1024
+
+
+class IndexConstants:
+    # Sidecar index of a date partition, which the dataset reads skip
+    # like the other files starting with an underscore.
+    FILENAME = "_index.parquet"
+    KEY_HASH = "_key_hash"
+    FILE = "_file"
+    ROW_GROUP = "_row_group"
+    ROW = "_row"
+    KEY_POSITION = "_key_position"
+    # Rows per row group of an indexed partition, fewer than in the
+    # other ones, as a lookup decodes whole row groups.
+    ROW_GROUP_SIZE = 10_000
+    # Number of the decoded row groups a lookup keeps in memory.
+    CACHE_SIZE = 64
+
+
+class RetryConstants:
+    ROUNDS = 3
+    INITIAL_WAIT = 5
+    MAX_WAIT = 60
+    JITTER = 5
+    RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class CircuitBreakerConstants:
+    WINDOW = 50
+    MIN_REQUESTS = 20
+    ERROR_RATE_THRESHOLD = 0.5
+    COOLDOWN = 30.0
+    MAX_COOLDOWN = 300.0
+    PROBE_INTERVAL = 0.5
+
+
+class ProxyConstants:
+    # Proxy URLs, or tables with the 'url' and optionally their own
+    # 'max_connections' and 'request_delay', e.g. in the config file.
+    PROXIES: list[str | dict] = []
+    INITIAL_LATENCY = 1.0
+    ERROR_PENALTY = 10.0
+    SMOOTHING = 0.2
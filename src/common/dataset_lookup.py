@@ -0,0 +1,214 @@
+from collections import OrderedDict
+from collections.abc import Iterable
+from datetime import date
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from structlog import get_logger
+
+from common.constants import IndexConstants
+from common.parquet_dataset import ParquetDataset
+from common.partition_index import PartitionIndex
+
+
+class DatasetLookup:
+    """Point lookups of the rows of a date partition by their key,
+    e.g. a few books by their URLs, without loading the partition.
+
+    The index of the partition tells which row groups hold the keys,
+    only those are read, and the decoded row groups are kept in a cache
+    of the least recently used ones, so the lookups of the keys close
+    to each other or looked up again are served from memory. A
+    partition written without an index is indexed on the first lookup
+    by reading its key column.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        key_column: str | None = None,
+        partition_date: str | date | None = None,
+        base_dir: Path | None = None,
+        cache_size: int = IndexConstants.CACHE_SIZE,
+    ) -> None:
+        """Open the lookups of a dataset partition.
+
+        :param name: Name of the dataset.
+        :param key_column: Column to look the rows up by, the one the
+            partition is indexed by if not specified.
+        :param partition_date: Date of the partition, the latest one if
+            not specified.
+        :param base_dir: Directory of the datasets, the processed data
+            directory if not specified.
+        :param cache_size: Number of the decoded row groups to keep.
+        """
+        self.dataset = ParquetDataset(name=name, base_dir=base_dir)
+
+        if partition_date is None:
+            partition_dates = self.dataset.get_partition_dates()
+
+            if not partition_dates:
+                raise FileNotFoundError(
+                    f"Dataset '{name}' has no partitions at "
+                    f"'{self.dataset.path}'"
+                )
+
+            partition_date = partition_dates[-1]
+
+        self.partition_date = str(partition_date)
+        self.partition_dir = self.dataset.get_partition_dir(
+            partition_date=self.partition_date
+        )
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._key_column = key_column
+        self._index: PartitionIndex | None = None
+        self._files: dict[str, pq.ParquetFile] = {}
+        self._cache: OrderedDict[tuple, pa.Table] = OrderedDict()
+        self._logger = get_logger(__name__)
+
+    @property
+    def index(self) -> PartitionIndex:
+        """Index of the partition, read or built on the first use.
+
+        :return: Index.
+        """
+        if self._index is not None:
+            return self._index
+
+        index = PartitionIndex.read(partition_dir=self.partition_dir)
+
+        if index is None or (
+            self._key_column is not None and index.column != self._key_column
+        ):
+            if self._key_column is None:
+                raise ValueError(
+                    f"Partition '{self.partition_dir}' has no index, "
+                    f"a key column is needed to build one"
+                )
+
+            index = PartitionIndex.from_files(
+                column=self._key_column,
+                filepaths=self.dataset.get_filepaths(
+                    partition_date=self.partition_date
+                ),
+            )
+
+            self._logger.info(
+                "Indexed the rows of the partition",
+                dataset=self.dataset.name,
+                rows=len(index),
+                column=index.column,
+            )
+
+        self._index = index
+
+        return self._index
+
+    def _read_row_group(
+        self, filename: str, row_group: int, columns: tuple[str, ...] | None
+    ) -> pa.Table:
+        """Read a row group of a file, from the cache if it has been
+        read before.
+
+        :param filename: Name of the file of the partition.
+        :param row_group: Row group within the file.
+        :param columns: Columns to read, all columns if None.
+        :return: Table of the row group.
+        """
+        cache_key = (filename, row_group, columns)
+
+        if cache_key in self._cache:
+            self.hits += 1
+            self._cache.move_to_end(cache_key)
+
+            return self._cache[cache_key]
+
+        self.misses += 1
+
+        if filename not in self._files:
+            self._files[filename] = pq.ParquetFile(
+                self.partition_dir.joinpath(filename)
+            )
+
+        table = self._files[filename].read_row_group(
+            row_group, columns=list(columns) if columns else None
+        )
+
+        self._cache[cache_key] = table
+
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+        return table
+
+    def lookup(
+        self, keys: Iterable, columns: list[str] | None = None
+    ) -> pd.DataFrame:
+        """Get the rows of the keys, reading only the row groups that
+        hold them.
+
+        :param keys: Keys to look up.
+        :param columns: Columns to get, all columns if not specified.
+        :return: Rows of the keys in the order of the keys, several
+            rows for a key if it has several and none if it is missing.
+        """
+        keys = list(keys)
+        index = self.index
+        read_columns = None
+
+        if columns is not None:
+            read_columns = tuple(dict.fromkeys([*columns, index.column]))
+
+        tables = []
+        key_positions = []
+
+        for (filename, row_group), (rows, positions) in index.find(
+            keys=keys
+        ).items():
+            table = self._read_row_group(
+                filename=filename, row_group=row_group, columns=read_columns
+            )
+
+            tables.append(table.take(rows))
+            key_positions.append(positions)
+
+        if not tables:
+            return pd.DataFrame(columns=columns)
+
+        table = pa.concat_tables(tables, promote_options="default")
+        key_positions = np.concatenate(key_positions)
+
+        # Keys sharing a hash find each other's rows, which are dropped.
+        is_match = (
+            index.get_key_strings(keys=table.column(index.column).to_pylist())
+            == index.get_key_strings(keys=keys)[key_positions]
+        )
+        order = np.argsort(key_positions[is_match], kind="stable")
+        table = table.filter(is_match).take(order)
+
+        if columns is not None:
+            table = table.select(columns)
+
+        return table.to_pandas()
+
+    def get(
+        self, key: Any, columns: list[str] | None = None
+    ) -> dict[str, Any] | None:
+        """Get the first row of a key.
+
+        :param key: Key to look up.
+        :param columns: Columns to get, all columns if not specified.
+        :return: Row, None if the key is missing.
+        """
+        df = self.lookup(keys=[key], columns=columns)
+
+        if df.empty:
+            return None
+
+        return df.iloc[0].to_dict()
@@ -0,0 +1,135 @@
+import threading
+import time
+
+from structlog import get_logger
+
+from common.constants import DeadlineConstants
+from common.run_summary import run_summary
+
+
+class Deadline:
+    """Time budget of the run, so that a run ends before the next one
+    is triggered and its data is still usable.
+
+    Only the scrape stages stop early: each one gets a share of the
+    time left by its weight, after a reserve for the parse and upload
+    stages, which then handle whatever was scraped. The pages left
+    unscraped are reported in the run summary.
+    """
+
+    def __init__(self) -> None:
+        self._budget: float | None = None
+        self._started_at = time.monotonic()
+        self._end_at: float | None = None
+        self._stages: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._logger = get_logger(__name__)
+
+    def start(self, budget: float | None) -> None:
+        """Start the budget of the run.
+
+        :param budget: Time budget in seconds, unlimited if None.
+        :return: None.
+        """
+        self._budget = budget
+        self._started_at = time.monotonic()
+        self._end_at = None if budget is None else self._started_at + budget
+
+    def begin_stage(self, file_prefix: str) -> float | None:
+        """Give a scrape stage its share of the time left. The stages
+        that run later keep theirs, the earlier ones are done or were
+        skipped.
+
+        :param file_prefix: Prefix of the files the stage scrapes.
+        :return: Monotonic time the stage must stop starting requests
+            at, None if the budget is unlimited.
+        """
+        if self._end_at is None:
+            return None
+
+        weights = DeadlineConstants.STAGE_WEIGHTS
+        prefixes = list(weights)
+        later_weights = sum(
+            weights[prefix]
+            for prefix in prefixes[prefixes.index(file_prefix) :]
+        )
+
+        now = time.monotonic()
+        time_left = (
+            self._end_at - DeadlineConstants.RESERVE * self._budget - now
+        )
+        seconds = max(0.0, time_left) * weights[file_prefix] / later_weights
+
+        with self._lock:
+            self._stages[file_prefix] = {
+                "seconds": round(seconds, 1),
+                "unfetched": 0,
+            }
+
+        self._logger.info(
+            "Scraping has its share of the time budget",
+            file_prefix=file_prefix,
+            seconds=round(seconds, 1),
+        )
+
+        return now + seconds
+
+    def record_unfetched(self, file_prefix: str, pages: int) -> None:
+        """Record the pages a scrape stage left unscraped when its time
+        ran out.
+
+        :param file_prefix: Prefix of the files the stage scrapes.
+        :param pages: Number of the unscraped pages.
+        :return: None.
+        """
+        if not pages:
+            return
+
+        with self._lock:
+            self._stages[file_prefix]["unfetched"] += pages
+
+        self._logger.warning(
+            "Time budget ran out, pages left unscraped",
+            file_prefix=file_prefix,
+            pages=pages,
+        )
+
+    def is_cut_short(self, file_prefix: str) -> bool:
+        """Tell whether a scrape stage left pages unscraped, so its data
+        holds only a part of the rows.
+
+        :param file_prefix: Prefix of the files the stage scrapes.
+        :return: True if the stage was cut short.
+        """
+        with self._lock:
+            is_cut_short = (
+                self._stages.get(file_prefix, {}).get("unfetched", 0) > 0
+            )
+
+        return is_cut_short
+
+    def report(self) -> None:
+        """Record the budget, the time the run took and the pages each
+        scrape stage left unscraped in the run summary.
+
+        :return: None.
+        """
+        if self._end_at is None:
+            return
+
+        now = time.monotonic()
+
+        with self._lock:
+            run_summary.record(
+                section="deadline",
+                budget=self._budget,
+                elapsed=round(now - self._started_at, 1),
+                on_time=now <= self._end_at,
+                stages={
+                    file_prefix: dict(stage)
+                    for file_prefix, stage in self._stages.items()
+                },
+            )
+
+
+deadline = Deadline()
@@ -0,0 +1,287 @@
+import atexit
+import os
+import queue
+import sys
+import threading
+import time
+from typing import TextIO
+
+import structlog
+from structlog.typing import EventDict, WrappedLogger
+
+from common.constants import LogConstants
+
+
+class RepeatedEventSampler:
+    """structlog processor that keeps the first events of each kind per
+    time window and drops the rest, e.g. thousands of failed requests
+    during an outage. The first event of the next window carries the
+    number of the dropped ones.
+
+    An event is identified by its level and message, so the variable
+    parts, e.g. the URL, must be passed as key-value pairs.
+    """
+
+    def __init__(self, max_events: int, window: float) -> None:
+        self._max_events = max_events
+        self._window = window
+        # Start of the window, the events seen and the events dropped
+        # in it, by the level and message.
+        self._windows: dict[tuple[str, str], list] = {}
+        self._lock = threading.Lock()
+
+    def __call__(
+        self, logger: WrappedLogger, method_name: str, event_dict: EventDict
+    ) -> EventDict:
+        if method_name not in LogConstants.SAMPLED_LEVELS:
+            return event_dict
+
+        key = (method_name, event_dict.get("event"))
+        now = time.monotonic()
+
+        with self._lock:
+            window = self._windows.get(key)
+
+            if window is None or now - window[0] >= self._window:
+                if window is not None and window[2]:
+                    event_dict["suppressed"] = window[2]
+
+                window = [now, 0, 0]
+                self._windows[key] = window
+
+            window[1] += 1
+
+            if window[1] > self._max_events:
+                window[2] += 1
+                raise structlog.DropEvent
+
+        return event_dict
+
+    def pop_suppressed(self) -> dict[tuple[str, str], int]:
+        """Get the number of the events dropped in the current windows
+        and start new ones.
+
+        :return: Number of the dropped events by the level and message.
+        """
+        with self._lock:
+            suppressed = {
+                key: window[2]
+                for key, window in self._windows.items()
+                if window[2]
+            }
+            self._windows.clear()
+
+        return suppressed
+
+
+class LogSink:
+    """Write the log events from a background thread, so the callers,
+    e.g. the event loop of the scrapers, never wait for the output.
+
+    The events are rendered by the writer thread too. When the queue is
+    full the events are dropped rather than block, and their number is
+    reported with the next written ones.
+    """
+
+    def __init__(self, stream: TextIO, sampler: RepeatedEventSampler) -> None:
+        self._stream = stream
+        self._sampler = sampler
+        self._renderer = structlog.dev.ConsoleRenderer()
+        self._queue: queue.Queue = queue.Queue(maxsize=LogConstants.QUEUE_SIZE)
+        self._dropped = 0
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        """Start the writer thread.
+
+        :return: None.
+        """
+        self._thread = threading.Thread(
+            target=self._write_events, name="log-sink", daemon=True
+        )
+        self._thread.start()
+
+    def put(self, event_dict: EventDict) -> None:
+        """Hand an event to the writer thread, or write it right away if
+        there is none, e.g. in a forked worker process.
+
+        :param event_dict: Event to write.
+        :return: None.
+        """
+        if self._thread is None:
+            self._write([event_dict])
+            return
+
+        try:
+            self._queue.put_nowait(event_dict)
+        except queue.Full:
+            self._dropped += 1
+
+    def _render(self, event_dict: EventDict) -> str:
+        """Render an event as a line.
+
+        :param event_dict: Event to render.
+        :return: Rendered line.
+        """
+        line = self._renderer(None, "", event_dict)
+
+        return line
+
+    def _write(self, event_dicts: list[EventDict]) -> None:
+        """Write the events to the stream.
+
+        :param event_dicts: Events to write.
+        :return: None.
+        """
+        lines = [self._render(event_dict) for event_dict in event_dicts]
+
+        if self._dropped:
+            dropped, self._dropped = self._dropped, 0
+            lines.append(
+                self._render(
+                    {
+                        "event": "Log queue full, dropped events",
+                        "level": "warning",
+                        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+                        "dropped": dropped,
+                    }
+                )
+            )
+
+        self._stream.write("\n".join(lines) + "\n")
+        self._stream.flush()
+
+    def _write_events(self) -> None:
+        """Write the queued events until the sink is closed. The events
+        queued in the meantime are written together.
+
+        :return: None.
+        """
+        while True:
+            event_dict = self._queue.get()
+
+            if event_dict is None:
+                return
+
+            event_dicts = [event_dict]
+
+            while len(event_dicts) < LogConstants.WRITE_BATCH_SIZE:
+                try:
+                    event_dict = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+                if event_dict is None:
+                    self._write(event_dicts)
+                    return
+
+                event_dicts.append(event_dict)
+
+            self._write(event_dicts)
+
+    def close(self) -> None:
+        """Write the queued events and the number of the events the
+        sampler dropped since the start of its windows, then stop the
+        writer thread.
+
+        :return: None.
+        """
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=LogConstants.CLOSE_TIMEOUT)
+            self._thread = None
+
+        suppressed = self._sampler.pop_suppressed()
+
+        if suppressed:
+            self._write(
+                [
+                    {
+                        "event": event,
+                        "level": level,
+                        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+                        "suppressed": count,
+                    }
+                    for (level, event), count in suppressed.items()
+                ]
+            )
+
+    def stop_in_child(self) -> None:
+        """Write synchronously in a forked child process, which does not
+        inherit the writer thread.
+
+        :return: None.
+        """
+        self._thread = None
+        self._queue = queue.Queue(maxsize=LogConstants.QUEUE_SIZE)
+
+
+class QueueLogger:
+    """structlog logger that hands the events to the log sink."""
+
+    def __init__(self, sink: LogSink) -> None:
+        self._sink = sink
+
+    def msg(self, event_dict: EventDict) -> None:
+        self._sink.put(event_dict)
+
+    log = debug = info = warn = warning = msg
+    error = err = critical = fatal = exception = msg
+
+
+def _pass_event_dict(
+    logger: WrappedLogger, method_name: str, event_dict: EventDict
+) -> tuple[tuple[EventDict], dict]:
+    """Pass the event to the logger as it is, to be rendered by the
+    writer thread. The exception being handled is captured here, the
+    writer thread could not get it later.
+
+    :param logger: Wrapped logger.
+    :param method_name: Name of the logging method.
+    :param event_dict: Event.
+    :return: Positional and keyword arguments of the logger.
+    """
+    if event_dict.get("exc_info") is True:
+        event_dict["exc_info"] = sys.exc_info()
+
+    return (event_dict,), {}
+
+
+def configure_logging(stream: TextIO | None = None) -> LogSink:
+    """Route the structlog events through the sampler to a log sink
+    written from a background thread. The events below the log level
+    are dropped before any processing.
+
+    :param stream: Stream to write to, stdout if not specified.
+    :return: Log sink.
+    """
+    sampler = RepeatedEventSampler(
+        max_events=LogConstants.SAMPLE_MAX_EVENTS,
+        window=LogConstants.SAMPLE_WINDOW,
+    )
+    sink = LogSink(stream=stream or sys.stdout, sampler=sampler)
+    sink.start()
+
+    structlog.configure(
+        processors=[
+            structlog.contextvars.merge_contextvars,
+            structlog.processors.add_log_level,
+            sampler,
+            structlog.processors.StackInfoRenderer(),
+            structlog.dev.set_exc_info,
+            structlog.processors.TimeStamper(
+                fmt="%Y-%m-%d %H:%M:%S", utc=False
+            ),
+            _pass_event_dict,
+        ],
+        wrapper_class=structlog.make_filtering_bound_logger(
+            LogConstants.LEVEL
+        ),
+        logger_factory=lambda *args: QueueLogger(sink=sink),
+        cache_logger_on_first_use=True,
+    )
+
+    atexit.register(sink.close)
+    os.register_at_fork(after_in_child=sink.stop_in_child)
+
+    return sink
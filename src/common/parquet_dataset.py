@@ -0,0 +1,450 @@
+import os
+import shutil
+from collections.abc import Callable, Iterator
+from datetime import date
+from pathlib import Path
+from typing import Any, BinaryIO
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from structlog import get_logger
+
+from common.constants import (
+    BaseConstants,
+    DatasetConstants,
+    IndexConstants,
+)
+from common.partition_index import PartitionIndex
+
+
+class ParquetDataset:
+    """Parquet dataset of a table, partitioned by the date of the run
+    in the Hive layout, e.g. 'books/date=2025-01-31/part-00000.parquet'.
+
+    Reads prune the partitions outside the requested dates and push the
+    filters down to the row group statistics, so only the files and row
+    groups that can match are read. A partition written with a key
+    column gets an index of its rows by the key, which the point
+    lookups of 'DatasetLookup' use.
+    """
+
+    PARTITIONING = ds.partitioning(
+        schema=pa.schema([("date", pa.string())]), flavor="hive"
+    )
+
+    def __init__(self, name: str, base_dir: Path | None = None) -> None:
+        self.name = name
+        self.path = (base_dir or BaseConstants.DATASET_DIR).joinpath(name)
+        self._logger = get_logger(__name__)
+
+    def get_partition_dir(self, partition_date: str | date) -> Path:
+        """Get a path to the directory of a date partition.
+
+        :param partition_date: Date of the partition.
+        :return: Path to the directory.
+        """
+        partition_dir = self.path.joinpath(f"date={partition_date}")
+
+        return partition_dir
+
+    def get_filepaths(self, partition_date: str | date) -> list[Path]:
+        """Get paths to the data files of a date partition.
+
+        :param partition_date: Date of the partition.
+        :return: List of filepaths.
+        """
+        partition_dir = self.get_partition_dir(partition_date=partition_date)
+
+        if not partition_dir.exists():
+            return []
+
+        filepaths = sorted(
+            partition_dir.glob(f"{DatasetConstants.FILE_PREFIX}-*.parquet")
+        )
+
+        return filepaths
+
+    @staticmethod
+    def _get_filename(shard: int) -> str:
+        """Get a name of a data file of a partition.
+
+        :param shard: Number of the file within the partition.
+        :return: Filename.
+        """
+        filename = f"{DatasetConstants.FILE_PREFIX}-{shard:05d}.parquet"
+
+        return filename
+
+    @staticmethod
+    def _get_file_key(partition_dir: Path, filename: str) -> str:
+        """Get a key of a file of a partition, its path relative to the
+        data directory.
+
+        :param partition_dir: Directory of the partition.
+        :param filename: Name of the file.
+        :return: File key.
+        """
+        file_key = (
+            partition_dir.joinpath(filename)
+            .relative_to(BaseConstants.DATA_DIR)
+            .as_posix()
+        )
+
+        return file_key
+
+    @staticmethod
+    def _get_shards(
+        table: pa.Table, max_rows: int
+    ) -> Iterator[tuple[str, pa.Table]]:
+        """Split a table into shards of at most the number of rows each.
+
+        :param table: Table to split.
+        :param max_rows: Maximum number of rows per shard.
+        :return: Filename and table of each shard.
+        """
+        num_files = max(1, -(-table.num_rows // max_rows))
+
+        for shard in range(num_files):
+            yield (
+                ParquetDataset._get_filename(shard=shard),
+                table.slice(offset=shard * max_rows, length=max_rows),
+            )
+
+    def _write_files(
+        self,
+        table: pa.Table,
+        target_dir: Path,
+        max_rows: int,
+        index_column: str | None = None,
+    ) -> None:
+        """Write a table into files of at most the number of rows each,
+        along with their index if a key column is given.
+
+        :param table: Table to write.
+        :param target_dir: Directory to write the files to.
+        :param max_rows: Maximum number of rows per file.
+        :param index_column: Key column to index the rows by.
+        :return: None.
+        """
+        os.makedirs(target_dir, exist_ok=True)
+
+        filepaths = []
+        row_group_size = DatasetConstants.ROW_GROUP_SIZE
+
+        if index_column is not None:
+            row_group_size = IndexConstants.ROW_GROUP_SIZE
+
+        for filename, shard_table in self._get_shards(
+            table=table, max_rows=max_rows
+        ):
+            filepath = target_dir.joinpath(filename)
+
+            pq.write_table(
+                shard_table,
+                filepath,
+                compression=DatasetConstants.COMPRESSION,
+                row_group_size=row_group_size,
+            )
+
+            filepaths.append(filepath)
+
+        if index_column is not None and index_column in table.column_names:
+            PartitionIndex.from_files(
+                column=index_column, filepaths=filepaths
+            ).write(partition_dir=target_dir)
+
+    def _replace_partition(
+        self,
+        table: pa.Table,
+        partition_date: str | date,
+        max_rows: int,
+        index_column: str | None = None,
+    ) -> None:
+        """Replace the files of a date partition with the table. The
+        files are written next to the partition first, so readers never
+        see a partially written one.
+
+        :param table: Table to write.
+        :param partition_date: Date of the partition.
+        :param max_rows: Maximum number of rows per file.
+        :param index_column: Key column to index the rows by.
+        :return: None.
+        """
+        partition_dir = self.get_partition_dir(partition_date=partition_date)
+        tmp_dir = partition_dir.with_name(f".{partition_dir.name}.tmp")
+        old_dir = partition_dir.with_name(f".{partition_dir.name}.old")
+
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+        self._write_files(
+            table=table,
+            target_dir=tmp_dir,
+            max_rows=max_rows,
+            index_column=index_column,
+        )
+
+        if partition_dir.exists():
+            os.replace(partition_dir, old_dir)
+
+        os.replace(tmp_dir, partition_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    def write(
+        self,
+        df: pd.DataFrame,
+        partition_date: str | date | None = None,
+        index_column: str | None = None,
+    ) -> list[Path]:
+        """Write a dataframe as the date partition, replacing the data
+        written for that date before.
+
+        :param df: Dataframe to write.
+        :param partition_date: Date of the partition, the current date
+            if not specified.
+        :param index_column: Key column to index the rows by, the rows
+            are not indexed if not specified.
+        :return: List of the written filepaths.
+        """
+        partition_date = partition_date or BaseConstants.CURRENT_DATE
+
+        table = pa.Table.from_pandas(df=df, preserve_index=False)
+
+        self._replace_partition(
+            table=table,
+            partition_date=partition_date,
+            max_rows=DatasetConstants.MAX_ROWS_PER_FILE,
+            index_column=index_column,
+        )
+
+        return self.get_filepaths(partition_date=partition_date)
+
+    def stream(
+        self,
+        df: pd.DataFrame,
+        open_file: Callable[[str], BinaryIO],
+        partition_date: str | date | None = None,
+        index_column: str | None = None,
+    ) -> list[str]:
+        """Stream a dataframe as the date partition to another storage,
+        e.g. S3, without writing it to the local disk. The dataframe is
+        converted and written one row group at a time, so only a row
+        group is held in memory besides the dataframe. The files are
+        keyed by their paths relative to the data directory, as the
+        uploader keys the local files, and the index of the rows is
+        written next to them if a key column is given.
+
+        :param df: Dataframe to write.
+        :param open_file: Function opening a writable file by its key.
+        :param partition_date: Date of the partition, the current date
+            if not specified.
+        :param index_column: Key column to index the rows by, the rows
+            are not indexed if not specified.
+        :return: List of the written data file keys.
+        """
+        partition_dir = self.get_partition_dir(
+            partition_date=partition_date or BaseConstants.CURRENT_DATE
+        )
+        schema = pa.Schema.from_pandas(df=df, preserve_index=False)
+        max_rows = DatasetConstants.MAX_ROWS_PER_FILE
+        row_group_size = DatasetConstants.ROW_GROUP_SIZE
+        is_indexed = index_column is not None and index_column in df.columns
+
+        if index_column is not None:
+            row_group_size = IndexConstants.ROW_GROUP_SIZE
+
+        file_keys = []
+        row_groups = []
+
+        for shard in range(max(1, -(-len(df) // max_rows))):
+            filename = self._get_filename(shard=shard)
+            file_key = self._get_file_key(
+                partition_dir=partition_dir, filename=filename
+            )
+            shard_df = df.iloc[shard * max_rows : (shard + 1) * max_rows]
+
+            with (
+                open_file(file_key) as f,
+                pq.ParquetWriter(
+                    f, schema=schema, compression=DatasetConstants.COMPRESSION
+                ) as writer,
+            ):
+                for row_group, offset in enumerate(
+                    range(0, len(shard_df), row_group_size)
+                ):
+                    table = pa.Table.from_pandas(
+                        df=shard_df.iloc[offset : offset + row_group_size],
+                        schema=schema,
+                        preserve_index=False,
+                    )
+                    writer.write_table(table, row_group_size=row_group_size)
+
+                    if is_indexed:
+                        row_groups.append(
+                            (
+                                filename,
+                                row_group,
+                                table.column(index_column).to_pylist(),
+                            )
+                        )
+
+            file_keys.append(file_key)
+
+        if is_indexed:
+            index = PartitionIndex.from_row_groups(
+                column=index_column, row_groups=row_groups
+            )
+
+            index_key = self._get_file_key(
+                partition_dir=partition_dir, filename=IndexConstants.FILENAME
+            )
+
+            with open_file(index_key) as f:
+                pq.write_table(index.to_table(), f)
+
+        self._logger.info(
+            "Streamed the dataset files",
+            dataset=self.name,
+            files=len(file_keys),
+            indexed=is_indexed,
+        )
+
+        return file_keys
+
+    @staticmethod
+    def _get_filter(
+        start_date: str | date | None,
+        end_date: str | date | None,
+        filters: list[tuple[str, str, Any]] | None,
+    ) -> ds.Expression | None:
+        """Build a filter expression from the date range and filters.
+
+        :param start_date: First date to read, inclusive.
+        :param end_date: Last date to read, inclusive.
+        :param filters: Filters as (column, operator, value) tuples that
+            must all match, e.g. [('ratings', '>=', 1000)].
+        :return: Filter expression, None if nothing is filtered.
+        """
+        conditions = list(filters or [])
+
+        if start_date is not None:
+            conditions.append(("date", ">=", str(start_date)))
+
+        if end_date is not None:
+            conditions.append(("date", "<=", str(end_date)))
+
+        if not conditions:
+            return None
+
+        expression = pq.filters_to_expression(filters=conditions)
+
+        return expression
+
+    def read(
+        self,
+        columns: list[str] | None = None,
+        start_date: str | date | None = None,
+        end_date: str | date | None = None,
+        filters: list[tuple[str, str, Any]] | None = None,
+    ) -> pd.DataFrame:
+        """Read the dataset into a dataframe.
+
+        :param columns: Columns to read, all columns if not specified.
+            The partition column 'date' can be requested as well.
+        :param start_date: First date to read, inclusive.
+        :param end_date: Last date to read, inclusive.
+        :param filters: Filters as (column, operator, value) tuples that
+            must all match, e.g. [('ratings', '>=', 1000)].
+        :return: Dataframe.
+        """
+        if not self.path.exists():
+            return pd.DataFrame(columns=columns)
+
+        dataset = ds.dataset(
+            self.path,
+            format="parquet",
+            partitioning=self.PARTITIONING,
+            exclude_invalid_files=False,
+            ignore_prefixes=[".", "_"],
+        )
+
+        table = dataset.to_table(
+            columns=columns,
+            filter=self._get_filter(
+                start_date=start_date, end_date=end_date, filters=filters
+            ),
+        )
+
+        df = table.to_pandas()
+
+        return df
+
+    def compact(self, partition_date: str | date) -> bool:
+        """Merge the small files of a date partition into files close to
+        the target size.
+
+        :param partition_date: Date of the partition.
+        :return: True if the partition has been compacted.
+        """
+        filepaths = self.get_filepaths(partition_date=partition_date)
+        sizes = [filepath.stat().st_size for filepath in filepaths]
+
+        small_files = [
+            size
+            for size in sizes
+            if size
+            < DatasetConstants.TARGET_FILE_SIZE
+            * DatasetConstants.SMALL_FILE_RATIO
+        ]
+
+        if len(small_files) < 2:
+            return False
+
+        table = pq.read_table(filepaths, partitioning=None)
+
+        # Size the files by the average compressed size of a row, which
+        # is close enough for the files of a single table.
+        row_size = max(1, sum(sizes) // max(1, table.num_rows))
+        max_rows = max(1, DatasetConstants.TARGET_FILE_SIZE // row_size)
+
+        # The merged files are indexed by the key of the old ones.
+        self._replace_partition(
+            table=table,
+            partition_date=partition_date,
+            max_rows=max_rows,
+            index_column=PartitionIndex.read_column(
+                partition_dir=self.get_partition_dir(
+                    partition_date=partition_date
+                )
+            ),
+        )
+
+        self._logger.info(
+            "Compacted the partition",
+            dataset=self.name,
+            partition_date=partition_date,
+            files=len(filepaths),
+            compacted_files=len(
+                self.get_filepaths(partition_date=partition_date)
+            ),
+        )
+
+        return True
+
+    def get_partition_dates(self) -> list[str]:
+        """Get the dates of all partitions of the dataset.
+
+        :return: List of dates.
+        """
+        if not self.path.exists():
+            return []
+
+        partition_dates = sorted(
+            partition_dir.name.removeprefix("date=")
+            for partition_dir in self.path.glob("date=*")
+            if partition_dir.is_dir()
+        )
+
+        return partition_dates
@@ -0,0 +1,145 @@
+import json
+import os
+import sqlite3
+import time
+import zlib
+from contextlib import closing
+from pathlib import Path
+from typing import Any
+
+from common.constants import BaseConstants, ParseCacheConstants
+
+
+class ParseCache:
+    """Persistent cache of the parsed rows of the pages, keyed by a hash
+    of the page content, so an unchanged page is not parsed again.
+
+    The entries are stored in a SQLite database in the state directory.
+    The parse workers only read it, the results of a run are written
+    by the main process once all pages are parsed. The entries not used
+    for a while are evicted, and the least recently used ones once the
+    cache outgrows its size limit.
+    """
+
+    def __init__(self, filepath: Path | None = None) -> None:
+        if filepath is None:
+            filepath = BaseConstants.STATE_DIR.joinpath(
+                f"{ParseCacheConstants.FILE_PREFIX}.sqlite"
+            )
+
+        self._filepath = filepath
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database for writing, creating it if needed.
+
+        :return: Connection to the database.
+        """
+        os.makedirs(self._filepath.parent, exist_ok=True)
+
+        connection = sqlite3.connect(self._filepath)
+        connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "namespace TEXT NOT NULL, "
+            "content_hash TEXT NOT NULL, "
+            "data BLOB NOT NULL, "
+            "size INTEGER NOT NULL, "
+            "accessed_at REAL NOT NULL, "
+            "PRIMARY KEY (namespace, content_hash))"
+        )
+
+        return connection
+
+    def get(self, namespace: str, content_hash: str) -> Any | None:
+        """Get the parsed rows of a page.
+
+        :param namespace: Namespace of the parser that produced them.
+        :param content_hash: Hash of the page content.
+        :return: Parsed rows, None if they are not cached.
+        """
+        if not self._filepath.exists():
+            return None
+
+        # The workers open the database read-only, so they never wait
+        # for each other.
+        with closing(
+            sqlite3.connect(f"{self._filepath.as_uri()}?mode=ro", uri=True)
+        ) as connection:
+            row = connection.execute(
+                "SELECT data FROM entries "
+                "WHERE namespace = ? AND content_hash = ?",
+                (namespace, content_hash),
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        parsed_data = json.loads(zlib.decompress(row[0]))
+
+        return parsed_data
+
+    def update(
+        self,
+        namespace: str,
+        entries: dict[str, Any],
+        used_hashes: list[str],
+    ) -> None:
+        """Add the parsed rows of the pages, mark the cached ones used
+        by the run as recently used and evict the stale entries.
+
+        :param namespace: Namespace of the parser that produced them.
+        :param entries: Parsed rows by the hashes of the page content.
+        :param used_hashes: Hashes of the cached pages the run used.
+        :return: None.
+        """
+        now = time.time()
+
+        with closing(self._connect()) as connection:
+            with connection:
+                for content_hash, parsed_data in entries.items():
+                    data = zlib.compress(
+                        json.dumps(parsed_data, ensure_ascii=False).encode()
+                    )
+
+                    connection.execute(
+                        "INSERT OR REPLACE INTO entries "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (namespace, content_hash, data, len(data), now),
+                    )
+
+                connection.executemany(
+                    "UPDATE entries SET accessed_at = ? "
+                    "WHERE namespace = ? AND content_hash = ?",
+                    [
+                        (now, namespace, content_hash)
+                        for content_hash in used_hashes
+                    ],
+                )
+
+                self._evict(connection=connection, now=now)
+
+            # Give the pages of the evicted entries back to the disk.
+            connection.execute("PRAGMA incremental_vacuum")
+
+    @staticmethod
+    def _evict(connection: sqlite3.Connection, now: float) -> None:
+        """Delete the entries not used within the maximum age, then the
+        least recently used ones beyond the maximum size.
+
+        :param connection: Connection to the database.
+        :param now: Current time.
+        :return: None.
+        """
+        connection.execute(
+            "DELETE FROM entries WHERE accessed_at < ?",
+            (now - ParseCacheConstants.MAX_AGE_DAYS * 24 * 60 * 60,),
+        )
+        connection.execute(
+            "DELETE FROM entries WHERE rowid IN ("
+            "SELECT rowid FROM ("
+            "SELECT rowid, SUM(size) OVER ("
+            "ORDER BY accessed_at DESC, rowid DESC) AS total_size "
+            "FROM entries) "
+            "WHERE total_size > ?)",
+            (ParseCacheConstants.MAX_SIZE,),
+        )
@@ -0,0 +1,288 @@
+import os
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pandas.util import hash_array
+
+from common.constants import IndexConstants
+
+
+class PartitionIndex:
+    """Index of the rows of a date partition by a key column: the file,
+    the row group and the row within it holding each key, so a lookup
+    reads only the row groups of the keys it looks for.
+
+    The keys are stored as their 64-bit hashes, sorted, so the index
+    loads without decoding any strings and is searched by bisection.
+    A key may have several rows, e.g. a book in several lists, and two
+    keys may share a hash, so the rows found are checked against the
+    keys by the reader.
+    """
+
+    def __init__(
+        self,
+        column: str,
+        key_hashes: np.ndarray,
+        files: pd.Categorical,
+        row_groups: np.ndarray,
+        rows: np.ndarray,
+    ) -> None:
+        """Create an index from the positions of the rows sorted by
+        their key hashes.
+
+        :param column: Key column of the index.
+        :param key_hashes: Key hash of each row.
+        :param files: Name of the file of each row.
+        :param row_groups: Row group of each row within its file.
+        :param rows: Row within its row group.
+        """
+        self.column = column
+        self.key_hashes = key_hashes
+        self.files = files
+        self.row_groups = row_groups
+        self.rows = rows
+
+    def __len__(self) -> int:
+        return len(self.key_hashes)
+
+    @staticmethod
+    def get_key_strings(keys: Iterable) -> np.ndarray:
+        """Get the string representation of the keys, which they are
+        hashed and compared by, so a key is found whatever the type of
+        its column.
+
+        :param keys: Keys to represent.
+        :return: Array of strings.
+        """
+        key_strings = np.array([str(key) for key in keys], dtype=object)
+
+        return key_strings
+
+    @classmethod
+    def hash_keys(cls, keys: Iterable) -> np.ndarray:
+        """Hash the keys by their string representation.
+
+        :param keys: Keys to hash.
+        :return: Hash of each key.
+        """
+        key_hashes = hash_array(cls.get_key_strings(keys=keys))
+
+        return key_hashes
+
+    @classmethod
+    def from_row_groups(
+        cls, column: str, row_groups: Iterable[tuple[str, int, list]]
+    ) -> "PartitionIndex":
+        """Build the index from the keys of the row groups of a
+        partition.
+
+        :param column: Key column of the index.
+        :param row_groups: Filename, row group number and keys of each
+            row group.
+        :return: Index.
+        """
+        positions = []
+
+        for filename, row_group, keys in row_groups:
+            is_key = np.array([key is not None for key in keys], dtype=bool)
+
+            positions.append(
+                pd.DataFrame(
+                    {
+                        IndexConstants.KEY_HASH: cls.hash_keys(
+                            keys=(key for key in keys if key is not None)
+                        ),
+                        IndexConstants.FILE: filename,
+                        IndexConstants.ROW_GROUP: np.int32(row_group),
+                        IndexConstants.ROW: np.flatnonzero(is_key).astype(
+                            np.int32
+                        ),
+                    }
+                )
+            )
+
+        if positions:
+            df = pd.concat(positions, ignore_index=True)
+        else:
+            df = pd.DataFrame(
+                {
+                    IndexConstants.KEY_HASH: np.array([], dtype=np.uint64),
+                    IndexConstants.FILE: [],
+                    IndexConstants.ROW_GROUP: np.array([], dtype=np.int32),
+                    IndexConstants.ROW: np.array([], dtype=np.int32),
+                }
+            )
+
+        df = df.sort_values(IndexConstants.KEY_HASH, kind="stable")
+
+        index = cls(
+            column=column,
+            key_hashes=df[IndexConstants.KEY_HASH].to_numpy(),
+            files=pd.Categorical(df[IndexConstants.FILE]),
+            row_groups=df[IndexConstants.ROW_GROUP].to_numpy(),
+            rows=df[IndexConstants.ROW].to_numpy(),
+        )
+
+        return index
+
+    @staticmethod
+    def _read_row_groups(
+        column: str, filepaths: list[Path]
+    ) -> Iterator[tuple[str, int, list]]:
+        """Read the key column of the files row group by row group.
+
+        :param column: Key column of the index.
+        :param filepaths: Paths to the data files of the partition.
+        :return: Filename, row group number and keys of each row group.
+        """
+        for filepath in filepaths:
+            parquet_file = pq.ParquetFile(filepath)
+
+            for row_group in range(parquet_file.num_row_groups):
+                keys = (
+                    parquet_file.read_row_group(row_group, columns=[column])
+                    .column(column)
+                    .to_pylist()
+                )
+
+                yield filepath.name, row_group, keys
+
+    @classmethod
+    def from_files(
+        cls, column: str, filepaths: list[Path]
+    ) -> "PartitionIndex":
+        """Build the index of the files of a partition by reading only
+        their key column.
+
+        :param column: Key column of the index.
+        :param filepaths: Paths to the data files of the partition.
+        :return: Index.
+        """
+        index = cls.from_row_groups(
+            column=column,
+            row_groups=cls._read_row_groups(
+                column=column, filepaths=filepaths
+            ),
+        )
+
+        return index
+
+    def to_table(self) -> pa.Table:
+        """Convert the index to a table, with the key column in its
+        metadata.
+
+        :return: Table.
+        """
+        table = pa.table(
+            {
+                IndexConstants.KEY_HASH: self.key_hashes,
+                IndexConstants.FILE: pa.DictionaryArray.from_pandas(
+                    self.files
+                ),
+                IndexConstants.ROW_GROUP: self.row_groups,
+                IndexConstants.ROW: self.rows,
+            }
+        ).replace_schema_metadata({"column": self.column})
+
+        return table
+
+    def write(self, partition_dir: Path) -> Path:
+        """Write the index next to the files of the partition.
+
+        :param partition_dir: Directory of the partition.
+        :return: Path to the index file.
+        """
+        os.makedirs(partition_dir, exist_ok=True)
+
+        filepath = partition_dir.joinpath(IndexConstants.FILENAME)
+        pq.write_table(self.to_table(), filepath)
+
+        return filepath
+
+    @classmethod
+    def read(cls, partition_dir: Path) -> "PartitionIndex | None":
+        """Read the index of a partition.
+
+        :param partition_dir: Directory of the partition.
+        :return: Index, None if the partition has none.
+        """
+        filepath = partition_dir.joinpath(IndexConstants.FILENAME)
+
+        if not filepath.exists():
+            return None
+
+        table = pq.read_table(filepath)
+
+        index = cls(
+            column=table.schema.metadata[b"column"].decode(),
+            key_hashes=table.column(IndexConstants.KEY_HASH).to_numpy(),
+            files=table.column(IndexConstants.FILE).to_pandas().array,
+            row_groups=table.column(IndexConstants.ROW_GROUP).to_numpy(),
+            rows=table.column(IndexConstants.ROW).to_numpy(),
+        )
+
+        return index
+
+    @staticmethod
+    def read_column(partition_dir: Path) -> str | None:
+        """Read the key column of the index of a partition, without
+        reading the index.
+
+        :param partition_dir: Directory of the partition.
+        :return: Key column, None if the partition has no index.
+        """
+        filepath = partition_dir.joinpath(IndexConstants.FILENAME)
+
+        if not filepath.exists():
+            return None
+
+        column = pq.read_schema(filepath).metadata[b"column"].decode()
+
+        return column
+
+    def find(
+        self, keys: Iterable
+    ) -> dict[tuple[str, int], tuple[np.ndarray, np.ndarray]]:
+        """Find the positions of the rows of the keys, grouped by the
+        row groups holding them.
+
+        :param keys: Keys to find.
+        :return: Rows within the row group and the positions of their
+            keys among the keys, by the file and the row group.
+        """
+        key_hashes = self.hash_keys(keys=keys)
+        starts = np.searchsorted(self.key_hashes, key_hashes, side="left")
+        ends = np.searchsorted(self.key_hashes, key_hashes, side="right")
+
+        counts = ends - starts
+        positions = np.repeat(ends - counts.cumsum(), counts) + np.arange(
+            counts.sum()
+        )
+        key_positions = np.repeat(np.arange(len(key_hashes)), counts)
+
+        group_ids = (
+            self.files.codes[positions].astype(np.int64) << 32
+        ) | self.row_groups[positions]
+        order = np.argsort(group_ids, kind="stable")
+        unique_ids, group_starts = np.unique(
+            group_ids[order], return_index=True
+        )
+
+        groups = {}
+
+        for group_id, group in zip(
+            unique_ids.tolist(), np.split(order, group_starts[1:])
+        ):
+            filename = self.files.categories[group_id >> 32]
+            row_group = group_id & 0xFFFFFFFF
+
+            groups[(filename, row_group)] = (
+                self.rows[positions[group]],
+                key_positions[group],
+            )
+
+        return groups
@@ -0,0 +1,50 @@
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from common.constants import BaseConstants, ConfigConstants
+
+
+class RunSummary:
+    """Collect facts about the current run, e.g. the settings it used,
+    and save them next to the processed data."""
+
+    def __init__(self) -> None:
+        self._summary: dict[str, Any] = {
+            "date": BaseConstants.CURRENT_DATE,
+            "started_at": datetime.now(tz=timezone.utc).isoformat(),
+        }
+
+    def record(self, section: str, **values: Any) -> None:
+        """Record values under a section of the summary.
+
+        :param section: Section of the summary.
+        :param values: Values to record.
+        :return: None.
+        """
+        self._summary.setdefault(section, {}).update(values)
+
+    def save(self) -> Path:
+        """Save the summary to the processed data directory.
+
+        :return: Path to the summary file.
+        """
+        os.makedirs(BaseConstants.PROCESSED_DATA_DIR, exist_ok=True)
+
+        # The date may have been set by the configuration since.
+        self._summary["date"] = BaseConstants.CURRENT_DATE
+        self._summary["finished_at"] = datetime.now(
+            tz=timezone.utc
+        ).isoformat()
+
+        filepath = BaseConstants.PROCESSED_DATA_DIR.joinpath(
+            f"{ConfigConstants.RUN_SUMMARY_FILE_PREFIX}.json"
+        )
+        filepath.write_text(json.dumps(self._summary, indent=2, default=str))
+
+        return filepath
+
+
+run_summary = RunSummary()
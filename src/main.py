@@ -1,18 +1,99 @@
+import argparse
 import asyncio
+import os
+import sys
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING
 
+from common.config import add_config_arguments, apply_config, load_config
 from common.constants import (
+    ArchiveConstants,
     BaseConstants,
     BookConstants,
     BookDetailsConstants,
+    BookIdIndexConstants,
+    CompressionConstants,
+    ConfigConstants,
+    DatasetConstants,
+    DeadlineConstants,
+    FreshnessConstants,
+    ParseCacheConstants,
     PopularListConstants,
 )
-from parsers.book_details_parser import BookDetailsParser
-from parsers.book_parser import BookParser
-from parsers.popular_list_parser import PopularListParser
-from scrapers.book_details_scraper import BookDetailsScraper
-from scrapers.book_scraper import BookScraper
-from scrapers.popular_list_scraper import PopularListScraper
-from uploader.uploader import Uploader
+from common.deadline import deadline
+from common.log_sink import configure_logging
+from common.run_summary import run_summary
+from pipeline.dag_runner import DagRunner, Stage
+
+if TYPE_CHECKING:
+    from uploader.uploader import Uploader
+
+
+def get_state_file_keys() -> list[dict]:
+    """Get file keys of the state that is shared between runs.
+
+    :return: List of file keys.
+    """
+    from common.change_capture import ChangeCapture
+
+    filepaths = [
+        BaseConstants.STATE_DIR.joinpath(
+            f"{FreshnessConstants.FILE_PREFIX}.parquet.gz"
+        ),
+        BaseConstants.STATE_DIR.joinpath(
+            f"{BookIdIndexConstants.FILE_PREFIX}.npy"
+        ),
+        BaseConstants.STATE_DIR.joinpath(
+            f"{ParseCacheConstants.FILE_PREFIX}.sqlite"
+        ),
+        CompressionConstants.ZSTD_DICTIONARY_PATH,
+        DagRunner.get_fingerprints_path(),
+        *(
+            BaseConstants.STATE_DIR.joinpath(filename)
+            for dataset_name in get_change_capture_dataset_names()
+            for filename in ChangeCapture.get_snapshot_filenames(
+                name=dataset_name
+            )
+        ),
+    ]
+
+    file_keys = [
+        {
+            "filepath": filepath,
+            "file_key": f"{BaseConstants.STATE_DIR.name}/{filepath.name}",
+        }
+        for filepath in filepaths
+    ]
+
+    return file_keys
+
+
+def download_state(upl: "Uploader") -> None:
+    """Download the state of the previous runs from an S3 bucket.
+
+    :param upl: An uploader to use.
+    :return: None.
+    """
+    os.makedirs(BaseConstants.STATE_DIR, exist_ok=True)
+
+    for obj in get_state_file_keys():
+        upl.download_file(obj=obj)
+
+
+def upload_state(upl: "Uploader") -> None:
+    """Upload the state of the current run to an S3 bucket. It runs
+    after all the parsers, which write the parse cache, so a partly
+    updated cache is never uploaded.
+
+    :param upl: An uploader to use.
+    :return: None.
+    """
+    state_file_keys = [
+        obj for obj in get_state_file_keys() if obj["filepath"].exists()
+    ]
+
+    upl.upload_files(file_keys=state_file_keys)
 
 
 def scrape_popular_lists() -> None:
@@ -20,12 +101,14 @@ def scrape_popular_lists() -> None:
 
     :return: None.
     """
+    from scrapers.popular_list_scraper import PopularListScraper
+
     popular_list_scraper = PopularListScraper()
 
     asyncio.run(popular_list_scraper.save_popular_lists())
 
 
-def upload_scraped_popular_lists(upl: Uploader) -> None:
+def upload_scraped_popular_lists(upl: "Uploader") -> None:
     """Upload the scraped popular lists data to an S3 bucket.
 
     :param upl: An uploader to use.
@@ -36,7 +119,7 @@ def upload_scraped_popular_lists(upl: Uploader) -> None:
         file_prefix=PopularListConstants.FILE_PREFIX,
     )
 
-    uploader.upload_files(file_keys=popular_lists_file_keys)
+    upl.upload_files(file_keys=popular_lists_file_keys)
 
 
 def parse_popular_lists() -> None:
@@ -44,23 +127,29 @@ def parse_popular_lists() -> None:
 
     :return: None.
     """
+    from parsers.popular_list_parser import PopularListParser
+
     popular_list_parser = PopularListParser()
 
     popular_list_parser.save_popular_lists()
 
 
-def upload_parsed_popular_lists(upl: Uploader) -> None:
+def upload_parsed_popular_lists(upl: "Uploader") -> None:
     """Upload the parsed popular lists data to an S3 bucket.
 
     :param upl: An uploader to use.
     :return: None.
     """
     popular_lists_file_keys = upl.get_file_keys(
-        base_dir=BaseConstants.PROCESSED_DATA_DIR,
-        file_prefix=PopularListConstants.FILE_PREFIX,
+        base_dir=get_partition_dir(
+            dataset_name=PopularListConstants.FILE_PREFIX
+        ),
+        file_prefix=DatasetConstants.FILE_PREFIX,
+    ) + get_delta_file_keys(
+        upl=upl, dataset_names=[PopularListConstants.FILE_PREFIX]
     )
 
-    uploader.upload_files(file_keys=popular_lists_file_keys)
+    upl.upload_files(file_keys=popular_lists_file_keys)
 
 
 def scrape_books() -> None:
@@ -68,12 +157,14 @@ def scrape_books() -> None:
 
     :return: None.
     """
+    from scrapers.book_scraper import BookScraper
+
     book_scraper = BookScraper()
 
     asyncio.run(book_scraper.save_books())
 
 
-def upload_scraped_books(upl: Uploader) -> None:
+def upload_scraped_books(upl: "Uploader") -> None:
     """Upload the scraped books data to an S3 bucket.
 
     :param upl: An uploader to use.
@@ -84,7 +175,7 @@ def upload_scraped_books(upl: Uploader) -> None:
         file_prefix=BookConstants.FILE_PREFIX,
     )
 
-    uploader.upload_files(file_keys=books_file_keys)
+    upl.upload_files(file_keys=books_file_keys)
 
 
 def parse_books() -> None:
@@ -92,23 +183,25 @@ def parse_books() -> None:
 
     :return: None.
     """
+    from parsers.book_parser import BookParser
+
     book_parser = BookParser()
 
     book_parser.save_books()
 
 
-def upload_parsed_books(upl: Uploader) -> None:
+def upload_parsed_books(upl: "Uploader") -> None:
     """Upload the parsed books data to an S3 bucket.
 
     :param upl: An uploader to use.
     :return: None.
     """
     books_file_keys = upl.get_file_keys(
-        base_dir=BaseConstants.PROCESSED_DATA_DIR,
-        file_prefix=BookConstants.FILE_PREFIX,
-    )
+        base_dir=get_partition_dir(dataset_name=BookConstants.FILE_PREFIX),
+        file_prefix=DatasetConstants.FILE_PREFIX,
+    ) + get_delta_file_keys(upl=upl, dataset_names=[BookConstants.FILE_PREFIX])
 
-    uploader.upload_files(file_keys=books_file_keys)
+    upl.upload_files(file_keys=books_file_keys)
 
 
 def scrape_books_details() -> None:
@@ -116,12 +209,14 @@ def scrape_books_details() -> None:
 
     :return: None.
     """
+    from scrapers.book_details_scraper import BookDetailsScraper
+
     book_details_scraper = BookDetailsScraper()
 
     asyncio.run(book_details_scraper.save_books_details())
 
 
-def upload_scraped_books_details(upl: Uploader) -> None:
+def upload_scraped_books_details(upl: "Uploader") -> None:
     """Upload the scraped books details data to an S3 bucket.
 
     :param upl: An uploader to use.
@@ -132,7 +227,7 @@ def upload_scraped_books_details(upl: Uploader) -> None:
         file_prefix=BookDetailsConstants.FILE_PREFIX,
     )
 
-    uploader.upload_files(file_keys=books_details_file_keys)
+    upl.upload_files(file_keys=books_details_file_keys)
 
 
 def parse_books_details() -> None:
@@ -140,42 +235,394 @@ def parse_books_details() -> None:
 
     :return: None.
     """
+    from parsers.book_details_parser import BookDetailsParser
+
     book_details_parser = BookDetailsParser()
 
     book_details_parser.save_books_details()
 
 
-def upload_parsed_books_details(upl: Uploader) -> None:
+def upload_parsed_books_details(upl: "Uploader") -> None:
     """Upload the parsed books details data to an S3 bucket.
 
     :param upl: An uploader to use.
     :return: None.
     """
-    books_details_file_keys = upl.get_file_keys(
+    books_details_file_keys = get_delta_file_keys(
+        upl=upl, dataset_names=get_books_details_dataset_names()
+    )
+
+    # The streamed books details are in S3 already.
+    if not DatasetConstants.STREAM_BOOKS_DETAILS:
+        books_details_file_keys += [
+            obj
+            for dataset_name in get_books_details_dataset_names()
+            for obj in upl.get_file_keys(
+                base_dir=get_partition_dir(dataset_name=dataset_name),
+                file_prefix=DatasetConstants.FILE_PREFIX,
+            )
+        ]
+
+    upl.upload_files(file_keys=books_details_file_keys)
+
+
+def upload_stage_fingerprints(upl: "Uploader") -> None:
+    """Upload the input fingerprints of the stages to an S3 bucket once
+    all the stages finished, including the ones after 'upload_state'.
+
+    :param upl: An uploader to use.
+    :return: None.
+    """
+    fingerprints_path = DagRunner.get_fingerprints_path()
+
+    if not fingerprints_path.exists():
+        return
+
+    upl.upload_files(
+        file_keys=[
+            {
+                "filepath": fingerprints_path,
+                "file_key": (
+                    f"{BaseConstants.STATE_DIR.name}/{fingerprints_path.name}"
+                ),
+            }
+        ]
+    )
+
+
+def upload_run_summary(upl: "Uploader") -> None:
+    """Save the run summary and upload it to an S3 bucket.
+
+    :param upl: An uploader to use.
+    :return: None.
+    """
+    run_summary.save()
+
+    run_summary_file_keys = upl.get_file_keys(
         base_dir=BaseConstants.PROCESSED_DATA_DIR,
+        file_prefix=ConfigConstants.RUN_SUMMARY_FILE_PREFIX,
+    )
+
+    upl.upload_files(file_keys=run_summary_file_keys)
+
+
+def get_filepaths(base_dir: Path, file_prefix: str) -> list[Path]:
+    """Get paths to the files with the prefix in a directory.
+
+    :param base_dir: Directory to look for the files in.
+    :param file_prefix: The prefix of the files.
+    :return: List of filepaths.
+    """
+    if not base_dir.exists():
+        return []
+
+    filepaths = [
+        base_dir.joinpath(filename)
+        for filename in os.listdir(base_dir)
+        if filename.startswith(file_prefix)
+    ]
+
+    return filepaths
+
+
+def get_partition_dir(dataset_name: str) -> Path:
+    """Get a path to the current date partition of a dataset.
+
+    :param dataset_name: Name of the dataset.
+    :return: Path to the partition directory.
+    """
+    from common.parquet_dataset import ParquetDataset
+
+    dataset = ParquetDataset(name=dataset_name)
+
+    return dataset.get_partition_dir(partition_date=BaseConstants.CURRENT_DATE)
+
+
+def get_delta_dir(dataset_name: str) -> Path:
+    """Get a path to the current date deltas of a dataset.
+
+    :param dataset_name: Name of the dataset.
+    :return: Path to the deltas directory.
+    """
+    return BaseConstants.DELTA_DIR.joinpath(
+        dataset_name, f"date={BaseConstants.CURRENT_DATE}"
+    )
+
+
+def get_delta_file_keys(
+    upl: "Uploader", dataset_names: list[str]
+) -> list[dict]:
+    """Get file keys of the current date deltas of the datasets.
+
+    :param upl: An uploader to use.
+    :param dataset_names: Names of the datasets.
+    :return: List of file keys.
+    """
+    file_keys = [
+        obj
+        for dataset_name in dataset_names
+        if get_delta_dir(dataset_name=dataset_name).exists()
+        for obj in upl.get_file_keys(
+            base_dir=get_delta_dir(dataset_name=dataset_name), file_prefix=""
+        )
+    ]
+
+    return file_keys
+
+
+def get_books_details_dataset_names() -> list[str]:
+    """Get the names of the datasets the books details are split into.
+
+    :return: List of dataset names.
+    """
+    dataset_names = [
+        f"{BookDetailsConstants.FILE_PREFIX}_{table}"
+        for table in BookDetailsConstants.TABLES
+    ]
+
+    return dataset_names
+
+
+def get_change_capture_dataset_names() -> list[str]:
+    """Get the names of the datasets whose daily changes are captured.
+
+    :return: List of dataset names.
+    """
+    dataset_names = [
+        PopularListConstants.FILE_PREFIX,
+        BookConstants.FILE_PREFIX,
+        *get_books_details_dataset_names(),
+    ]
+
+    return dataset_names
+
+
+def get_parsed_filepaths(dataset_names: list[str]) -> list[Path]:
+    """Get paths to the files of the current date partitions of
+    the datasets and to their deltas.
+
+    :param dataset_names: Names of the datasets.
+    :return: List of filepaths.
+    """
+    filepaths = [
+        filepath
+        for dataset_name in dataset_names
+        for filepath in get_filepaths(
+            base_dir=get_partition_dir(dataset_name=dataset_name),
+            file_prefix=DatasetConstants.FILE_PREFIX,
+        )
+        + get_filepaths(
+            base_dir=get_delta_dir(dataset_name=dataset_name), file_prefix=""
+        )
+    ]
+
+    return filepaths
+
+
+def get_stages(upl: "Uploader") -> list[Stage]:
+    """Get the stages of the pipeline along with their dependencies,
+    inputs and outputs.
+
+    :param upl: An uploader to use.
+    :return: List of stages.
+    """
+    scraped_popular_lists = partial(
+        get_filepaths,
+        base_dir=BaseConstants.RAW_DATA_DIR,
+        file_prefix=PopularListConstants.FILE_PREFIX,
+    )
+    parsed_popular_lists = partial(
+        get_parsed_filepaths, dataset_names=[PopularListConstants.FILE_PREFIX]
+    )
+    scraped_books = partial(
+        get_filepaths,
+        base_dir=BaseConstants.RAW_DATA_DIR,
+        file_prefix=BookConstants.FILE_PREFIX,
+    )
+    parsed_books = partial(
+        get_parsed_filepaths, dataset_names=[BookConstants.FILE_PREFIX]
+    )
+    scraped_books_details = partial(
+        get_filepaths,
+        base_dir=BaseConstants.RAW_DATA_DIR,
         file_prefix=BookDetailsConstants.FILE_PREFIX,
     )
+    parsed_books_details = partial(
+        get_parsed_filepaths,
+        dataset_names=get_books_details_dataset_names(),
+    )
+
+    stages = [
+        Stage(
+            name="download_state",
+            func=partial(download_state, upl=upl),
+            cacheable=False,
+        ),
+        Stage(
+            name="scrape_popular_lists",
+            func=scrape_popular_lists,
+            deps=["download_state"],
+            outputs=scraped_popular_lists,
+        ),
+        Stage(
+            name="upload_scraped_popular_lists",
+            func=partial(upload_scraped_popular_lists, upl=upl),
+            deps=["scrape_popular_lists"],
+            inputs=scraped_popular_lists,
+        ),
+        Stage(
+            name="parse_popular_lists",
+            func=parse_popular_lists,
+            deps=["scrape_popular_lists"],
+            inputs=scraped_popular_lists,
+            outputs=parsed_popular_lists,
+        ),
+        Stage(
+            name="upload_parsed_popular_lists",
+            func=partial(upload_parsed_popular_lists, upl=upl),
+            deps=["parse_popular_lists"],
+            inputs=parsed_popular_lists,
+        ),
+        Stage(
+            name="scrape_books",
+            func=scrape_books,
+            deps=["parse_popular_lists"],
+            inputs=parsed_popular_lists,
+            outputs=scraped_books,
+        ),
+        Stage(
+            name="upload_scraped_books",
+            func=partial(upload_scraped_books, upl=upl),
+            deps=["scrape_books"],
+            inputs=scraped_books,
+        ),
+        Stage(
+            name="parse_books",
+            func=parse_books,
+            deps=["scrape_books"],
+            inputs=scraped_books,
+            outputs=parsed_books,
+        ),
+        Stage(
+            name="upload_parsed_books",
+            func=partial(upload_parsed_books, upl=upl),
+            deps=["parse_books"],
+            inputs=parsed_books,
+        ),
+        Stage(
+            name="scrape_books_details",
+            func=scrape_books_details,
+            deps=["parse_books"],
+            inputs=parsed_books,
+            outputs=scraped_books_details,
+        ),
+        Stage(
+            name="upload_scraped_books_details",
+            func=partial(upload_scraped_books_details, upl=upl),
+            deps=["scrape_books_details"],
+            inputs=scraped_books_details,
+        ),
+        Stage(
+            name="parse_books_details",
+            func=parse_books_details,
+            deps=["scrape_books_details"],
+            inputs=scraped_books_details,
+            outputs=parsed_books_details,
+        ),
+        Stage(
+            name="upload_parsed_books_details",
+            func=partial(upload_parsed_books_details, upl=upl),
+            deps=["parse_books_details"],
+            inputs=parsed_books_details,
+        ),
+        Stage(
+            name="upload_state",
+            func=partial(upload_state, upl=upl),
+            # The parsers write the parse cache and the change capture
+            # snapshots, so the state is uploaded only once all of them
+            # finished.
+            deps=[
+                "parse_popular_lists",
+                "parse_books",
+                "parse_books_details",
+            ],
+            cacheable=False,
+        ),
+    ]
+
+    if ArchiveConstants.MODE == ArchiveConstants.REPLAY:
+        # A replay runs offline, without the stages moving the data to
+        # and from the S3 bucket.
+        stages = [
+            stage
+            for stage in stages
+            if not stage.name.startswith(("download_", "upload_"))
+        ]
+        stage_names = {stage.name for stage in stages}
+
+        for stage in stages:
+            stage.deps = [dep for dep in stage.deps if dep in stage_names]
+
+    return stages
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse the command line flags.
+
+    :return: Parsed flags.
+    """
+    parser = argparse.ArgumentParser(
+        description="Scrape, parse, and upload Goodreads popular lists, "
+        "books, and their details."
+    )
+    parser.add_argument(
+        "targets",
+        nargs="*",
+        help="Stages to run along with their dependencies, all if none "
+        "are given.",
+    )
+    parser.add_argument(
+        "--list-stages",
+        action="store_true",
+        help="List the stages of the pipeline and exit.",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Run the stages even if their outputs are up to date.",
+    )
+    add_config_arguments(parser=parser)
 
-    uploader.upload_files(file_keys=books_details_file_keys)
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    uploader = Uploader()
+    from uploader.uploader import Uploader
+
+    configure_logging()
+
+    args = parse_args()
 
-    scrape_popular_lists()
-    upload_scraped_popular_lists(upl=uploader)
+    config = apply_config(config=load_config(args=args))
+    run_summary.record(section="config", **config)
+
+    deadline.start(budget=DeadlineConstants.TIME_BUDGET)
+
+    uploader = Uploader()
+    runner = DagRunner(stages=get_stages(upl=uploader))
 
-    parse_popular_lists()
-    upload_parsed_popular_lists(upl=uploader)
+    if args.list_stages:
+        print("\n".join(runner.stage_names))
+        sys.exit(0)
 
-    scrape_books()
-    upload_scraped_books(upl=uploader)
+    succeeded = runner.run(targets=args.targets, force=args.force)
 
-    parse_books()
-    upload_parsed_books(upl=uploader)
+    deadline.report()
 
-    scrape_books_details()
-    upload_scraped_books_details(upl=uploader)
+    if ArchiveConstants.MODE == ArchiveConstants.REPLAY:
+        run_summary.save()
+    else:
+        upload_stage_fingerprints(upl=uploader)
+        upload_run_summary(upl=uploader)
 
-    parse_books_details()
-    upload_parsed_books_details(upl=uploader)
+    sys.exit(0 if succeeded else 1)
@@ -1,28 +1,59 @@
-import gzip
+import hashlib
+import mmap
 import os
+import sys
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
-import pandas as pd
 from bs4 import BeautifulSoup
 from structlog import get_logger
 
+from common.codecs import decompress
 from common.constants import BaseConstants
+from common.deadline import deadline
+from common.parse_cache import ParseCache
+from common.run_summary import run_summary
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 class BaseParser:
+    # Modules outside the classes of the parser that its rows depend on,
+    # e.g. the extractor of the rows, by their names.
+    CACHE_DEPENDENCIES: tuple[str, ...] = ()
+
     def __init__(self, file_prefix: str) -> None:
         self.file_prefix = file_prefix
         self._pages = BaseConstants.PAGES
+        self._parse_cache = ParseCache()
+        self._cache_namespace = self._get_cache_namespace()
         self._logger = get_logger(__name__)
 
-    @staticmethod
-    def _make_current_date_dir(base_dir: Path) -> None:
-        """Create a current date directory in the processed data path.
+    def _get_cache_namespace(self) -> str:
+        """Get the namespace of the cached parse results. It changes
+        with the code of the parser and of the modules it depends on,
+        and with the base URL the rows contain, so the results of an
+        older parser are never reused.
 
-        :param base_dir: Base directory of the current date.
-        :return: None.
+        :return: Namespace of the parser.
         """
-        os.makedirs(base_dir, exist_ok=True)
+        digest = hashlib.sha1(BaseConstants.BASE_URL.encode())
+        module_names = dict.fromkeys(
+            [cls.__module__ for cls in type(self).__mro__[:-1]]
+            + list(self.CACHE_DEPENDENCIES)
+        )
+
+        for module_name in module_names:
+            module = sys.modules[module_name]
+            digest.update(Path(module.__file__).read_bytes())
+
+        namespace = f"{self.file_prefix}:{digest.hexdigest()}"
+
+        return namespace
 
     def _get_raw_filepath(self, page: int) -> Path:
         """Get a path to the file to parse.
@@ -36,19 +67,6 @@ class BaseParser:
 
         return raw_filepath
 
-    def _get_processed_filepath(self) -> Path:
-        """Get a path to the file to save data.
-
-        :return: Path to the file.
-        """
-        self._make_current_date_dir(base_dir=BaseConstants.PROCESSED_DATA_DIR)
-
-        processed_filepath = BaseConstants.PROCESSED_DATA_DIR.joinpath(
-            f"{self.file_prefix}.parquet.gz"
-        )
-
-        return processed_filepath
-
     def _get_filepaths(self, data_dir: Path) -> list[Path]:
         """Get a list of filepaths from the specified directory.
 
@@ -66,39 +84,257 @@ class BaseParser:
         return filepaths
 
     @staticmethod
-    def _read_html_data(filepath: Path) -> str | None:
-        """Read the HTML data from the specified filepath.
+    def _read_html_data(filepath: Path) -> bytes | None:
+        """Read the HTML data from the specified filepath. The file is
+        memory-mapped and decompressed straight from the mapping, the
+        codec is detected from the file content.
 
         :param filepath: Path to read the HTML data from.
         :return: HTML data.
         """
-        if not filepath.exists():
+        if not filepath.exists() or not filepath.stat().st_size:
             return None
 
-        with gzip.open(filename=filepath, mode="rt") as f:
-            html_data = f.read()
+        with (
+            open(filepath, mode="rb") as f,
+            mmap.mmap(f.fileno(), length=0, access=mmap.ACCESS_READ) as mm,
+        ):
+            html_data = decompress(mm)
 
         return html_data
 
     @staticmethod
-    def get_soup(html_data: str) -> BeautifulSoup:
-        """Get the BeautifulSoup object from the HTML data.
+    def _get_content_hash(html_data: bytes) -> str:
+        """Get a hash of the page content the parsed rows depend on.
+
+        :param html_data: HTML data to hash.
+        :return: Hash of the content.
+        """
+        content_hash = hashlib.sha1(html_data).hexdigest()
+
+        return content_hash
+
+    def _parse_file(
+        self, parse_func: Callable[[bytes], Any], raw_filepath: Path
+    ) -> tuple[str | None, Any, bool, float]:
+        """Parse a file, or get its rows from the parse cache if a page
+        with the same content has been parsed before.
+
+        :param parse_func: Function parsing the HTML data.
+        :param raw_filepath: Path to the file to parse.
+        :return: Hash of the page content, the parsed rows, whether
+            they come from the cache, and the CPU time of parsing them.
+        """
+        html_data = self._read_html_data(filepath=raw_filepath)
+
+        if html_data is None:
+            return None, None, False, 0.0
+
+        content_hash = self._get_content_hash(html_data=html_data)
+        parsed_data = self._parse_cache.get(
+            namespace=self._cache_namespace, content_hash=content_hash
+        )
+
+        if parsed_data is not None:
+            return content_hash, parsed_data, True, 0.0
+
+        start = time.process_time()
+        parsed_data = parse_func(html_data)
+        cpu_time = time.process_time() - start
+
+        return content_hash, parsed_data, False, cpu_time
+
+    def _parse_files(
+        self,
+        parse_func: Callable[[bytes], Any],
+        on_parsed: Callable[[Any, float], None] | None = None,
+    ) -> Iterator:
+        """Parse the raw files of the current date in worker processes,
+        reusing the cached rows of the unchanged pages. The rows of the
+        parsed pages are added to the cache afterwards.
+
+        :param parse_func: Function parsing the HTML data of a page.
+        :param on_parsed: Function called with the rows and the CPU time
+            of each page parsed rather than taken from the cache.
+        :return: Parsed rows of each file.
+        """
+        raw_filepaths = self._get_filepaths(
+            data_dir=BaseConstants.RAW_DATA_DIR
+        )
+        new_entries = {}
+        used_hashes = []
+        parsed_files = 0
+
+        with ProcessPoolExecutor(
+            max_workers=BaseConstants.MAX_WORKERS
+        ) as executor:
+            futures = {
+                executor.submit(
+                    self._parse_file, parse_func, raw_filepath
+                ): raw_filepath
+                for raw_filepath in raw_filepaths
+            }
+
+            for future in as_completed(futures):
+                raw_filepath = futures.get(future)
+                filename = raw_filepath.name
+
+                try:
+                    content_hash, parsed_data, is_cached, cpu_time = (
+                        future.result()
+                    )
+                except Exception as exc:
+                    self._logger.error(
+                        "An exception occurred while parsing",
+                        filename=filename,
+                        error=exc,
+                    )
+                    continue
+
+                if parsed_data is None:
+                    continue
+
+                if is_cached:
+                    used_hashes.append(content_hash)
+                else:
+                    new_entries[content_hash] = parsed_data
+                    parsed_files += 1
+
+                    if on_parsed is not None:
+                        on_parsed(parsed_data, cpu_time)
+
+                yield parsed_data
+
+        self._parse_cache.update(
+            namespace=self._cache_namespace,
+            entries=new_entries,
+            used_hashes=used_hashes,
+        )
+
+        self._logger.info(
+            "Reused the cached rows of the unchanged files",
+            reused=len(used_hashes),
+            files=len(raw_filepaths),
+        )
+        run_summary.record(
+            section="parse_cache",
+            **{
+                self.file_prefix: {
+                    "hits": len(used_hashes),
+                    "misses": parsed_files,
+                }
+            },
+        )
+
+    @staticmethod
+    def get_soup(html_data: bytes | memoryview) -> BeautifulSoup:
+        """Get the BeautifulSoup object from the HTML data. The pages
+        are always UTF-8, so the encoding detection is skipped.
 
         :param html_data: HTML data.
         :return: BeautifulSoup object.
         """
-        soup = BeautifulSoup(markup=html_data, features="html.parser")
+        if isinstance(html_data, memoryview):
+            html_data = html_data.tobytes()
+
+        soup = BeautifulSoup(
+            markup=html_data, features="html.parser", from_encoding="utf-8"
+        )
 
         return soup
 
     @staticmethod
-    def _save_to_parquet(data: list[dict], filepath: Path) -> None:
-        """Save the parsed data into a parquet file.
+    def _to_numeric(
+        df: "pd.DataFrame", numeric_columns: dict[str, str]
+    ) -> None:
+        """Convert the text columns, e.g. '1,234 voters' or '4.28 avg
+        rating', to the numbers they contain.
+
+        :param df: DataFrame to convert the columns of in place.
+        :param numeric_columns: Data types by the column names.
+        :return: None.
+        """
+        import pandas as pd
+
+        for column, dtype in numeric_columns.items():
+            numbers = (
+                df[column]
+                .astype("string")
+                .str.extract(r"(\d[\d,]*(?:\.\d+)?)", expand=False)
+                .str.replace(",", "", regex=False)
+            )
+
+            df[column] = pd.to_numeric(numbers).astype(dtype)
+
+    def _save_to_dataset(
+        self,
+        data: list[dict],
+        numeric_columns: dict[str, str] | None = None,
+        dataset_name: str | None = None,
+        stream: bool = False,
+        key_columns: list[str] | None = None,
+        is_partial: bool = False,
+    ) -> None:
+        """Save the parsed data as the current date partition of the
+        dataset, along with its changes since the previous run. pandas
+        is imported here rather than at the module level, so the parse
+        workers, which only need BeautifulSoup, do not load it.
 
         :param data: Data to save.
-        :param filepath: Path to save the data to.
+        :param numeric_columns: Data types of the text columns to
+            convert to numbers by their names.
+        :param dataset_name: Name of the dataset, the file prefix if
+            not specified.
+        :param stream: Whether to stream the partition straight to S3
+            instead of writing it to the local disk.
+        :param key_columns: Columns identifying a row across runs, the
+            first of which the partition is indexed by. The changes are
+            not captured if not specified.
+        :param is_partial: Whether the data holds only a part of the
+            rows of the dataset, so the missing keys are not deleted.
         :return: None.
         """
+        import pandas as pd
+
+        from common.change_capture import ChangeCapture
+        from common.parquet_dataset import ParquetDataset
+
         df = pd.DataFrame(data=data)
 
-        df.to_parquet(filepath, engine="pyarrow", compression="gzip")
+        if numeric_columns and not df.empty:
+            self._to_numeric(df=df, numeric_columns=numeric_columns)
+
+        dataset = ParquetDataset(name=dataset_name or self.file_prefix)
+        index_column = key_columns[0] if key_columns else None
+
+        if stream:
+            from uploader.uploader import Uploader
+
+            dataset.stream(
+                df=df,
+                open_file=Uploader().open_stream,
+                index_column=index_column,
+            )
+        else:
+            dataset.write(df=df, index_column=index_column)
+
+        if key_columns:
+            # A scrape cut short by the time budget misses some rows,
+            # which are not deleted.
+            change_capture = ChangeCapture(
+                name=dataset.name,
+                key_columns=key_columns,
+                is_partial=is_partial
+                or deadline.is_cut_short(file_prefix=self.file_prefix),
+            )
+            manifest = change_capture.capture(df=df)
+
+            run_summary.record(
+                section="changes",
+                **{
+                    dataset.name: {
+                        kind: change["rows"]
+                        for kind, change in manifest["changes"].items()
+                    }
+                },
+            )
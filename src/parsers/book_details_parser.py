@@ -1,36 +1,95 @@
+import hashlib
 import json
+import re
 import time
-from concurrent.futures import ProcessPoolExecutor, as_completed
-from pathlib import Path
+from collections import Counter
 from string import punctuation
 from typing import Any
 
-
-from common.constants import BaseConstants, BookDetailsConstants
+from common.constants import (
+    BookDetailsConstants,
+    DatasetConstants,
+    PredicateConstants,
+)
+from common.run_summary import run_summary
 from parsers.base_parser import BaseParser
+from parsers.book_details_predicates import BookDetailsPredicates
 
 
 class BookDetailsParser(BaseParser):
-    def __init__(self) -> None:
+    NEXT_DATA_PATTERN = re.compile(
+        rb'<script id="__NEXT_DATA__"[^>]*>(.*?)</script>', flags=re.DOTALL
+    )
+
+    def __init__(
+        self, predicates: BookDetailsPredicates | None = None
+    ) -> None:
+        """Create the parser.
+
+        :param predicates: Predicates the pages must pass to be parsed,
+            the ones set up from the constants if not specified.
+        """
+        self._predicates = predicates or BookDetailsPredicates()
         super().__init__(file_prefix=BookDetailsConstants.FILE_PREFIX)
 
-    @staticmethod
-    def extract_data(json_data: dict[str, Any], key_prefix: str) -> list[Any]:
-        """Extract data from JSON by specified key prefix.
+    def _get_cache_namespace(self) -> str:
+        """Get the namespace of the cached parse results, which also
+        changes with the predicates, as the rejections are cached too.
+
+        :return: Namespace of the parser.
+        """
+        namespace = (
+            f"{super()._get_cache_namespace()}:"
+            f"{self._predicates.get_fingerprint()}"
+        )
+
+        return namespace
+
+    def _get_content_hash(self, html_data: bytes) -> str:
+        """Get a hash of the '__NEXT_DATA__' payload, which all the rows
+        come from, so that changes in the page markup are ignored.
 
-        :param json_data: JSON data from which to extract data.
-        :param key_prefix: Key prefix to use.
-        :return: List of extracted data.
+        :param html_data: HTML data to hash.
+        :return: Hash of the content.
         """
-        extracted_data = []
+        match = self.NEXT_DATA_PATTERN.search(html_data)
+
+        if match is None:
+            return super()._get_content_hash(html_data=html_data)
+
+        content_hash = hashlib.sha1(match.group(1)).hexdigest()
+
+        return content_hash
+
+    @staticmethod
+    def extract_entities(
+        apollo_state: dict[str, Any], typename: str
+    ) -> dict[str, dict[str, Any]]:
+        """Extract the entities of a type from the Apollo state.
+
+        :param apollo_state: Apollo state of the page.
+        :param typename: Type of the entities, e.g. 'Book'.
+        :return: Entities by their Apollo keys, e.g. 'Book:kca://...'.
+        """
+        entities = {
+            key: value
+            for key, value in apollo_state.items()
+            if key.startswith(f"{typename}:") and isinstance(value, dict)
+        }
+
+        return entities
+
+    @staticmethod
+    def get_ref(value: Any) -> str | None:
+        """Get the Apollo key a value refers to.
 
-        for key, value in json_data.items():
-            if key.startswith(key_prefix) and isinstance(value, dict):
-                extracted_data.append(value)
-            elif key.startswith(key_prefix) and isinstance(value, list):
-                extracted_data += value
+        :param value: Value to get the reference of.
+        :return: Apollo key, None if the value is not a reference.
+        """
+        if isinstance(value, dict):
+            return value.get("__ref")
 
-        return extracted_data
+        return None
 
     @staticmethod
     def normalize_attr(attr: str, attrs_map: dict[str, str] = None) -> str:
@@ -57,256 +116,337 @@ class BookDetailsParser(BaseParser):
 
         return normalized_attr
 
-    def normalize_data(
+    def flatten_entity(
         self,
-        data: list[dict] | dict[str, Any],
-        attrs_to_skip: list[str] = None,
-        attrs_map: dict[str, str] = None,
-    ) -> list[dict]:
-        """Normalize data by removing unnecessary attribute values.
-
-        :param data: Data to normalize.
+        entity: dict[str, Any],
+        attrs_to_skip: list[str] | None = None,
+        attrs_map: dict[str, str] | None = None,
+        prefix: str = "",
+    ) -> dict[str, Any]:
+        """Flatten an entity into a row of scalar columns. Nested
+        objects become prefixed columns, references to other entities
+        become '<attr>_id' columns with their Apollo keys, and lists are
+        kept as JSON.
+
+        :param entity: Entity to flatten.
         :param attrs_to_skip: List of attributes to skip.
         :param attrs_map: Attribute mapping for complex cases.
-        :return: Normalized data.
+        :param prefix: Prefix of the column names.
+        :return: Flattened entity.
         """
-        if not data:
-            return []
-
-        if isinstance(data, dict):
-            data = [data]
-
-        if attrs_to_skip is None:
-            attrs_to_skip = []
+        attrs_to_skip = attrs_to_skip or []
+        row = {}
 
-        normalized_data = []
+        for attr, value in entity.items():
+            if attr in attrs_to_skip or attr == "__typename":
+                continue
 
-        for value in data:
-            if not isinstance(value, dict):
-                normalized_data.append(value)
+            column = f"{prefix}{self.normalize_attr(attr, attrs_map)}"
+
+            if (ref := self.get_ref(value=value)) is not None:
+                row[f"{column}_id"] = ref
+            elif isinstance(value, dict):
+                row |= self.flatten_entity(
+                    entity=value,
+                    attrs_to_skip=attrs_to_skip,
+                    attrs_map=attrs_map,
+                    prefix=f"{column}_",
+                )
+            elif isinstance(value, list):
+                # Every list is JSON, even an empty one or one of
+                # scalars, so that a column has one type in all rows.
+                row[column] = json.dumps(value, ensure_ascii=False)
             else:
-                normalized_value = {}
-
-                for attr, attr_value in value.items():
-                    if attr in attrs_to_skip:
-                        continue
-
-                    normalized_attr = self.normalize_attr(
-                        attr=attr, attrs_map=attrs_map
-                    )
-
-                    if isinstance(attr_value, dict):
-                        normalized_value[normalized_attr] = (
-                            self.normalize_data(
-                                data=attr_value,
-                                attrs_to_skip=attrs_to_skip,
-                                attrs_map=attrs_map,
-                            )[0]
-                        )
-                    elif isinstance(attr_value, list):
-                        normalized_value[normalized_attr] = (
-                            self.normalize_data(
-                                data=attr_value,
-                                attrs_to_skip=attrs_to_skip,
-                                attrs_map=attrs_map,
-                            )
-                        )
-                    else:
-                        normalized_value[normalized_attr] = attr_value
-
-                normalized_data.append(normalized_value)
-
-        return normalized_data
-
-    @staticmethod
-    def filter_by_genres(data: list[dict], genre_prefix: str = "rus") -> bool:
-        """Filter data by unwanted genres.
-
-        :param data: Data to filter.
-        :param genre_prefix: The genre prefix filter by.
-        :return: True if data needs to be filtered,
-            otherwise False if not.
-        """
-        for value in data:
-            book_genres = value.get("book_genres")
+                row[column] = value
 
-            if not book_genres:
-                return True
+        return row
 
-            for inner_value in book_genres:
-                genre_name = inner_value.get("genre", {}).get("name")
+    def get_book_links(
+        self, book_id: str, book: dict[str, Any]
+    ) -> dict[str, list[dict]]:
+        """Get the rows that link a book to its contributors, series and
+        genres.
 
-                if genre_name.lower().startswith(genre_prefix):
-                    return True
-
-        return False
-
-    def parse_book_details(self, raw_filepath: Path) -> dict[str, Any]:
-        """Parse a book details from the specified files.
-
-        :param raw_filepath: Path to the file to parse.
-        :return: Book details.
+        :param book_id: Apollo key of the book.
+        :param book: Book entity.
+        :return: Rows of the link tables by their names.
         """
-        html_data = self._read_html_data(filepath=raw_filepath)
-        soup = self.get_soup(html_data=html_data)
-
-        book_title_tag = soup.find(
-            name="h1", attrs={"data-testid": "bookTitle"}
-        )
-        book_title = None
+        contributor_edges = [book.get("primaryContributorEdge")]
+        contributor_edges += book.get("secondaryContributorEdges") or []
+
+        book_contributors = [
+            {
+                "book_id": book_id,
+                "contributor_id": self.get_ref(value=edge.get("node")),
+                "role": edge.get("role"),
+                "position": position,
+            }
+            for position, edge in enumerate(contributor_edges)
+            if edge and self.get_ref(value=edge.get("node"))
+        ]
+
+        book_series = [
+            {
+                "book_id": book_id,
+                "series_id": self.get_ref(value=item.get("series")),
+                "user_position": item.get("userPosition"),
+            }
+            for item in book.get("bookSeries") or []
+            if self.get_ref(value=item.get("series"))
+        ]
+
+        book_genres = [
+            {
+                "book_id": book_id,
+                "genre_name": (item.get("genre") or {}).get("name"),
+                "genre_web_url": (item.get("genre") or {}).get("webUrl"),
+                "position": position,
+            }
+            for position, item in enumerate(book.get("bookGenres") or [])
+        ]
 
-        if book_title_tag:
-            book_title = book_title_tag.text.strip()
+        book_links = {
+            "book_contributors": book_contributors,
+            "book_series": book_series,
+            "book_genres": book_genres,
+        }
 
-        name_tag = soup.find(name="span", attrs={"data-testid": "name"})
-        name = None
+        return book_links
 
-        if name_tag:
-            name = name_tag.text.strip()
+    def get_apollo_state(self, html_data: bytes) -> dict[str, Any]:
+        """Get the Apollo state from the '__NEXT_DATA__' payload of
+        a page. The payload is found by a pattern, the BeautifulSoup
+        tree of the page is only built if the pattern misses it.
 
-        next_data_tag = soup.find(
-            name="script",
-            attrs={"id": "__NEXT_DATA__", "type": "application/json"},
-        )
-        next_data_json = json.loads(next_data_tag.text)
+        :param html_data: HTML data of the page.
+        :return: Apollo state of the page.
+        """
+        match = self.NEXT_DATA_PATTERN.search(html_data)
+
+        if match is not None:
+            next_data = match.group(1)
+        else:
+            soup = self.get_soup(html_data=html_data)
+            next_data = soup.find(
+                name="script",
+                attrs={"id": "__NEXT_DATA__", "type": "application/json"},
+            ).text
+
+        next_data_json = json.loads(next_data)
         props = next_data_json.get("props")
         page_props = props.get("pageProps")
         apollo_state = page_props.get("apolloState")
-        root_query = apollo_state.get("ROOT_QUERY")
 
-        extracted_social_signals = self.extract_data(
-            json_data=root_query, key_prefix="getSocialSignals"
-        )
-        normalized_social_signals = self.normalize_data(
-            data=extracted_social_signals, attrs_to_skip=["imageUrlSquare"]
-        )
+        return apollo_state
 
-        extracted_contributors = self.extract_data(
-            json_data=apollo_state, key_prefix="Contributor"
-        )
-        normalized_contributors = self.normalize_data(
-            data=extracted_contributors, attrs_to_skip=["profileImageUrl"]
-        )
+    def parse_book_details(self, html_data: bytes) -> dict[str, list[dict]]:
+        """Parse a book details from the HTML data of a page into the
+        rows of the books details tables. The entities are identified
+        by their Apollo keys, which the references between them use too.
+        A page the predicates reject is not normalized at all.
 
-        extracted_series = self.extract_data(
-            json_data=apollo_state, key_prefix="Series"
-        )
-        normalized_series = self.normalize_data(data=extracted_series)
+        :param html_data: HTML data of the page.
+        :return: Rows of the tables by their names, or the name of the
+            predicate that rejected the page.
+        """
+        apollo_state = self.get_apollo_state(html_data=html_data)
 
-        extracted_book = self.extract_data(
-            json_data=apollo_state, key_prefix="Book"
-        )
-        normalized_book = self.normalize_data(
-            data=extracted_book,
-            attrs_to_skip=[
-                'description({"stripped":true})',
-                "featureFlags",
-                "imageUrl",
-            ],
-            attrs_map={"links({})": "links"},
-        )
+        rejected_by = self._predicates.get_rejection(apollo_state=apollo_state)
 
-        need_to_filter = self.filter_by_genres(data=normalized_book)
+        if rejected_by is not None:
+            return {PredicateConstants.REJECTED_BY: rejected_by}
 
-        if need_to_filter:
-            return {}
+        root_query = apollo_state.get("ROOT_QUERY")
 
-        extracted_work = self.extract_data(
-            json_data=apollo_state, key_prefix="Work"
-        )
-        normalized_work = self.normalize_data(
-            data=extracted_work,
-            attrs_map={
-                'questions({"pagination":{"limit":1}})': "questions",
-                'quotes({"pagination":{"limit":1}})': "quotes",
-                'topics({"pagination":{"limit":1}})': "topics",
-            },
+        books = self.extract_entities(
+            apollo_state=apollo_state, typename="Book"
         )
 
-        extracted_users = self.extract_data(
-            json_data=apollo_state, key_prefix="User"
-        )
-        normalized_users = self.normalize_data(
-            data=extracted_users, attrs_to_skip=["imageUrlSquare"]
+        tables = {table: [] for table in BookDetailsConstants.TABLES}
+
+        for book_id, book in books.items():
+            book_links = self.get_book_links(book_id=book_id, book=book)
+
+            for table, rows in book_links.items():
+                tables[table] += rows
+
+            tables["books"].append(
+                self.flatten_entity(
+                    entity=book,
+                    attrs_to_skip=[
+                        'description({"stripped":true})',
+                        "featureFlags",
+                        "imageUrl",
+                        "primaryContributorEdge",
+                        "secondaryContributorEdges",
+                        "bookSeries",
+                        "bookGenres",
+                    ],
+                    attrs_map={"links({})": "links"},
+                )
+                | {"id": book_id}
+            )
+
+        # The page is about the book the root query fetched, the social
+        # signals, e.g. the number of people reading it, belong to it.
+        main_book_id = next(
+            (
+                self.get_ref(value=value)
+                for key, value in root_query.items()
+                if key.startswith("getBookByLegacyId")
+            ),
+            next(iter(books), None),
         )
 
-        extracted_reviews = self.extract_data(
-            json_data=apollo_state, key_prefix="Review"
-        )
-        normalized_reviews = self.normalize_data(data=extracted_reviews)
-
-        book_details = {
-            "book_title": book_title,
-            "name": name,
-            "social_signals": normalized_social_signals,
-            "contributors": normalized_contributors,
-            "series": normalized_series,
-            "book": normalized_book,
-            "work": normalized_work,
-            "users": normalized_users,
-            "reviews": normalized_reviews,
-        }
+        for key, value in root_query.items():
+            if not key.startswith("getSocialSignals"):
+                continue
 
-        return book_details
+            for social_signal in value if isinstance(value, list) else [value]:
+                tables["social_signals"].append(
+                    {
+                        "book_id": main_book_id,
+                        "name": social_signal.get("name"),
+                        "count": social_signal.get("count"),
+                    }
+                )
+
+        for table, typename, attrs_to_skip, attrs_map in (
+            (
+                "works",
+                "Work",
+                [],
+                {
+                    'questions({"pagination":{"limit":1}})': "questions",
+                    'quotes({"pagination":{"limit":1}})': "quotes",
+                    'topics({"pagination":{"limit":1}})': "topics",
+                },
+            ),
+            ("contributors", "Contributor", ["profileImageUrl"], None),
+            ("series", "Series", [], None),
+            ("users", "User", ["imageUrlSquare"], None),
+            ("reviews", "Review", [], None),
+        ):
+            entities = self.extract_entities(
+                apollo_state=apollo_state, typename=typename
+            )
+
+            tables[table] += [
+                self.flatten_entity(
+                    entity=entity,
+                    attrs_to_skip=attrs_to_skip,
+                    attrs_map=attrs_map,
+                )
+                | {"id": key}
+                for key, entity in entities.items()
+            ]
+
+        return tables
+
+    def parse_books_details(self) -> dict[str, list[dict]]:
+        """Parse books details from the specified files. The rows of
+        the entities shared between the books, e.g. users, are kept
+        once per key.
+
+        :return: Rows of the books details tables by their names.
+        """
+        parsed_books_details = {
+            table: {} for table in BookDetailsConstants.TABLES
+        }
 
-    def parse_books_details(self) -> list[dict]:
-        """Parse books details from the specified files.
+        rejections = Counter()
+        cpu_times = {"accepted": [], "rejected": []}
 
-        :return: List of books details.
-        """
-        raw_filepaths = self._get_filepaths(
-            data_dir=BaseConstants.RAW_DATA_DIR
-        )
-        parsed_books_details = []
+        def on_parsed(parsed_book_details: dict, cpu_time: float) -> None:
+            is_rejected = PredicateConstants.REJECTED_BY in parsed_book_details
+            cpu_times["rejected" if is_rejected else "accepted"].append(
+                cpu_time
+            )
 
         start = time.perf_counter()
+        self._logger.info("Parsing books details have been started")
+
+        for parsed_book_details in self._parse_files(
+            parse_func=self.parse_book_details, on_parsed=on_parsed
+        ):
+            if rejected_by := parsed_book_details.get(
+                PredicateConstants.REJECTED_BY
+            ):
+                rejections[rejected_by] += 1
+                continue
+
+            for table, rows in parsed_book_details.items():
+                key_columns = BookDetailsConstants.TABLES[table]
+
+                for row in rows:
+                    key = tuple(row.get(column) for column in key_columns)
+                    parsed_books_details[table][key] = row
+
+        end = time.perf_counter()
         self._logger.info(
-            f"Parsing books details of '{len(raw_filepaths)}' items "
-            f"have been started"
+            "Parsing books details finished", seconds=round(end - start, 3)
         )
 
-        with ProcessPoolExecutor(
-            max_workers=BaseConstants.MAX_WORKERS
-        ) as executor:
-            futures = {
-                executor.submit(
-                    self.parse_book_details, raw_filepath
-                ): raw_filepath
-                for raw_filepath in raw_filepaths
-            }
-
-            for future in as_completed(futures):
-                raw_filepath = futures.get(future)
-                filename = raw_filepath.name
+        self._report_rejections(rejections=rejections, cpu_times=cpu_times)
 
-                try:
-                    parsed_book_details = future.result()
+        return {
+            table: list(rows.values())
+            for table, rows in parsed_books_details.items()
+        }
 
-                    if not parsed_book_details:
-                        continue
+    def _report_rejections(
+        self, rejections: Counter, cpu_times: dict[str, list[float]]
+    ) -> None:
+        """Record the pages the predicates rejected and the CPU time
+        they saved in the run summary. A rejected page would have cost
+        as much as an accepted one of this run, so the saving is the
+        difference of their mean CPU times for each rejected page that
+        was parsed rather than taken from the cache.
+
+        :param rejections: Number of the rejected pages by the names of
+            the predicates that rejected them.
+        :param cpu_times: CPU times of the parsed pages, accepted and
+            rejected.
+        :return: None.
+        """
+        accepted, rejected = cpu_times["accepted"], cpu_times["rejected"]
+        cpu_saved = None
 
-                    parsed_books_details.append(parsed_book_details)
-                except Exception as exc:
-                    self._logger.error(
-                        f"An exception occurred while parsing '{filename}' "
-                        f"due to '{exc}'"
-                    )
+        if accepted and rejected:
+            mean_accepted = sum(accepted) / len(accepted)
+            mean_rejected = sum(rejected) / len(rejected)
+            cpu_saved = max(
+                0.0, (mean_accepted - mean_rejected) * len(rejected)
+            )
 
-        end = time.perf_counter()
         self._logger.info(
-            f"Parsing books details took {end - start:.3f} seconds"
+            "Predicates rejected books details pages",
+            pages=rejections.total(),
+            cpu_seconds_saved=round(cpu_saved or 0, 3),
+        )
+        run_summary.record(
+            section="predicates",
+            rejected=dict(rejections),
+            cpu_seconds={
+                "accepted": round(sum(accepted), 3),
+                "rejected": round(sum(rejected), 3),
+                "saved": None if cpu_saved is None else round(cpu_saved, 3),
+            },
         )
-
-        return parsed_books_details
 
     def save_books_details(self) -> None:
-        """Save the books details to the specified file.
+        """Save each of the books details tables to its dataset.
 
         :return: None.
         """
         parsed_books_details = self.parse_books_details()
-        processed_filepath = self._get_processed_filepath()
 
-        self._save_to_parquet(
-            data=parsed_books_details, filepath=processed_filepath
-        )
+        for table, rows in parsed_books_details.items():
+            self._save_to_dataset(
+                data=rows,
+                dataset_name=f"{self.file_prefix}_{table}",
+                stream=DatasetConstants.STREAM_BOOKS_DETAILS,
+                key_columns=BookDetailsConstants.TABLES[table],
+                # Only the books due for re-scraping are parsed.
+                is_partial=True,
+            )
@@ -0,0 +1,157 @@
+import hashlib
+import json
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from common.constants import PredicateConstants
+
+# Predicate on a book entity and the Apollo state of its page, True if
+# the book is wanted.
+BookPredicate = Callable[[dict[str, Any], dict[str, Any]], bool]
+
+
+class BookDetailsPredicates:
+    """Predicates the books of a details page must pass for the page to
+    be parsed. They run on the raw Apollo state, before any of its
+    entities are normalized, so a rejected page costs little more than
+    decoding its JSON.
+
+    The built-in predicates are set up from the constants and the ones
+    turned off are left out. More predicates can be passed by name.
+    """
+
+    def __init__(
+        self,
+        excluded_genre_prefixes: list[str] | None = None,
+        language: str | None = None,
+        min_ratings: int | None = None,
+        predicates: dict[str, BookPredicate] | None = None,
+    ) -> None:
+        """Create the predicates.
+
+        :param excluded_genre_prefixes: Genre prefixes of the unwanted
+            books, the constants ones if not specified.
+        :param language: Language of the wanted books, the constants
+            one if not specified.
+        :param min_ratings: Minimum number of ratings of the wanted
+            books, the constants one if not specified.
+        :param predicates: Additional predicates by their names.
+        """
+        if excluded_genre_prefixes is None:
+            excluded_genre_prefixes = (
+                PredicateConstants.EXCLUDED_GENRE_PREFIXES
+            )
+
+        self.excluded_genre_prefixes = tuple(
+            prefix.lower() for prefix in excluded_genre_prefixes
+        )
+        self.language = (language or PredicateConstants.LANGUAGE or "").lower()
+        self.min_ratings = (
+            PredicateConstants.MIN_RATINGS
+            if min_ratings is None
+            else min_ratings
+        )
+
+        self.predicates: dict[str, BookPredicate] = {
+            "genres": self.has_wanted_genres
+        }
+
+        if self.language:
+            self.predicates["language"] = self.has_wanted_language
+
+        if self.min_ratings > 0:
+            self.predicates["ratings"] = self.has_enough_ratings
+
+        self.predicates |= predicates or {}
+
+    def get_fingerprint(self) -> str:
+        """Get a fingerprint of the predicates and their settings, which
+        the cached results of the rejected pages depend on.
+
+        :return: Fingerprint of the predicates.
+        """
+        digest = hashlib.sha1(Path(__file__).read_bytes())
+        digest.update(
+            json.dumps(
+                [
+                    list(self.predicates),
+                    self.excluded_genre_prefixes,
+                    self.language,
+                    self.min_ratings,
+                ]
+            ).encode()
+        )
+
+        return digest.hexdigest()
+
+    def has_wanted_genres(
+        self, book: dict[str, Any], apollo_state: dict[str, Any]
+    ) -> bool:
+        """Tell whether a book has genres and none of them is unwanted.
+        Genres without a name are ignored.
+
+        :param book: Book entity.
+        :param apollo_state: Apollo state of the page.
+        :return: True if the book is wanted.
+        """
+        book_genres = book.get("bookGenres") or []
+
+        if not book_genres:
+            return False
+
+        for item in book_genres:
+            genre_name = ((item or {}).get("genre") or {}).get("name") or ""
+
+            if genre_name.lower().startswith(self.excluded_genre_prefixes):
+                return False
+
+        return True
+
+    def has_wanted_language(
+        self, book: dict[str, Any], apollo_state: dict[str, Any]
+    ) -> bool:
+        """Tell whether a book is in the wanted language. Books of an
+        unknown language are kept.
+
+        :param book: Book entity.
+        :param apollo_state: Apollo state of the page.
+        :return: True if the book is wanted.
+        """
+        details = book.get("details") or {}
+        language = (details.get("language") or {}).get("name")
+
+        return language is None or language.lower() == self.language
+
+    def has_enough_ratings(
+        self, book: dict[str, Any], apollo_state: dict[str, Any]
+    ) -> bool:
+        """Tell whether a book has enough ratings, which the stats of
+        its work hold.
+
+        :param book: Book entity.
+        :param apollo_state: Apollo state of the page.
+        :return: True if the book is wanted.
+        """
+        work_id = (book.get("work") or {}).get("__ref")
+        stats = (apollo_state.get(work_id) or {}).get("stats") or {}
+
+        return (stats.get("ratingsCount") or 0) >= self.min_ratings
+
+    def get_rejection(self, apollo_state: dict[str, Any]) -> str | None:
+        """Evaluate the predicates on the books of a page, stopping at
+        the first one that fails.
+
+        :param apollo_state: Apollo state of the page.
+        :return: Name of the predicate that rejected the page, None if
+            the page is wanted.
+        """
+        for key, book in apollo_state.items():
+            if not key.startswith("Book:") or not isinstance(book, dict):
+                continue
+
+            for name, predicate in self.predicates.items():
+                if not predicate(book, apollo_state):
+                    return name
+
+        return None
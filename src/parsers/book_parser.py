@@ -1,57 +1,66 @@
 import re
 import time
-from concurrent.futures import ProcessPoolExecutor, as_completed
-from pathlib import Path
-
 
 from common.constants import BaseConstants, BookConstants
 from parsers.base_parser import BaseParser
+from parsers.html_extractor import RowExtractor
 
 
 class BookParser(BaseParser):
+    SCORE_PATTERN = re.compile(r"^score:")
+    PEOPLE_VOTED_PATTERN = re.compile(r"people voted$")
+    CACHE_DEPENDENCIES = ("parsers.html_extractor",)
+
     def __init__(self) -> None:
         super().__init__(file_prefix=BookConstants.FILE_PREFIX)
 
-    def parse_books(self, raw_filepath: Path) -> list[dict]:
-        """Parse the books from the specified file.
+    @staticmethod
+    def is_book_row(tag: str, attrs: dict[str, str | None]) -> bool:
+        """Tell whether an element is the table row of a book, which
+        has the bare 'itemscope' attribute.
 
-        :param raw_filepath: Path to the file to parse.
-        :return: List of books.
+        :param tag: Name of the element.
+        :param attrs: Attributes of the element.
+        :return: True if the element is a book row.
         """
-        html_data = self._read_html_data(filepath=raw_filepath)
-        soup = self.get_soup(html_data=html_data)
+        is_book_row = (
+            tag == "tr" and "itemscope" in attrs and not attrs["itemscope"]
+        )
+
+        return is_book_row
 
-        tr_tags = soup.find_all(name="tr", attrs={"itemscope": ""})
+    def parse_books(self, html_data: bytes) -> list[dict]:
+        """Parse the books from the HTML data of a page in a single
+        pass, without building the tree of the page.
 
+        :param html_data: HTML data of the page.
+        :return: List of books.
+        """
         books_data = []
 
-        for tr_tag in tr_tags:
-            book_title_tag = tr_tag.find(
-                name="a", attrs={"class": "bookTitle"}
-            )
+        extractor = RowExtractor(is_row=self.is_book_row)
+
+        for tr_tag in extractor.iter_rows(html_data=html_data):
+            book_title_tag = tr_tag.find(tag="a", class_name="bookTitle")
             book_title = book_title_tag.text.strip()
             book_url = f"{BaseConstants.BASE_URL}{book_title_tag.get('href')}"
 
-            author_name_tag = tr_tag.find(
-                name="a", attrs={"class": "authorName"}
-            )
+            author_name_tag = tr_tag.find(tag="a", class_name="authorName")
             author_name = author_name_tag.text.strip()
 
-            mini_rating_tag = tr_tag.find(
-                name="span", attrs={"class": "minirating"}
-            )
+            mini_rating_tag = tr_tag.find(tag="span", class_name="minirating")
             mini_rating = mini_rating_tag.text.strip()
             avg_rating, ratings = mini_rating.split("—")
 
             score, people_voted = None, None
 
-            score_tag = tr_tag.find(name="a", string=re.compile(r"^score:"))  # type: ignore[arg-type]
+            score_tag = tr_tag.find(tag="a", string=self.SCORE_PATTERN)
 
             if score_tag:
                 score = score_tag.text.strip()
 
-            people_voted_tag = (
-                tr_tag.find(name="a", string=re.compile(r"people voted$"))  # type: ignore[arg-type]
+            people_voted_tag = tr_tag.find(
+                tag="a", string=self.PEOPLE_VOTED_PATTERN
             )
 
             if people_voted_tag:
@@ -76,41 +85,18 @@ class BookParser(BaseParser):
 
         :return: List of books.
         """
-        raw_filepaths = self._get_filepaths(
-            data_dir=BaseConstants.RAW_DATA_DIR
-        )
         parsed_list_of_books = []
 
         start = time.perf_counter()
-        self._logger.info(
-            f"Parsing book lists of '{len(raw_filepaths)}' items "
-            f"have been started"
-        )
-
-        with ProcessPoolExecutor(
-            max_workers=BaseConstants.MAX_WORKERS
-        ) as executor:
-            futures = {
-                executor.submit(self.parse_books, raw_filepath): raw_filepath
-                for raw_filepath in raw_filepaths
-            }
-
-            for future in as_completed(futures):
-                raw_filepath = futures.get(future)
-                filename = raw_filepath.name
-
-                try:
-                    parsed_books = future.result()
+        self._logger.info("Parsing book lists have been started")
 
-                    parsed_list_of_books.extend(parsed_books)
-                except Exception as exc:
-                    self._logger.error(
-                        f"An exception occurred while parsing '{filename}' "
-                        f"due to '{exc}'"
-                    )
+        for parsed_books in self._parse_files(parse_func=self.parse_books):
+            parsed_list_of_books.extend(parsed_books)
 
         end = time.perf_counter()
-        self._logger.info(f"Parsing book lists took {end - start:.3f} seconds")
+        self._logger.info(
+            "Parsing book lists finished", seconds=round(end - start, 3)
+        )
 
         return parsed_list_of_books
 
@@ -120,8 +106,9 @@ class BookParser(BaseParser):
         :return: None.
         """
         parsed_list_of_books = self.parse_list_of_books()
-        processed_filepath = self._get_processed_filepath()
 
-        self._save_to_parquet(
-            data=parsed_list_of_books, filepath=processed_filepath
+        self._save_to_dataset(
+            data=parsed_list_of_books,
+            numeric_columns=BookConstants.NUMERIC_COLUMNS,
+            key_columns=BookConstants.KEY_COLUMNS,
         )
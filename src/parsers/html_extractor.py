@@ -0,0 +1,236 @@
+import codecs
+import re
+from collections.abc import Callable, Iterator
+from html.parser import HTMLParser
+
+# Elements without an end tag, which never contain anything.
+VOID_ELEMENTS = {
+    "area",
+    "base",
+    "br",
+    "col",
+    "embed",
+    "hr",
+    "img",
+    "input",
+    "link",
+    "meta",
+    "param",
+    "source",
+    "track",
+    "wbr",
+}
+
+
+class Element:
+    """Element of a row, with the text it contains, as BeautifulSoup
+    would get it from the tree.
+    """
+
+    __slots__ = ("tag", "attrs", "index", "texts", "contents", "string")
+
+    def __init__(
+        self, tag: str, attrs: dict[str, str | None], index: int
+    ) -> None:
+        self.tag = tag
+        self.attrs = attrs
+        self.index = index
+        self.texts: list[str] = []
+        # Number of the direct children and the string of the only
+        # child, like the '.string' of BeautifulSoup.
+        self.contents = 0
+        self.string: str | None = None
+
+    @property
+    def text(self) -> str:
+        return "".join(self.texts)
+
+    def get(self, attr: str) -> str | None:
+        return self.attrs.get(attr)
+
+    def has_class(self, class_name: str) -> bool:
+        return class_name in (self.attrs.get("class") or "").split()
+
+
+class Row:
+    """Elements of a row in the document order of their start tags."""
+
+    def __init__(self, elements: list[Element]) -> None:
+        self.element, *self.elements = sorted(
+            elements, key=lambda element: element.index
+        )
+
+    def find(
+        self,
+        tag: str,
+        class_name: str | None = None,
+        string: re.Pattern | None = None,
+    ) -> Element | None:
+        """Find the first element inside the row, as 'find' of
+        BeautifulSoup does.
+
+        :param tag: Name of the element.
+        :param class_name: Class the element must have.
+        :param string: Pattern the only string of the element must
+            match.
+        :return: Element, None if there is no such element.
+        """
+        for element in self.elements:
+            if element.tag != tag:
+                continue
+
+            if class_name is not None and not element.has_class(class_name):
+                continue
+
+            if string is not None and (
+                element.string is None or not string.search(element.string)
+            ):
+                continue
+
+            return element
+
+        return None
+
+
+class RowExtractor(HTMLParser):
+    """Single-pass extractor of the rows of a page, e.g. the cells of
+    the popular lists or the table rows of the books.
+
+    The page is tokenized as a stream and only the elements inside the
+    rows are kept, without building a tree of the whole document. Each
+    row is emitted once its end tag is met.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(
+        self, is_row: Callable[[str, dict[str, str | None]], bool]
+    ) -> None:
+        """Create an extractor.
+
+        :param is_row: Function telling whether an element, by its name
+            and attributes, starts a row.
+        """
+        super().__init__(convert_charrefs=True)
+        self._is_row = is_row
+        self._stack: list[Element] = []
+        self._elements: list[Element] = []
+        self._rows: list[Row] = []
+        self._is_text_last = False
+
+    def handle_starttag(
+        self, tag: str, attrs: list[tuple[str, str | None]]
+    ) -> None:
+        attrs_dict = dict(attrs)
+
+        if not self._stack and not self._is_row(tag, attrs_dict):
+            return
+
+        element = Element(tag=tag, attrs=attrs_dict, index=len(self._elements))
+        self._elements.append(element)
+
+        if self._stack:
+            self._stack[-1].contents += 1
+
+        self._is_text_last = False
+
+        if tag in VOID_ELEMENTS:
+            self._close(element=element)
+        else:
+            self._stack.append(element)
+
+    def handle_startendtag(
+        self, tag: str, attrs: list[tuple[str, str | None]]
+    ) -> None:
+        self.handle_starttag(tag=tag, attrs=attrs)
+
+        if tag not in VOID_ELEMENTS and self._stack:
+            self.handle_endtag(tag=tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        # An end tag closes the most recent open element of its name and
+        # all the ones opened after it, an unmatched one is ignored.
+        for position in range(len(self._stack) - 1, -1, -1):
+            if self._stack[position].tag == tag:
+                break
+        else:
+            return
+
+        while len(self._stack) > position:
+            self._close(element=self._stack.pop())
+
+        self._is_text_last = False
+
+    def handle_data(self, data: str) -> None:
+        if not self._stack:
+            return
+
+        parent = self._stack[-1]
+
+        # Adjacent pieces of text make up a single string.
+        if self._is_text_last:
+            if parent.contents == 1:
+                parent.string += data
+        else:
+            parent.contents += 1
+            parent.string = data if parent.contents == 1 else None
+
+        for element in self._stack:
+            element.texts.append(data)
+
+        self._is_text_last = True
+
+    def handle_comment(self, data: str) -> None:
+        # A comment is a child of its element, though not a part of its
+        # text.
+        if not self._stack:
+            return
+
+        parent = self._stack[-1]
+        parent.contents += 1
+        parent.string = data if parent.contents == 1 else None
+
+        self._is_text_last = False
+
+    def _close(self, element: Element) -> None:
+        """Close an element, passing its string up to the parent, and
+        emit the row if the element is one.
+
+        :param element: Element to close.
+        :return: None.
+        """
+        if element.contents != 1:
+            element.string = None
+
+        if self._stack:
+            parent = self._stack[-1]
+            parent.string = element.string if parent.contents == 1 else None
+        else:
+            self._rows.append(Row(elements=self._elements))
+            self._elements = []
+
+    def iter_rows(self, html_data: bytes) -> Iterator[Row]:
+        """Feed the HTML data in chunks and emit the rows as they end.
+
+        :param html_data: HTML data, encoded in UTF-8.
+        :return: Rows of the page.
+        """
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+        for offset in range(0, len(html_data), self.CHUNK_SIZE):
+            chunk = html_data[offset : offset + self.CHUNK_SIZE]
+
+            self.feed(decoder.decode(chunk))
+
+            yield from self._rows
+            self._rows.clear()
+
+        self.feed(decoder.decode(b"", final=True))
+        self.close()
+
+        # Rows left open at the end of the document end with it.
+        while self._stack:
+            self._close(element=self._stack.pop())
+
+        yield from self._rows
+        self._rows.clear()
@@ -1,34 +1,41 @@
 import time
-from concurrent.futures import ProcessPoolExecutor, as_completed
-from pathlib import Path
 
 from common.constants import BaseConstants, PopularListConstants
 from parsers.base_parser import BaseParser
+from parsers.html_extractor import RowExtractor
 
 
 class PopularListParser(BaseParser):
+    CACHE_DEPENDENCIES = ("parsers.html_extractor",)
+
     def __init__(self) -> None:
         super().__init__(file_prefix=PopularListConstants.FILE_PREFIX)
 
-    def parse_popular_lists(self, raw_filepath: Path) -> list[dict]:
-        """Parse the popular lists from the specified files.
+    @staticmethod
+    def is_cell(tag: str, attrs: dict[str, str | None]) -> bool:
+        """Tell whether an element is the cell of a popular list.
 
-        :param raw_filepath: Path to the file to parse.
-        :return: List of popular lists.
+        :param tag: Name of the element.
+        :param attrs: Attributes of the element.
+        :return: True if the element is a cell.
         """
-        html_data = self._read_html_data(filepath=raw_filepath)
+        is_cell = tag == "div" and "cell" in (attrs.get("class") or "").split()
 
-        popular_lists_data = []
+        return is_cell
 
-        if html_data is None:
-            return []
+    def parse_popular_lists(self, html_data: bytes) -> list[dict]:
+        """Parse the popular lists from the HTML data of a page in
+        a single pass, without building the tree of the page.
 
-        soup = self.get_soup(html_data=html_data)
+        :param html_data: HTML data of the page.
+        :return: List of popular lists.
+        """
+        popular_lists_data = []
 
-        cells = soup.find_all(name="div", attrs={"class": "cell"})
+        extractor = RowExtractor(is_row=self.is_cell)
 
-        for cell in cells:
-            list_title_tag = cell.find(name="a", attrs={"class": "listTitle"})
+        for cell in extractor.iter_rows(html_data=html_data):
+            list_title_tag = cell.find(tag="a", class_name="listTitle")
 
             book_list = list_title_tag.text.strip()
             book_list_url = (
@@ -36,7 +43,7 @@ class PopularListParser(BaseParser):
             )
 
             list_full_details = cell.find(
-                name="div", attrs={"class": "listFullDetails"}
+                tag="div", class_name="listFullDetails"
             ).text.strip()
             books, voters = list_full_details.split("—")
 
@@ -56,44 +63,19 @@ class PopularListParser(BaseParser):
 
         :return: List of popular lists.
         """
-        raw_filepaths = self._get_filepaths(
-            data_dir=BaseConstants.RAW_DATA_DIR
-        )
         parsed_list_of_popular_lists = []
 
         start = time.perf_counter()
-        self._logger.info(
-            f"Parsing popular lists of '{len(raw_filepaths)}' items "
-            f"have been started"
-        )
-
-        with ProcessPoolExecutor(
-            max_workers=BaseConstants.MAX_WORKERS
-        ) as executor:
-            futures = {
-                executor.submit(
-                    self.parse_popular_lists, raw_filepath
-                ): raw_filepath
-                for raw_filepath in raw_filepaths
-            }
-
-            for future in as_completed(futures):
-                raw_filepath = futures.get(future)
-                filename = raw_filepath.name
-
-                try:
-                    parsed_popular_lists = future.result()
+        self._logger.info("Parsing popular lists have been started")
 
-                    parsed_list_of_popular_lists.extend(parsed_popular_lists)
-                except Exception as exc:
-                    self._logger.error(
-                        f"An exception occurred while parsing '{filename}' "
-                        f"due to '{exc}'"
-                    )
+        for parsed_popular_lists in self._parse_files(
+            parse_func=self.parse_popular_lists
+        ):
+            parsed_list_of_popular_lists.extend(parsed_popular_lists)
 
         end = time.perf_counter()
         self._logger.info(
-            f"Parsing popular lists took {end - start:.3f} seconds"
+            "Parsing popular lists finished", seconds=round(end - start, 3)
         )
 
         return parsed_list_of_popular_lists
@@ -104,8 +86,9 @@ class PopularListParser(BaseParser):
         :return: None.
         """
         parsed_list_of_popular_lists = self.parse_list_of_popular_lists()
-        processed_filepath = self._get_processed_filepath()
 
-        self._save_to_parquet(
-            data=parsed_list_of_popular_lists, filepath=processed_filepath
+        self._save_to_dataset(
+            data=parsed_list_of_popular_lists,
+            numeric_columns=PopularListConstants.NUMERIC_COLUMNS,
+            key_columns=PopularListConstants.KEY_COLUMNS,
         )
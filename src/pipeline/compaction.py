@@ -0,0 +1,79 @@
+import argparse
+
+from structlog import get_logger
+
+from common.constants import BaseConstants
+from common.parquet_dataset import ParquetDataset
+
+
+def get_dataset_names() -> list[str]:
+    """Get the names of the datasets in the processed data directory.
+
+    :return: List of dataset names.
+    """
+    if not BaseConstants.DATASET_DIR.exists():
+        return []
+
+    dataset_names = sorted(
+        path.name
+        for path in BaseConstants.DATASET_DIR.iterdir()
+        if path.is_dir() and any(path.glob("date=*"))
+    )
+
+    return dataset_names
+
+
+def compact_datasets(
+    dataset_names: list[str],
+    start_date: str | None = None,
+    end_date: str | None = None,
+) -> int:
+    """Merge the small files of the date partitions of the datasets.
+
+    :param dataset_names: Names of the datasets to compact.
+    :param start_date: First date to compact, inclusive.
+    :param end_date: Last date to compact, inclusive.
+    :return: Number of compacted partitions.
+    """
+    logger = get_logger(__name__)
+    compacted = 0
+
+    for dataset_name in dataset_names:
+        dataset = ParquetDataset(name=dataset_name)
+
+        for partition_date in dataset.get_partition_dates():
+            if start_date is not None and partition_date < start_date:
+                continue
+
+            if end_date is not None and partition_date > end_date:
+                continue
+
+            compacted += dataset.compact(partition_date=partition_date)
+
+    logger.info("Compacted the partitions", partitions=compacted)
+
+    return compacted
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Merge the small files of the processed datasets."
+    )
+    parser.add_argument(
+        "--datasets",
+        nargs="+",
+        help="Names of the datasets to compact, all if not specified.",
+    )
+    parser.add_argument("--start-date", help="First date, e.g. 2025-01-01.")
+    parser.add_argument("--end-date", help="Last date, e.g. 2025-01-31.")
+    args = parser.parse_args()
+
+    compact_datasets(
+        dataset_names=args.datasets or get_dataset_names(),
+        start_date=args.start_date,
+        end_date=args.end_date,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+from pathlib import Path
+
+from structlog import get_logger
+
+from common.constants import BaseConstants, PipelineConstants
+from common.run_summary import run_summary
+
+
+class Stage:
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], None],
+        *,
+        deps: list[str] | None = None,
+        inputs: Callable[[], list[Path]] | None = None,
+        outputs: Callable[[], list[Path]] | None = None,
+        cacheable: bool = True,
+    ) -> None:
+        """A step of the pipeline.
+
+        :param name: Name of the stage.
+        :param func: Function that runs the stage.
+        :param deps: Names of the stages that must run before.
+        :param inputs: Function that lists the files the stage reads.
+        :param outputs: Function that lists the files the stage wrote
+            that exist on the disk.
+        :param cacheable: Whether the stage can be skipped when its
+            inputs and outputs did not change since its last successful
+            run.
+        """
+        self.name = name
+        self.func = func
+        self.deps = deps or []
+        self.inputs = inputs or list
+        self.outputs = outputs or list
+        self.cacheable = cacheable
+
+
+class DagRunner:
+    """Run the stages of the pipeline in the order of their
+    dependencies.
+
+    Independent stages run concurrently. A stage is skipped only if
+    its inputs and its outputs both have the same fingerprints as right
+    after its last successful run, so a stage whose outputs are gone or
+    were never listed, e.g. on a fresh disk, runs again. The
+    fingerprints are read from the state directory whenever a stage
+    starts, so the ones a stage downloads from the previous runs are
+    taken into account.
+    """
+
+    def __init__(self, stages: list[Stage]) -> None:
+        self._stages = {stage.name: stage for stage in stages}
+        self._fingerprints_path = self.get_fingerprints_path()
+        self._lock = threading.Lock()
+        self._logger = get_logger(__name__)
+
+        for stage in stages:
+            for dep in stage.deps:
+                if dep not in self._stages:
+                    raise ValueError(
+                        f"Stage '{stage.name}' depends on unknown '{dep}'"
+                    )
+
+    @property
+    def stage_names(self) -> list[str]:
+        return list(self._stages)
+
+    @staticmethod
+    def get_fingerprints_path() -> Path:
+        """Get a path to the fingerprints of the stages, which are part
+        of the state shared between runs.
+
+        :return: Path to the fingerprints.
+        """
+        fingerprints_path = BaseConstants.STATE_DIR.joinpath(
+            f"{PipelineConstants.FINGERPRINTS_FILE_PREFIX}.json"
+        )
+
+        return fingerprints_path
+
+    def _load_fingerprints(self) -> dict[str, dict[str, str]]:
+        """Load the fingerprints of the past successful runs.
+
+        :return: Fingerprints of the inputs and the outputs by the date
+            and the stage name.
+        """
+        if not self._fingerprints_path.exists():
+            return {}
+
+        fingerprints = json.loads(self._fingerprints_path.read_text())
+
+        return fingerprints
+
+    def _save_fingerprint(self, key: str, fingerprint: dict[str, str]) -> None:
+        """Save the fingerprints of a successful stage run.
+
+        :param key: Key of the stage run.
+        :param fingerprint: Fingerprints of the stage inputs and
+            outputs.
+        :return: None.
+        """
+        with self._lock:
+            fingerprints = self._load_fingerprints()
+            fingerprints[key] = fingerprint
+
+            os.makedirs(BaseConstants.STATE_DIR, exist_ok=True)
+            self._fingerprints_path.write_text(
+                json.dumps(fingerprints, indent=2)
+            )
+
+    @staticmethod
+    def _get_fingerprint(filepaths: list[Path]) -> str:
+        """Get a fingerprint of the files by their names, sizes and
+        modification times.
+
+        :param filepaths: List of filepaths.
+        :return: Fingerprint.
+        """
+        digest = hashlib.sha1()
+
+        for filepath in sorted(filepaths):
+            stat = filepath.stat()
+            digest.update(
+                f"{filepath}:{stat.st_size}:{stat.st_mtime_ns}\n".encode()
+            )
+
+        return digest.hexdigest()
+
+    def _select_stages(self, targets: list[str] | None) -> list[str]:
+        """Select the target stages along with all their dependencies.
+
+        :param targets: Names of the target stages, all if empty.
+        :return: Names of the selected stages.
+        """
+        if not targets:
+            return self.stage_names
+
+        selected = set()
+        pending = list(targets)
+
+        while pending:
+            name = pending.pop()
+
+            if name not in self._stages:
+                raise ValueError(f"Unknown stage '{name}'")
+
+            if name in selected:
+                continue
+
+            selected.add(name)
+            pending.extend(self._stages[name].deps)
+
+        return [name for name in self._stages if name in selected]
+
+    def _run_stage(self, stage: Stage, force: bool) -> str:
+        """Run a stage unless its outputs are up to date.
+
+        :param stage: Stage to run.
+        :param force: Whether to run the stage even if it is up to date.
+        :return: Status of the stage, 'skipped' or 'done'.
+        """
+        key = f"{BaseConstants.CURRENT_DATE}:{stage.name}"
+        inputs_fingerprint = self._get_fingerprint(filepaths=stage.inputs())
+
+        with self._lock:
+            saved_fingerprint = self._load_fingerprints().get(key)
+
+        # The outputs are listed from the disk, so an empty listing
+        # means they are missing rather than up to date.
+        outputs = stage.outputs()
+        is_up_to_date = (
+            stage.cacheable
+            and bool(outputs)
+            and saved_fingerprint
+            == {
+                "inputs": inputs_fingerprint,
+                "outputs": self._get_fingerprint(filepaths=outputs),
+            }
+        )
+
+        if is_up_to_date and not force:
+            self._logger.info("Stage is up to date", stage=stage.name)
+            return "skipped"
+
+        start = time.perf_counter()
+        self._logger.info("Stage has been started", stage=stage.name)
+
+        stage.func()
+
+        end = time.perf_counter()
+        self._logger.info(
+            "Stage finished", stage=stage.name, seconds=round(end - start, 3)
+        )
+
+        self._save_fingerprint(
+            key=key,
+            fingerprint={
+                "inputs": inputs_fingerprint,
+                "outputs": self._get_fingerprint(filepaths=stage.outputs()),
+            },
+        )
+
+        return "done"
+
+    def run(
+        self, targets: list[str] | None = None, force: bool = False
+    ) -> bool:
+        """Run the target stages and their dependencies.
+
+        :param targets: Names of the target stages, all if empty.
+        :param force: Whether to run the stages even if up to date.
+        :return: True if all selected stages succeeded.
+        """
+        pending = self._select_stages(targets=targets)
+        statuses: dict[str, str] = {}
+        running: dict[Future, str] = {}
+
+        with ThreadPoolExecutor(max_workers=len(pending) or 1) as executor:
+            while pending or running:
+                for name in list(pending):
+                    deps_statuses = [
+                        statuses.get(dep) for dep in self._stages[name].deps
+                    ]
+
+                    if any(
+                        status in ("failed", "blocked")
+                        for status in deps_statuses
+                    ):
+                        statuses[name] = "blocked"
+                        pending.remove(name)
+                    elif all(
+                        status in ("done", "skipped")
+                        for status in deps_statuses
+                    ):
+                        future = executor.submit(
+                            self._run_stage, self._stages[name], force
+                        )
+                        running[future] = name
+                        pending.remove(name)
+
+                if not running:
+                    continue
+
+                completed, _ = wait(running, return_when=FIRST_COMPLETED)
+
+                for future in completed:
+                    name = running.pop(future)
+
+                    try:
+                        statuses[name] = future.result()
+                    except Exception as exc:
+                        statuses[name] = "failed"
+                        self._logger.error(
+                            "Stage failed", stage=name, error=exc
+                        )
+
+        run_summary.record(section="stages", **statuses)
+
+        return all(
+            status in ("done", "skipped") for status in statuses.values()
+        )
@@ -1,21 +1,52 @@
 import asyncio
-import gzip
+import hashlib
+import math
+import multiprocessing
 import os
+import time
 from asyncio import TaskGroup
+from collections import Counter
+from collections.abc import Callable, Iterable, Iterator, MutableSequence
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from pathlib import Path
 from random import choice
+from typing import Any
+from urllib.parse import urlsplit
 
 import pandas as pd
-from httpx import AsyncClient, Limits
+from httpx import HTTPStatusError
 from structlog import get_logger
 from tenacity import (
     AsyncRetrying,
-    RetryError,
+    retry_if_result,
     stop_after_attempt,
-    wait_random,
+    wait_exponential_jitter,
 )
 
-from common.constants import BaseConstants
+from common.codecs import get_codec
+from common.constants import (
+    ArchiveConstants,
+    BaseConstants,
+    RetryConstants,
+)
+from common.deadline import deadline
+from common.parquet_dataset import ParquetDataset
+from common.run_summary import run_summary
+from scrapers.circuit_breaker import CircuitBreaker
+from scrapers.concurrency_tuner import ConcurrencyTuner
+from scrapers.http_archive import HttpArchive
+from scrapers.proxy_pool import ProxyPool
+
+# Function reading what the crawl needs to know about a page from its
+# URL and HTML data.
+PageInspector = Callable[[str, bytes | None], Any]
+
+# Function hashing the content of a page to detect its changes.
+ContentHasher = Callable[[bytes | None], str | None]
+
+# Request slots of the proxies shared by the scrape workers.
+_worker_schedule: MutableSequence[float] | None = None
 
 
 class BaseScraper:
@@ -23,8 +54,23 @@ class BaseScraper:
         self._base_url = BaseConstants.BASE_URL
         self._pages = BaseConstants.PAGES
         self._batch_size = BaseConstants.BATCH_SIZE
+        self._codec = get_codec()
+        self._tuner = None
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._proxy_pool = ProxyPool.from_config()
+        self._archive = HttpArchive.from_config()
+        self._retry_queue: list[str] = []
+        self._retry_stats = Counter()
+        self._proxy_stats: dict[str, dict[str, Any]] = {}
+        self._deadline_at: float | None = None
+        self._unfetched_urls: list[str] = []
         self._logger = get_logger(__name__)
 
+        if BaseConstants.AUTO_TUNE:
+            self._tuner = ConcurrencyTuner(
+                concurrency=BaseConstants.MAX_CONNECTIONS
+            )
+
     @staticmethod
     def _make_current_date_dir(base_dir: Path) -> None:
         """Create a current date directory in the raw data path.
@@ -34,19 +80,6 @@ class BaseScraper:
         """
         os.makedirs(base_dir, exist_ok=True)
 
-    def _generate_urls(self, path_parameter: str) -> list[str]:
-        """Generate a list of source URLs.
-
-        :param path_parameter: Path parameter of the source URL.
-        :return: List of urls to scrape.
-        """
-        urls = [
-            f"{self._base_url}/{path_parameter}?page={page}"
-            for page in range(1, self._pages + 1)
-        ]
-
-        return urls
-
     @staticmethod
     def _rotate_header(headers: list[dict[str, str]]) -> dict[str, str]:
         """Rotate the header to use a different 'User-Agent' for each
@@ -60,7 +93,7 @@ class BaseScraper:
         return header
 
     def _save_html_data(
-        self, html_data: str | None, *, filepath: Path
+        self, html_data: bytes | None, *, filepath: Path
     ) -> None:
         """Save the HTML data to appropriate filepath.
 
@@ -72,12 +105,28 @@ class BaseScraper:
             self._logger.info("No HTML data to save")
             return
 
-        with gzip.open(filename=filepath, mode="wb") as f:
-            f.write(html_data.encode("utf-8"))
+        compressed_data = self._codec.compress(html_data)
+
+        filepath.write_bytes(compressed_data)
 
     @staticmethod
+    def _get_content_hash(html_data: bytes | None) -> str | None:
+        """Get a hash of the page content to detect changes between
+        runs. It runs where the page is scraped, possibly in a worker
+        process, so subclasses override it with a static method too.
+
+        :param html_data: HTML data to hash.
+        :return: Hash of the content.
+        """
+        if html_data is None:
+            return None
+
+        content_hash = hashlib.sha1(html_data).hexdigest()
+
+        return content_hash
+
     def _get_filepath(
-        base_path: Path, *, file_prefix: str, batch: int, idx: int
+        self, base_path: Path, *, file_prefix: str, batch: int, idx: int
     ) -> Path:
         """Get path to the file where to store the data.
 
@@ -87,115 +136,629 @@ class BaseScraper:
         :param idx: Index of the file.
         :return: Path to the file.
         """
-        filepath = base_path.joinpath(f"{file_prefix}_{batch}_{idx}.html.gz")
+        filepath = base_path.joinpath(
+            f"{file_prefix}_{batch}_{idx}.html.{self._codec.extension}"
+        )
 
         return filepath
 
-    async def get_html_data(self, url: str, client: AsyncClient) -> str | None:
+    def _get_page_inspector(self) -> PageInspector | None:
+        """Get the function reading what the crawl needs to know about
+        a scraped page. It runs where the page is scraped, possibly in
+        a worker process, so it must be picklable and must not rely on
+        the state of the scraper. Subclasses override it to keep track
+        of the crawl.
+
+        :return: Function taking the URL and the HTML data of a page,
+            None if the pages need no inspection.
+        """
+        return None
+
+    def _process_page(self, url: str, page_info: Any) -> None:
+        """Take in the inspection of a scraped page before moving on to
+        the next one.
+
+        :param url: A URL of the page.
+        :param page_info: What the page inspector read from the page.
+        :return: None.
+        """
+
+    def _begin_deadline(self, file_prefix: str) -> None:
+        """Take the share of the time budget of the run to scrape in.
+
+        :param file_prefix: Prefix of the files to scrape.
+        :return: None.
+        """
+        self._deadline_at = deadline.begin_stage(file_prefix=file_prefix)
+
+    def _is_out_of_time(self) -> bool:
+        """Tell whether the share of the time budget ran out, so no
+        more requests should be started.
+
+        :return: True if out of time.
+        """
+        is_out_of_time = (
+            self._deadline_at is not None
+            and time.monotonic() >= self._deadline_at
+        )
+
+        return is_out_of_time
+
+    def _get_breaker(self, url: str) -> CircuitBreaker:
+        """Get the circuit breaker of the host of a URL.
+
+        :param url: A URL of the source.
+        :return: Circuit breaker.
+        """
+        host = urlsplit(url).netloc
+
+        if host not in self._breakers:
+            self._breakers[host] = CircuitBreaker(host=host)
+
+        return self._breakers[host]
+
+    def _replay(self, url: str) -> bytes | None:
+        """Get the HTML data of a URL from the archive instead of the
+        source. A URL that was not recorded fails like a request that
+        is not worth retrying.
+
+        :param url: A URL of the source.
+        :return: HTML data.
+        """
+        response = self._archive.replay(url=url)
+
+        if response is None:
+            self._logger.warning("Page is not in the archive", url=url)
+            return None
+
+        status_code, html_data = response
+
+        if html_data is None:
+            self._logger.error(
+                "Failed to get data", url=url, status_code=status_code
+            )
+
+        return html_data
+
+    async def get_html_data(self, url: str) -> bytes | None:
         """Make an asynchronous request to the source and get
-        the HTML data.
+        the HTML data. The raw bytes are kept as they are, without
+        decoding them into a string.
+
+        The request goes through the healthiest proxy of the pool.
+        A failed request is not retried on the spot: a URL that may
+        succeed later is put in the retry queue, which is retried after
+        the whole batch. No request is started once the time budget
+        ran out.
+
+        In the record mode, the final responses are appended to the
+        archive of the run date; in the replay mode, they are served
+        from it without any request.
 
         :param url: A URL of the source.
-        :param client: An asynchronous HTTP client.
         :return: HTML data.
         """
+        if self._archive is not None and (
+            self._archive.mode == ArchiveConstants.REPLAY
+        ):
+            return self._replay(url=url)
+
         header = self._rotate_header(BaseConstants.HEADERS)
+        breaker = self._get_breaker(url=url)
+
+        while True:
+            is_allowed = not self._is_out_of_time() and await breaker.wait(
+                deadline_at=self._deadline_at
+            )
+
+            if is_allowed:
+                proxy = await self._proxy_pool.acquire()
+
+                # The breaker may have opened while the request waited
+                # for a connection, the request then waits again.
+                if not self._is_out_of_time() and breaker.is_allowed():
+                    break
+
+                await self._proxy_pool.cancel(proxy=proxy)
+
+            if self._is_out_of_time():
+                breaker.release()
+                self._unfetched_urls.append(url)
+                return None
+
+        start = time.perf_counter()
+        is_success = False
+        html_data = None
+        # Status code of a final response, which is worth recording.
+        final_status_code = None
 
         try:
-            async for attempt in AsyncRetrying(
-                stop=stop_after_attempt(max_attempt_number=3),
-                wait=wait_random(min=5, max=20),
-            ):
-                with attempt:
-                    response = await client.get(url=url, headers=header)
-                    response.raise_for_status()
-                    html_data = response.text
-
-                    return html_data
-        except RetryError as exc:
+            response = await proxy.client.get(url=url, headers=header)
+            response.raise_for_status()
+        except HTTPStatusError as exc:
+            status_code = exc.response.status_code
+            is_retryable = status_code in RetryConstants.RETRYABLE_STATUS_CODES
+            is_success = not is_retryable
+
+            breaker.record(success=not is_retryable)
+
+            if is_retryable:
+                self._retry_queue.append(url)
+            else:
+                final_status_code = status_code
+
             self._logger.error(
-                f"Failed to get data after multiple retries for '{url}' "
-                f"due to '{exc}'"
+                "Failed to get data", url=url, status_code=status_code
             )
         except Exception as exc:
+            breaker.record(success=False)
+            self._retry_queue.append(url)
+
+            self._logger.error(
+                "An unexpected exception while getting data",
+                url=url,
+                error=exc,
+            )
+        else:
+            is_success = True
+            breaker.record(success=True)
+
+            html_data = response.content
+            final_status_code = response.status_code
+        finally:
+            await self._proxy_pool.release(
+                proxy=proxy,
+                success=is_success,
+                latency=time.perf_counter() - start,
+            )
+
+        if self._archive is not None and final_status_code is not None:
+            await asyncio.to_thread(
+                self._archive.record,
+                url=url,
+                status_code=final_status_code,
+                html_data=html_data,
+            )
+
+        return html_data
+
+    async def _retry_failed_urls(self) -> dict[str, bytes]:
+        """Retry the URLs in the retry queue in rounds, waiting with
+        an exponential, jittered backoff between the rounds.
+
+        :return: HTML data of the recovered pages indexed by URL.
+        """
+        recovered_pages = {}
+
+        async def retry_round() -> list[str]:
+            urls, self._retry_queue = self._retry_queue, []
+
+            self._logger.info("Retrying failed pages", pages=len(urls))
+
+            tasks = await self.make_requests(urls=urls)
+
+            for url, task in zip(urls, tasks):
+                if (html_data := task.result()) is not None:
+                    recovered_pages[url] = html_data
+
+            return self._retry_queue
+
+        if not self._retry_queue:
+            return recovered_pages
+
+        if self._is_out_of_time():
+            self._unfetched_urls += self._retry_queue
+            self._retry_queue = []
+
+            return recovered_pages
+
+        retrying = AsyncRetrying(
+            stop=stop_after_attempt(max_attempt_number=RetryConstants.ROUNDS),
+            wait=wait_exponential_jitter(
+                initial=RetryConstants.INITIAL_WAIT,
+                max=RetryConstants.MAX_WAIT,
+                jitter=RetryConstants.JITTER,
+            ),
+            retry=retry_if_result(bool),
+            retry_error_callback=lambda retry_state: (
+                retry_state.outcome.result()
+            ),
+        )
+
+        # Wait before the first round as well, the pages failed just
+        # a moment ago.
+        await asyncio.sleep(delay=RetryConstants.INITIAL_WAIT)
+
+        failed_urls = await retrying(retry_round)
+
+        if failed_urls:
             self._logger.error(
-                f"An unexpected exception for '{url}' due to '{exc}'"
+                "Failed to get pages after the retry rounds",
+                pages=len(failed_urls),
+                rounds=RetryConstants.ROUNDS,
             )
+            self._retry_queue = []
 
-    async def make_requests(
-        self, urls: list[str], client: AsyncClient
-    ) -> list:
+        return recovered_pages
+
+    async def make_requests(self, urls: list[str]) -> list:
         """Make a group of asynchronous requests to appropriate sources.
+        The requests are spaced out by the rate limit of each proxy.
 
         :param urls: List of URLs to scrape.
-        :param client: Asynchronous HTTP client.
         :return: List of groups of tasks.
         """
         tasks = []
 
         async with TaskGroup() as tg:
             for url in urls:
-                task = tg.create_task(
-                    coro=self.get_html_data(url=url, client=client)
-                )
+                task = tg.create_task(coro=self.get_html_data(url=url))
 
                 tasks.append(task)
 
-                await asyncio.sleep(delay=0.1)
-
         return tasks
 
+    async def _fetch_and_save(
+        self,
+        filepaths: dict[str, Path],
+        max_connections: int,
+        inspect_page: PageInspector | None,
+        get_content_hash: ContentHasher,
+    ) -> dict[str, Any]:
+        """Scrape the pages, retrying the failed ones, and save them
+        to their filepaths.
+
+        :param filepaths: Path to save each page to indexed by URL.
+        :param max_connections: Maximum number of concurrent requests
+            per proxy.
+        :param inspect_page: Function reading what the crawl needs to
+            know about a page.
+        :param get_content_hash: Function hashing the content of a
+            page.
+        :return: Content hash and inspection of each page indexed by
+            URL, and the statistics of the requests.
+        """
+        urls = list(filepaths)
+        trips = sum(breaker.trips for breaker in self._breakers.values())
+        start = time.perf_counter()
+
+        async with self._proxy_pool.open(max_connections=max_connections):
+            tasks = await self.make_requests(urls=urls)
+
+            elapsed = time.perf_counter() - start
+            pages = [task.result() for task in tasks]
+            errors = pages.count(None)
+
+            recovered_pages = await self._retry_failed_urls()
+
+        results = {}
+        saving_tasks = []
+
+        for url, html_data in zip(urls, pages):
+            html_data = recovered_pages.get(url, html_data)
+
+            # Compression releases the GIL, so the pages are compressed
+            # in worker threads instead of blocking the event loop.
+            saving_tasks.append(
+                asyncio.to_thread(
+                    self._save_html_data, html_data, filepath=filepaths[url]
+                )
+            )
+
+            results[url] = (
+                get_content_hash(html_data),
+                inspect_page(url, html_data) if inspect_page else None,
+            )
+
+        await asyncio.gather(*saving_tasks)
+
+        unfetched_urls, self._unfetched_urls = self._unfetched_urls, []
+
+        retry_stats = {
+            "failed": errors - len(recovered_pages),
+            "recovered": len(recovered_pages),
+            "breaker_trips": (
+                sum(breaker.trips for breaker in self._breakers.values())
+                - trips
+            ),
+        }
+
+        return {
+            "pages": results,
+            "errors": errors,
+            "elapsed": elapsed,
+            "retries": retry_stats,
+            "proxies": self._proxy_pool.get_stats(),
+            "unfetched": unfetched_urls,
+        }
+
+    async def _fetch_and_save_in_workers(
+        self,
+        filepaths: dict[str, Path],
+        max_connections: int,
+        inspect_page: PageInspector | None,
+        get_content_hash: ContentHasher,
+    ) -> dict[str, Any]:
+        """Spread the pages over worker processes, each scraping its
+        share with its own event loop and HTTP clients. The workers
+        share the request slots of the proxies, so together they keep
+        to the rate limits, and split the connections between them.
+
+        :param filepaths: Path to save each page to indexed by URL.
+        :param max_connections: Maximum number of concurrent requests
+            per proxy across the workers.
+        :param inspect_page: Function reading what the crawl needs to
+            know about a page.
+        :param get_content_hash: Function hashing the content of a
+            page, the one of the scraper so the hashes do not depend on
+            the number of workers.
+        :return: Content hash and inspection of each page indexed by
+            URL, and the statistics of the requests.
+        """
+        workers = min(BaseConstants.SCRAPE_WORKERS, len(filepaths))
+        items = list(filepaths.items())
+        schedule = multiprocessing.Array("d", len(self._proxy_pool.proxies))
+        loop = asyncio.get_running_loop()
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_scrape_worker,
+            initargs=(schedule,),
+        ) as executor:
+            shards = await asyncio.gather(
+                *(
+                    loop.run_in_executor(
+                        executor,
+                        _fetch_and_save_shard,
+                        dict(items[worker::workers]),
+                        max(1, math.ceil(max_connections / workers)),
+                        inspect_page,
+                        get_content_hash,
+                        self._deadline_at,
+                    )
+                    for worker in range(workers)
+                )
+            )
+
+        results = {}
+        retry_stats = Counter()
+        proxy_stats = {}
+
+        for shard in shards:
+            results.update(shard["pages"])
+            retry_stats.update(shard["retries"])
+
+            for name, stats in shard["proxies"].items():
+                merged_stats = proxy_stats.setdefault(
+                    name, {"requests": 0, "errors": 0, "latency": []}
+                )
+                merged_stats["requests"] += stats["requests"]
+                merged_stats["errors"] += stats["errors"]
+                merged_stats["latency"].append(stats["latency"])
+
+        for stats in proxy_stats.values():
+            stats["latency"] = round(
+                sum(stats["latency"]) / len(stats["latency"]), 3
+            )
+
+        return {
+            # The pages are reported in the order of the URLs.
+            "pages": {url: results[url] for url in filepaths},
+            "errors": sum(shard["errors"] for shard in shards),
+            "elapsed": max(shard["elapsed"] for shard in shards),
+            "retries": dict(retry_stats),
+            "proxies": proxy_stats,
+            "unfetched": [
+                url for shard in shards for url in shard["unfetched"]
+            ],
+        }
+
     async def save_data(
         self, urls: list[str], *, batch: int, file_prefix: str
-    ) -> None:
-        """Save the retrieved data to appropriate filepaths.
+    ) -> dict[str, str | None]:
+        """Save the retrieved data to appropriate filepaths, in worker
+        processes if more than one scrape worker is configured.
 
         :param urls: List of URLs to scrape.
         :param batch: Batch size.
         :param file_prefix: Prefix of the file.
-        :return: None.
+        :return: Content hash of each page indexed by URL.
         """
-        limits = Limits(
-            max_connections=BaseConstants.MAX_CONNECTIONS,
-            max_keepalive_connections=BaseConstants.MAX_KEEPALIVE_CONNECTIONS,
-        )
-        self._make_current_date_dir(base_dir=BaseConstants.RAW_DATA_DIR)
+        max_connections = BaseConstants.MAX_CONNECTIONS
+
+        if self._tuner is not None:
+            max_connections = self._tuner.concurrency
 
-        async with AsyncClient(limits=limits) as client:
-            tasks = await self.make_requests(urls=urls, client=client)
+        self._make_current_date_dir(base_dir=BaseConstants.RAW_DATA_DIR)
 
-        for idx, task in enumerate(tasks, start=1):
-            filepath = self._get_filepath(
+        filepaths = {
+            url: self._get_filepath(
                 base_path=BaseConstants.RAW_DATA_DIR,
                 file_prefix=file_prefix,
                 batch=batch,
                 idx=idx,
             )
+            for idx, url in enumerate(urls, start=1)
+        }
+
+        if BaseConstants.SCRAPE_WORKERS > 1:
+            fetch_and_save = self._fetch_and_save_in_workers
+        else:
+            fetch_and_save = self._fetch_and_save
+
+        outcome = await fetch_and_save(
+            filepaths=filepaths,
+            max_connections=max_connections,
+            inspect_page=self._get_page_inspector(),
+            get_content_hash=self._get_content_hash,
+        )
 
-            html_data = task.result()
+        content_hashes = {}
 
-            self._save_html_data(html_data=html_data, filepath=filepath)
+        for url, (content_hash, page_info) in outcome["pages"].items():
+            self._process_page(url=url, page_info=page_info)
 
-    @staticmethod
-    def _read_to_df(filepath: Path) -> pd.DataFrame:
-        """Read the data from a file into a dataframe.
+            content_hashes[url] = content_hash
+
+        self._retry_stats.update(outcome["retries"])
+
+        deadline.record_unfetched(
+            file_prefix=file_prefix, pages=len(outcome["unfetched"])
+        )
+
+        if BaseConstants.SCRAPE_WORKERS > 1:
+            # The workers start afresh with every batch.
+            for name, stats in outcome["proxies"].items():
+                totals = self._proxy_stats.setdefault(
+                    name, {"requests": 0, "errors": 0}
+                )
+                totals["requests"] += stats["requests"]
+                totals["errors"] += stats["errors"]
+                totals["latency"] = stats["latency"]
+        else:
+            self._proxy_stats = outcome["proxies"]
+
+        run_summary.record(
+            section="retries", **{file_prefix: dict(self._retry_stats)}
+        )
+        run_summary.record(
+            section="proxies", **{file_prefix: self._proxy_stats}
+        )
+
+        if self._tuner is not None:
+            self._tuner.record(
+                pages=len(urls),
+                errors=outcome["errors"],
+                elapsed=outcome["elapsed"],
+                max_useful_concurrency=(
+                    self._proxy_pool.get_max_useful_connections(
+                        latencies={
+                            name: stats["latency"]
+                            for name, stats in outcome["proxies"].items()
+                        }
+                    )
+                ),
+            )
+
+            run_summary.record(
+                section="concurrency",
+                **{
+                    file_prefix: {
+                        "max_connections": self._tuner.best_concurrency,
+                        "pages_per_second": self._tuner.best_throughput,
+                        # The rate limits cap the search at this number.
+                        "max_useful_connections": (
+                            self._tuner.max_useful_concurrency
+                        ),
+                    }
+                },
+            )
 
-        :param filepath: Path to the file.
+        return content_hashes
+
+    @staticmethod
+    def _read_to_df(
+        dataset_name: str, columns: list[str] | None = None
+    ) -> pd.DataFrame:
+        """Read the current date partition of a dataset into
+        a dataframe.
+
+        :param dataset_name: Name of the dataset.
+        :param columns: Columns to read, all columns if not specified.
         :return: Dataframe.
         """
-        df = pd.read_parquet(filepath, engine="pyarrow")
+        dataset = ParquetDataset(name=dataset_name)
+
+        df = dataset.read(
+            columns=columns,
+            start_date=BaseConstants.CURRENT_DATE,
+            end_date=BaseConstants.CURRENT_DATE,
+        )
 
         return df
 
-    def _group_urls(self, urls: list[str]) -> list[list[str]]:
-        """Group a list of URLs into a list of batches.
+    @staticmethod
+    def _get_unique_urls(urls: Iterable[str]) -> Iterator[str]:
+        """Lazily skip the URLs that have already been produced.
 
-        :param urls: List of URLs to group.
-        :return: Grouped list of URLs.
+        :param urls: URLs to deduplicate.
+        :return: Iterator over unique URLs.
         """
-        grouped_urls = [
-            urls[idx : idx + self._batch_size]
-            for idx in range(0, len(urls), self._batch_size)
-        ]
+        seen_urls = set()
+
+        for url in urls:
+            if url in seen_urls:
+                continue
+
+            seen_urls.add(url)
+
+            yield url
+
+    def _group_urls(
+        self, urls: Iterable[str], file_prefix: str
+    ) -> Iterator[list[str]]:
+        """Lazily group unique URLs into batches. No batch is started
+        once the time budget ran out, the rest of the URLs are counted
+        as unscraped.
 
-        return grouped_urls
+        :param urls: URLs to group.
+        :param file_prefix: Prefix of the files the URLs are saved to.
+        :return: Iterator over batches of URLs.
+        """
+        unique_urls = self._get_unique_urls(urls=urls)
+
+        while batch := list(islice(unique_urls, self._batch_size)):
+            if self._is_out_of_time():
+                deadline.record_unfetched(
+                    file_prefix=file_prefix,
+                    pages=len(batch) + sum(1 for _ in unique_urls),
+                )
+                return
+
+            yield batch
+
+
+def _init_scrape_worker(schedule: MutableSequence[float]) -> None:
+    """Keep the request slots shared by the scrape workers for the tasks
+    of a worker process.
+
+    :param schedule: Shared request slots of the proxies.
+    :return: None.
+    """
+    global _worker_schedule
+
+    _worker_schedule = schedule
+
+
+def _fetch_and_save_shard(
+    filepaths: dict[str, Path],
+    max_connections: int,
+    inspect_page: PageInspector | None,
+    get_content_hash: ContentHasher,
+    deadline_at: float | None,
+) -> dict[str, Any]:
+    """Scrape a share of the pages in a worker process, with its own
+    event loop and HTTP clients.
+
+    :param filepaths: Path to save each page to indexed by URL.
+    :param max_connections: Maximum number of concurrent requests per
+        proxy of the worker.
+    :param inspect_page: Function reading what the crawl needs to know
+        about a page.
+    :param get_content_hash: Function hashing the content of a page.
+    :param deadline_at: Monotonic time to stop starting requests at.
+    :return: Content hash and inspection of each page indexed by URL,
+        and the statistics of the requests.
+    """
+    scraper = BaseScraper()
+    scraper._proxy_pool.share_schedule(schedule=_worker_schedule)
+    scraper._deadline_at = deadline_at
+
+    return asyncio.run(
+        scraper._fetch_and_save(
+            filepaths=filepaths,
+            max_connections=max_connections,
+            inspect_page=inspect_page,
+            get_content_hash=get_content_hash,
+        )
+    )
@@ -1,24 +1,81 @@
+import hashlib
+import re
 import time
 
-from common.constants import BaseConstants, BookDetailsConstants
+import pandas as pd
+
+from common.book_id_index import BookIdIndex
+from common.constants import BookConstants, BookDetailsConstants
 from scrapers.base_scraper import BaseScraper
+from scrapers.freshness_scheduler import FreshnessScheduler
 
 
 class BookDetailsScraper(BaseScraper):
+    NEXT_DATA_PATTERN = re.compile(
+        rb'<script id="__NEXT_DATA__"[^>]*>(.*?)</script>', flags=re.DOTALL
+    )
+
     def __init__(self) -> None:
         super().__init__()
+        self._scheduler = FreshnessScheduler()
+        self._book_id_index = BookIdIndex()
+
+    @staticmethod
+    def _get_content_hash(html_data: bytes | None) -> str | None:
+        """Get a hash of the '__NEXT_DATA__' payload, so that changes
+        in the page markup around the book data are ignored.
+
+        :param html_data: HTML data to hash.
+        :return: Hash of the content.
+        """
+        if html_data is None:
+            return None
+
+        match = BookDetailsScraper.NEXT_DATA_PATTERN.search(html_data)
+
+        if match is None:
+            return BaseScraper._get_content_hash(html_data=html_data)
+
+        content_hash = hashlib.sha1(match.group(1)).hexdigest()
+
+        return content_hash
+
+    def get_books_popularity(self) -> pd.Series:
+        """Get the popularity of each book by its score and the number
+        of people who voted for it across all book lists.
+
+        :return: Popularity of the books indexed by URL, from 0 to 1.
+        """
+        books_df = self._read_to_df(
+            dataset_name=BookConstants.FILE_PREFIX,
+            columns=["book_url", "score", "people_voted"],
+        )
+
+        votes_df = books_df[["score", "people_voted"]].fillna(0)
+        votes_df = votes_df.groupby(books_df["book_url"]).sum()
+
+        popularity = votes_df.rank(pct=True).mean(axis=1)
+
+        return popularity
 
     def get_books_urls(self) -> list[str]:
-        """Get a list of books URLs.
+        """Get a list of books URLs that are due for scraping.
 
         :return: List of URLs.
         """
-        filepath = BaseConstants.PROCESSED_DATA_DIR.joinpath(
-            "books.parquet.gz"
+        popularity = self.get_books_popularity()
+
+        book_ids = self._book_id_index.get_book_ids(
+            books_urls=popularity.index.to_series()
+        )
+        is_known = self._book_id_index.contains(book_ids=book_ids)
+        is_new = pd.Series(
+            data=~is_known & (book_ids != 0), index=popularity.index
         )
-        books_df = self._read_to_df(filepath=filepath)
 
-        books_urls = books_df["book_url"].unique()
+        books_urls = self._scheduler.select_urls(
+            popularity=popularity, is_new=is_new
+        )
 
         return books_urls
 
@@ -27,24 +84,48 @@ class BookDetailsScraper(BaseScraper):
 
         :return: None.
         """
+        self._begin_deadline(file_prefix=BookDetailsConstants.FILE_PREFIX)
+
         books_urls = self.get_books_urls()
-        grouped_books_urls = self._group_urls(urls=books_urls)
+        grouped_books_urls = self._group_urls(
+            urls=books_urls, file_prefix=BookDetailsConstants.FILE_PREFIX
+        )
 
         for batch, urls in enumerate(grouped_books_urls, start=1):
             start = time.perf_counter()
             self._logger.info(
-                f"Scraping books details for batch '{batch}' of "
-                f"'{len(urls)}' items have been started"
+                "Scraping batch has been started",
+                file_prefix=BookDetailsConstants.FILE_PREFIX,
+                batch=batch,
+                items=len(urls),
             )
 
-            await self.save_data(
+            content_hashes = await self.save_data(
                 urls=urls,
                 batch=batch,
                 file_prefix=BookDetailsConstants.FILE_PREFIX,
             )
 
+            self._scheduler.update(content_hashes=content_hashes)
+
+            fetched_urls = [
+                url
+                for url, content_hash in content_hashes.items()
+                if content_hash is not None
+            ]
+            self._book_id_index.add(
+                book_ids=self._book_id_index.get_book_ids(
+                    books_urls=pd.Series(fetched_urls, dtype=object)
+                )
+            )
+
             end = time.perf_counter()
             self._logger.info(
-                f"Scraping books details for batch '{batch}' "
-                f"took {end - start:.3f} seconds"
+                "Scraping batch finished",
+                file_prefix=BookDetailsConstants.FILE_PREFIX,
+                batch=batch,
+                seconds=round(end - start, 3),
             )
+
+        self._scheduler.save_state()
+        self._book_id_index.save()
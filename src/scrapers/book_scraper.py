@@ -1,90 +1,36 @@
-import time
+from common.constants import BookConstants, PopularListConstants
+from scrapers.paginated_scraper import PaginatedScraper
 
-from common.constants import BaseConstants, BookConstants
-from scrapers.base_scraper import BaseScraper
 
-
-class BookScraper(BaseScraper):
+class BookScraper(PaginatedScraper):
     def __init__(self) -> None:
-        super().__init__()
-
-    @staticmethod
-    def _get_total_books(books: str) -> int:
-        """Get the numeric value of the total number of books.
-
-        :param books: Number of books as a string.
-        :return: Total number of books.
-        """
-        total_books = int(books.replace(" books", "").replace(",", ""))
-
-        return total_books
-
-    def _get_number_of_pages(self, total_books: int) -> int:
-        """Get the number of pages per book list.
-
-        :param total_books: Total number of books per book list.
-        :return: Number of pages per book list.
-        """
-        number_of_pages = int((total_books + 1) / self._pages)
+        super().__init__(row_marker=BookConstants.ROW_MARKER)
 
-        if number_of_pages >= self._pages:
-            return self._pages
+    def get_book_lists_priorities(self) -> dict[str, float]:
+        """Get the priority of each book list by its number of voters.
 
-        return number_of_pages
-
-    def get_book_lists_urls(self) -> list[str]:
-        """Get a list of URLs for book lists.
-
-        :return: A list of URLs.
+        :return: Priority of each book list by its URL.
         """
-        filepath = BaseConstants.PROCESSED_DATA_DIR.joinpath(
-            "popular_lists.parquet.gz"
+        popular_lists_df = self._read_to_df(
+            dataset_name=PopularListConstants.FILE_PREFIX,
+            columns=["book_list_url", "voters"],
         )
-        popular_lists_df = self._read_to_df(filepath=filepath)
-
-        book_lists_urls = []
-
-        for _, row in popular_lists_df.iterrows():
-            book_list_url = row["book_list_url"]
-            books = row["books"]
 
-            total_books = self._get_total_books(books=books)
-            number_of_pages = self._get_number_of_pages(
-                total_books=total_books
-            )
+        voters = popular_lists_df["voters"].fillna(0)
 
-            urls = [
-                f"{book_list_url}?page={page}"
-                for page in range(1, number_of_pages + 1)
-            ]
+        priorities = voters.groupby(popular_lists_df["book_list_url"]).max()
 
-            book_lists_urls.extend(urls)
-
-        return book_lists_urls
+        return priorities.to_dict()
 
     async def save_books(self) -> None:
-        """Save the HTML data from the books pages.
+        """Save the HTML data from the books pages, the book lists with
+        the most voters first.
 
         :return: None.
         """
-        book_lists_urls = self.get_book_lists_urls()
-        grouped_book_lists_urls = self._group_urls(urls=book_lists_urls)
-
-        for batch, urls in enumerate(grouped_book_lists_urls, start=1):
-            start = time.perf_counter()
-            self._logger.info(
-                f"Scraping book lists for batch '{batch}' of "
-                f"'{len(urls)}' items have been started"
-            )
+        book_lists_priorities = self.get_book_lists_priorities()
 
-            await self.save_data(
-                urls=book_lists_urls,
-                batch=batch,
-                file_prefix=BookConstants.FILE_PREFIX,
-            )
-
-            end = time.perf_counter()
-            self._logger.info(
-                f"Scraping book lists for batch '{batch}' "
-                f"took {end - start:.3f} seconds"
-            )
+        await self.save_paginated_data(
+            sources=book_lists_priorities,
+            file_prefix=BookConstants.FILE_PREFIX,
+        )
@@ -0,0 +1,152 @@
+import asyncio
+import time
+from collections import deque
+
+from structlog import get_logger
+
+from common.constants import CircuitBreakerConstants
+
+
+class CircuitBreaker:
+    """Pause all requests to a host while its error rate is high.
+
+    The breaker opens once the share of failed requests among the
+    recent ones reaches the threshold, and every request waits until
+    the cooldown is over. A single probe request is then let through:
+    if it succeeds the breaker closes, otherwise it opens again for
+    twice as long. The probe belongs to the task that was let through,
+    which must record its outcome or release it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, host: str) -> None:
+        self.host = host
+        self.trips = 0
+        self._state = self.CLOSED
+        self._outcomes: deque[bool] = deque(
+            maxlen=CircuitBreakerConstants.WINDOW
+        )
+        self._cooldown = CircuitBreakerConstants.COOLDOWN
+        self._open_until = 0.0
+        self._probing = False
+        self._probe_task: asyncio.Task | None = None
+        self._logger = get_logger(__name__)
+
+    def _open(self) -> None:
+        """Stop the requests for the cooldown.
+
+        :return: None.
+        """
+        self._state = self.OPEN
+        self._open_until = time.monotonic() + self._cooldown
+        self._outcomes.clear()
+        self.trips += 1
+
+        self._logger.warning(
+            "Circuit breaker opened",
+            host=self.host,
+            seconds=round(self._cooldown, 1),
+        )
+
+    async def wait(self, deadline_at: float | None = None) -> bool:
+        """Wait until a request to the host is allowed, at most until
+        the deadline.
+
+        :param deadline_at: Monotonic time to stop waiting at, no limit
+            if None.
+        :return: True if the request is allowed, False if the deadline
+            passed first.
+        """
+        while True:
+            if self._state == self.CLOSED:
+                return True
+
+            now = time.monotonic()
+
+            if deadline_at is not None and now >= deadline_at:
+                return False
+
+            if self._state == self.OPEN:
+                delay = self._open_until - now
+
+                if delay > 0:
+                    if deadline_at is not None:
+                        delay = min(delay, deadline_at - now)
+
+                    await asyncio.sleep(delay=delay)
+                    continue
+
+                self._state = self.HALF_OPEN
+                self._probing = False
+
+            if not self._probing:
+                self._probing = True
+                self._probe_task = asyncio.current_task()
+                return True
+
+            await asyncio.sleep(delay=CircuitBreakerConstants.PROBE_INTERVAL)
+
+    def is_allowed(self) -> bool:
+        """Tell whether a request of the current task may still be sent,
+        e.g. after waiting for a connection, as the breaker may have
+        opened in the meantime.
+
+        :return: True if the breaker is closed or the task holds the
+            probe.
+        """
+        is_allowed = self._state == self.CLOSED or (
+            self._state == self.HALF_OPEN
+            and self._probing
+            and self._probe_task is asyncio.current_task()
+        )
+
+        return is_allowed
+
+    def release(self) -> None:
+        """Give up the probe of the current task without sending it,
+        so another request can probe the host.
+
+        :return: None.
+        """
+        if self._probing and self._probe_task is asyncio.current_task():
+            self._probing = False
+            self._probe_task = None
+
+    def record(self, success: bool) -> None:
+        """Record the outcome of a request to the host.
+
+        :param success: Whether the request succeeded.
+        :return: None.
+        """
+        if self._state == self.OPEN:
+            return
+
+        if self._state == self.HALF_OPEN:
+            self._probing = False
+            self._probe_task = None
+
+            if success:
+                self._state = self.CLOSED
+                self._cooldown = CircuitBreakerConstants.COOLDOWN
+
+                self._logger.info("Circuit breaker closed", host=self.host)
+            else:
+                self._cooldown = min(
+                    self._cooldown * 2, CircuitBreakerConstants.MAX_COOLDOWN
+                )
+                self._open()
+
+            return
+
+        self._outcomes.append(success)
+
+        if len(self._outcomes) < CircuitBreakerConstants.MIN_REQUESTS:
+            return
+
+        error_rate = self._outcomes.count(False) / len(self._outcomes)
+
+        if error_rate >= CircuitBreakerConstants.ERROR_RATE_THRESHOLD:
+            self._open()
@@ -0,0 +1,104 @@
+from structlog import get_logger
+
+from common.constants import ConfigConstants
+
+
+class ConcurrencyTuner:
+    """Find the number of HTTP connections that maximizes the scraped
+    pages per second without raising the error rate.
+
+    The number of connections doubles after every batch as long as the
+    throughput keeps growing. Once it stops growing, or the error rate
+    rises above the lowest one seen, the tuner settles on the best
+    number of connections found so far.
+
+    The rate limits of the proxies cap the throughput whatever the
+    number of connections, so the search never goes beyond the number
+    that keeps the request slots busy, and stops once it reaches it.
+    """
+
+    def __init__(self, concurrency: int) -> None:
+        self.concurrency = concurrency
+        self.best_concurrency = concurrency
+        self.best_throughput = 0.0
+        # Connections beyond which the rate limits cap the throughput.
+        self.max_useful_concurrency: int | None = None
+        self._min_error_rate: float | None = None
+        self._climbing = True
+        self._logger = get_logger(__name__)
+
+    def record(
+        self,
+        pages: int,
+        errors: int,
+        elapsed: float,
+        max_useful_concurrency: int | None = None,
+    ) -> None:
+        """Record the results of a batch and pick the number of
+        connections for the next one.
+
+        :param pages: Number of requested pages.
+        :param errors: Number of pages that failed.
+        :param elapsed: Time the batch took in seconds.
+        :param max_useful_concurrency: Number of connections beyond
+            which the rate limits cap the throughput, None if there is
+            no such cap.
+        :return: None.
+        """
+        if not pages or elapsed <= 0:
+            return
+
+        self.max_useful_concurrency = max_useful_concurrency
+        max_concurrency = ConfigConstants.MAX_CONNECTIONS
+
+        if max_useful_concurrency is not None:
+            max_concurrency = max(
+                ConfigConstants.MIN_CONNECTIONS,
+                min(max_concurrency, max_useful_concurrency),
+            )
+
+        throughput = (pages - errors) / elapsed
+        error_rate = errors / pages
+
+        if self._min_error_rate is None:
+            self._min_error_rate = error_rate
+
+        max_error_rate = self._min_error_rate + (
+            ConfigConstants.ERROR_RATE_TOLERANCE
+        )
+        min_throughput = self.best_throughput * (
+            1 + ConfigConstants.MIN_THROUGHPUT_GAIN
+        )
+
+        if error_rate > max_error_rate:
+            self._climbing = False
+            self.concurrency = max(
+                ConfigConstants.MIN_CONNECTIONS,
+                min(self.best_concurrency, self.concurrency // 2),
+            )
+        elif throughput > min_throughput:
+            self.best_concurrency = self.concurrency
+            self.best_throughput = throughput
+
+            if self._climbing:
+                self.concurrency = min(max_concurrency, self.concurrency * 2)
+        else:
+            self._climbing = False
+            self.concurrency = self.best_concurrency
+
+        if self.concurrency >= max_concurrency:
+            # More connections would only wait for the request slots.
+            self._climbing = False
+            self.concurrency = max_concurrency
+            self.best_concurrency = min(self.best_concurrency, max_concurrency)
+
+        self._min_error_rate = min(self._min_error_rate, error_rate)
+
+        self._logger.info(
+            "Batch throughput measured",
+            pages=pages,
+            pages_per_second=round(throughput, 1),
+            error_rate=round(error_rate, 3),
+            next_connections=self.concurrency,
+            max_useful_connections=max_useful_concurrency,
+        )
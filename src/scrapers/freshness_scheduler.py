@@ -0,0 +1,165 @@
+import os
+from datetime import date
+
+import pandas as pd
+from structlog import get_logger
+
+from common.constants import BaseConstants, FreshnessConstants
+
+
+class FreshnessScheduler:
+    """Decide which books are due for re-scraping.
+
+    Every known book carries a refresh interval. The interval is halved
+    when the page content changed since the last fetch and doubled when
+    it did not, so stable pages are visited less and less often.
+    """
+
+    DTYPES = {
+        "book_url": "object",
+        "last_fetched": "datetime64[ns]",
+        "interval_days": "int64",
+        "fetches": "int64",
+        "changes": "int64",
+        "content_hash": "object",
+    }
+
+    def __init__(self) -> None:
+        self._filepath = BaseConstants.STATE_DIR.joinpath(
+            f"{FreshnessConstants.FILE_PREFIX}.parquet.gz"
+        )
+        self._today = date.fromisoformat(BaseConstants.CURRENT_DATE)
+        self._budget = FreshnessConstants.DAILY_BUDGET
+        self._logger = get_logger(__name__)
+        self._state = self._load_state()
+
+    def _load_state(self) -> pd.DataFrame:
+        """Load the freshness state of the previous runs.
+
+        :return: Dataframe indexed by the book URL.
+        """
+        if not self._filepath.exists():
+            state = pd.DataFrame(columns=list(self.DTYPES))
+        else:
+            state = pd.read_parquet(self._filepath, engine="pyarrow")
+
+        state = state.astype(self.DTYPES)
+
+        return state.set_index("book_url")
+
+    def _get_days_since_fetch(self, state: pd.DataFrame) -> pd.Series:
+        """Get the number of days since each book was fetched.
+
+        :param state: Freshness state of the books.
+        :return: Number of days per book.
+        """
+        today = pd.Timestamp(self._today)
+        days_since_fetch = (today - state["last_fetched"]).dt.days
+
+        return days_since_fetch
+
+    def select_urls(
+        self, popularity: pd.Series, is_new: pd.Series
+    ) -> list[str]:
+        """Select the books URLs to scrape within the daily budget.
+
+        New books go first, ordered by popularity. The remaining budget
+        goes to the books whose refresh interval has elapsed, ordered
+        by popularity and by how often their content changes.
+
+        :param popularity: Popularity of the books indexed by URL.
+        :param is_new: Whether the book has never been scraped before,
+            indexed by URL.
+        :return: List of URLs.
+        """
+        frontier = popularity.rename("popularity").to_frame()
+
+        new_books = frontier[is_new].sort_values(
+            by="popularity", ascending=False
+        )
+
+        known_books = frontier[~is_new].join(self._state, how="left")
+        days_since_fetch = self._get_days_since_fetch(state=known_books)
+        known_books = known_books[
+            known_books["last_fetched"].isna()
+            | (days_since_fetch >= known_books["interval_days"])
+        ].copy()
+
+        volatility = known_books["changes"] / known_books["fetches"].clip(
+            lower=1
+        )
+        known_books["priority"] = (
+            known_books["popularity"].rank(pct=True) + volatility
+        )
+        due_books = known_books.sort_values(by="priority", ascending=False)
+
+        urls = new_books.index.tolist() + due_books.index.tolist()
+        urls = urls[: self._budget]
+
+        self._logger.info(
+            "Selected the books to scrape",
+            selected=len(urls),
+            books=len(frontier),
+            new=len(new_books),
+            due=len(due_books),
+        )
+
+        return urls
+
+    def update(self, content_hashes: dict[str, str | None]) -> None:
+        """Update the freshness state with the fetched books.
+
+        :param content_hashes: Content hash of each fetched book
+            indexed by URL, None if the fetch failed.
+        :return: None.
+        """
+        fetched = pd.Series(content_hashes, name="content_hash", dtype=object)
+        fetched = fetched.dropna()
+
+        if fetched.empty:
+            return
+
+        previous = self._state.reindex(fetched.index)
+        is_new = previous["last_fetched"].isna()
+        changed = ~is_new & (previous["content_hash"] != fetched)
+
+        interval_days = previous["interval_days"].fillna(
+            FreshnessConstants.INITIAL_INTERVAL_DAYS
+        )
+        interval_days = interval_days.where(
+            changed | is_new, interval_days * 2
+        )
+        interval_days = interval_days.where(~changed, interval_days // 2)
+
+        updated = pd.DataFrame(
+            data={
+                "last_fetched": pd.Timestamp(self._today),
+                "interval_days": interval_days.clip(
+                    lower=FreshnessConstants.MIN_INTERVAL_DAYS,
+                    upper=FreshnessConstants.MAX_INTERVAL_DAYS,
+                ).astype(int),
+                "fetches": previous["fetches"].fillna(0).astype(int) + 1,
+                "changes": previous["changes"].fillna(0).astype(int)
+                + changed.astype(int),
+                "content_hash": fetched,
+            },
+            index=fetched.index,
+        )
+
+        state = self._state.drop(index=updated.index, errors="ignore")
+
+        if state.empty:
+            self._state = updated
+        else:
+            self._state = pd.concat([state, updated])
+
+    def save_state(self) -> None:
+        """Save the freshness state for the next runs.
+
+        :return: None.
+        """
+        os.makedirs(BaseConstants.STATE_DIR, exist_ok=True)
+
+        state = self._state.rename_axis("book_url").reset_index()
+
+        state.to_parquet(self._filepath, engine="pyarrow", compression="gzip")
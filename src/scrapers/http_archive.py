@@ -0,0 +1,173 @@
+import fcntl
+import mmap
+import os
+import struct
+from pathlib import Path
+
+from structlog import get_logger
+
+from common.codecs import decompress, get_codec
+from common.constants import ArchiveConstants, BaseConstants
+
+
+class HttpArchive:
+    """Archive of the responses of a crawl, which a later run can
+    replay without any network, e.g. to develop and benchmark the
+    parsers on the pages of a given date.
+
+    The archive is a single append-only file of records, each a header
+    with the status code and the lengths of the URL and of the body,
+    then the URL and the compressed body. The records are appended
+    under a file lock, so the scrape workers can record to the same
+    archive. On replay, the file is memory-mapped and the index of the
+    URLs is built by reading only the headers; a body is read straight
+    from the mapping when its URL is replayed. The last record of a URL
+    wins.
+    """
+
+    # Status code, length of the URL and length of the body.
+    HEADER = struct.Struct("<HII")
+
+    def __init__(self, mode: str, filepath: Path | None = None) -> None:
+        """Open an archive for recording or replaying.
+
+        :param mode: 'record' or 'replay'.
+        :param filepath: Path to the archive, the one of the run date
+            if not specified.
+        """
+        if mode not in (ArchiveConstants.RECORD, ArchiveConstants.REPLAY):
+            raise ValueError(f"Unknown archive mode '{mode}'")
+
+        self.mode = mode
+        self.filepath = filepath or self.get_filepath(
+            run_date=BaseConstants.CURRENT_DATE
+        )
+        self._codec = get_codec()
+        self._mmap: mmap.mmap | None = None
+        self._index: dict[str, tuple[int, int, int]] | None = None
+        self._logger = get_logger(__name__)
+
+        if mode == ArchiveConstants.REPLAY and not self.filepath.exists():
+            raise FileNotFoundError(
+                f"There is no archive to replay at '{self.filepath}'"
+            )
+
+    @classmethod
+    def from_config(cls) -> "HttpArchive | None":
+        """Open the archive of the run date in the configured mode.
+
+        :return: Archive, None if the responses are neither recorded
+            nor replayed.
+        """
+        if ArchiveConstants.MODE is None:
+            return None
+
+        return cls(mode=ArchiveConstants.MODE)
+
+    @staticmethod
+    def get_filepath(run_date: str) -> Path:
+        """Get a path to the archive of a date.
+
+        :param run_date: Date of the crawl.
+        :return: Path to the archive.
+        """
+        filepath = ArchiveConstants.DIR.joinpath(
+            f"{ArchiveConstants.FILE_PREFIX}_{run_date}.bin"
+        )
+
+        return filepath
+
+    def record(
+        self, url: str, status_code: int, html_data: bytes | None
+    ) -> None:
+        """Append the response of a URL to the archive. A failed
+        response is recorded by its status code only.
+
+        :param url: A URL of the source.
+        :param status_code: Status code of the response.
+        :param html_data: HTML data of the response, None if it failed.
+        :return: None.
+        """
+        url_data = url.encode()
+        body = b"" if html_data is None else self._codec.compress(html_data)
+        record = (
+            self.HEADER.pack(status_code, len(url_data), len(body))
+            + url_data
+            + body
+        )
+
+        os.makedirs(self.filepath.parent, exist_ok=True)
+
+        fd = os.open(self.filepath, os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            os.write(fd, record)
+        finally:
+            os.close(fd)
+
+    def _load_index(self) -> dict[str, tuple[int, int, int]]:
+        """Memory-map the archive and index its records by URL.
+
+        :return: Status code, offset and length of the body of each
+            URL.
+        """
+        if self._index is not None:
+            return self._index
+
+        self._index = {}
+
+        if not self.filepath.stat().st_size:
+            return self._index
+
+        with open(self.filepath, mode="rb") as f:
+            self._mmap = mmap.mmap(
+                f.fileno(), length=0, access=mmap.ACCESS_READ
+            )
+
+        offset = 0
+
+        while offset + self.HEADER.size <= len(self._mmap):
+            status_code, url_length, body_length = self.HEADER.unpack_from(
+                self._mmap, offset
+            )
+            offset += self.HEADER.size
+            url = self._mmap[offset : offset + url_length].decode()
+            offset += url_length
+
+            if offset + body_length > len(self._mmap):
+                # A record cut short, e.g. by a killed run.
+                break
+
+            self._index[url] = (status_code, offset, body_length)
+            offset += body_length
+
+        self._logger.info(
+            "Loaded the responses from the archive",
+            responses=len(self._index),
+            archive=self.filepath.name,
+        )
+
+        return self._index
+
+    def replay(self, url: str) -> tuple[int, bytes | None] | None:
+        """Get the recorded response of a URL.
+
+        :param url: A URL of the source.
+        :return: Status code and HTML data of the response, the data
+            is None if it failed. None if the URL was not recorded.
+        """
+        response = self._load_index().get(url)
+
+        if response is None:
+            return None
+
+        status_code, offset, body_length = response
+
+        if not body_length:
+            return status_code, None
+
+        with memoryview(self._mmap) as view:
+            html_data = decompress(view[offset : offset + body_length])
+
+        return status_code, html_data
@@ -0,0 +1,246 @@
+import re
+import time
+from collections.abc import Iterable, Iterator
+from functools import partial
+
+from scrapers.base_scraper import BaseScraper, PageInspector
+from scrapers.priority_frontier import PriorityFrontier
+
+
+class PaginatedScraper(BaseScraper):
+    """Scrape paginated sources without guessing their size.
+
+    The first page of each source is scraped on its own to read the
+    actual last page from its pagination control. A source whose first
+    page failed even after the retries is scraped up to the configured
+    number of pages. The remaining pages are popped lazily from a
+    priority frontier, and a source is dropped as soon as one of its
+    pages comes back without any rows. The pages are inspected once
+    their batch is scraped, so a source is only dropped from the next
+    batches, i.e. never for the pages of a single batch.
+    """
+
+    PAGINATION_PATTERN = re.compile(
+        rb'<div[^>]*class="pagination"[^>]*>(.*?)</div>', flags=re.DOTALL
+    )
+    PAGE_PATTERN = re.compile(rb"[?&]page=(\d+)")
+
+    def __init__(self, row_marker: bytes) -> None:
+        super().__init__()
+        self._row_marker = row_marker
+        self._last_pages: dict[str, int] = {}
+        self._exhausted_urls: set[str] = set()
+
+    @staticmethod
+    def _split_page_url(url: str) -> tuple[str, int]:
+        """Split a page URL into the source URL and the page number.
+
+        :param url: A URL of the page.
+        :return: Source URL and page number.
+        """
+        source_url, page = url.rsplit("?page=", maxsplit=1)
+
+        return source_url, int(page)
+
+    @classmethod
+    def _get_last_page(cls, html_data: bytes, max_pages: int) -> int:
+        """Get the last page number from the pagination control.
+
+        :param html_data: HTML data of the first page.
+        :param max_pages: Maximum of pages.
+        :return: Last page number, capped by the maximum of pages.
+        """
+        pagination = cls.PAGINATION_PATTERN.search(html_data)
+
+        if pagination is None:
+            return 1
+
+        pages = [
+            int(page) for page in cls.PAGE_PATTERN.findall(pagination.group(1))
+        ]
+        last_page = max(pages, default=1)
+
+        return min(last_page, max_pages)
+
+    @classmethod
+    def _inspect_page(
+        cls,
+        url: str,
+        html_data: bytes | None,
+        *,
+        row_marker: bytes,
+        max_pages: int,
+    ) -> int | None:
+        """Read the pagination of a first page, or tell that a page ran
+        out of rows.
+
+        :param url: A URL of the page.
+        :param html_data: HTML data of the page.
+        :param row_marker: Bytes every page with rows contains.
+        :param max_pages: Maximum of pages.
+        :return: Last page number of the source for a first page, 0 for
+            a page without rows, None otherwise.
+        """
+        if html_data is None:
+            return None
+
+        _, page = cls._split_page_url(url=url)
+
+        if row_marker not in html_data:
+            return 0
+
+        if page == 1:
+            return cls._get_last_page(html_data=html_data, max_pages=max_pages)
+
+        return None
+
+    def _get_page_inspector(self) -> PageInspector:
+        return partial(
+            self._inspect_page,
+            row_marker=self._row_marker,
+            max_pages=self._pages,
+        )
+
+    def _process_page(self, url: str, page_info: int | None) -> None:
+        """Keep the pagination of the first pages and mark the sources
+        whose pages ran out of rows.
+
+        :param url: A URL of the page.
+        :param page_info: Inspection of the page.
+        :return: None.
+        """
+        if page_info is None:
+            return
+
+        source_url, _ = self._split_page_url(url=url)
+
+        if page_info == 0:
+            self._exhausted_urls.add(source_url)
+        else:
+            self._last_pages[source_url] = page_info
+
+    def _get_pages_frontier(
+        self, sources: dict[str, float]
+    ) -> PriorityFrontier:
+        """Get a frontier of the pages after the first one. Earlier
+        pages of the more valuable sources go first.
+
+        :param sources: Priority of each paginated source by its URL.
+        :return: Frontier of the pages.
+        """
+        frontier = PriorityFrontier()
+
+        for source_url, priority in sources.items():
+            if source_url in self._exhausted_urls:
+                continue
+
+            last_page = self._last_pages.get(source_url)
+
+            if last_page is None:
+                last_page = self._pages
+
+                self._logger.warning(
+                    "No pagination of a failed first page, scraping the "
+                    "configured number of pages",
+                    source_url=source_url,
+                    pages=last_page,
+                )
+
+            for page in range(2, last_page + 1):
+                frontier.push(
+                    url=f"{source_url}?page={page}", priority=priority / page
+                )
+
+        return frontier
+
+    def _pop_pages_urls(self, frontier: PriorityFrontier) -> Iterator[str]:
+        """Lazily pop the pages URLs, skipping the sources that ran out
+        of rows in the meantime.
+
+        :param frontier: Frontier of the pages.
+        :return: Iterator over URLs.
+        """
+        for url in frontier.pop_urls():
+            source_url, _ = self._split_page_url(url=url)
+
+            if source_url in self._exhausted_urls:
+                continue
+
+            yield url
+
+    async def _save_batches(
+        self, urls: Iterable[str], *, batch: int, file_prefix: str
+    ) -> int:
+        """Save the retrieved data batch by batch.
+
+        :param urls: URLs to scrape.
+        :param batch: Number of the first batch.
+        :param file_prefix: Prefix of the file.
+        :return: Number of the next batch.
+        """
+        for urls_batch in self._group_urls(urls=urls, file_prefix=file_prefix):
+            start = time.perf_counter()
+            self._logger.info(
+                "Scraping batch has been started",
+                file_prefix=file_prefix,
+                batch=batch,
+                items=len(urls_batch),
+            )
+
+            await self.save_data(
+                urls=urls_batch, batch=batch, file_prefix=file_prefix
+            )
+
+            end = time.perf_counter()
+            self._logger.info(
+                "Scraping batch finished",
+                file_prefix=file_prefix,
+                batch=batch,
+                seconds=round(end - start, 3),
+            )
+
+            batch += 1
+
+        return batch
+
+    async def save_paginated_data(
+        self, sources: dict[str, float], *, file_prefix: str
+    ) -> None:
+        """Save the HTML data from all pages of the paginated sources,
+        the most valuable ones first.
+
+        :param sources: Priority of each paginated source by its URL.
+        :param file_prefix: Prefix of the file.
+        :return: None.
+        """
+        self._begin_deadline(file_prefix=file_prefix)
+
+        first_pages_frontier = PriorityFrontier()
+
+        for source_url, priority in sources.items():
+            first_pages_frontier.push(
+                url=f"{source_url}?page=1", priority=priority
+            )
+
+        batch = await self._save_batches(
+            urls=first_pages_frontier.pop_urls(),
+            batch=1,
+            file_prefix=file_prefix,
+        )
+
+        pages_frontier = self._get_pages_frontier(sources=sources)
+
+        await self._save_batches(
+            urls=self._pop_pages_urls(frontier=pages_frontier),
+            batch=batch,
+            file_prefix=file_prefix,
+        )
+
+        total_pages = sum(self._last_pages.values())
+        self._logger.info(
+            "Scraping the paginated sources finished",
+            file_prefix=file_prefix,
+            pages=total_pages,
+            sources=len(sources),
+            ended_early=len(self._exhausted_urls),
+        )
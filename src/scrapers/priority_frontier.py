@@ -0,0 +1,44 @@
+import heapq
+from collections.abc import Iterator
+from itertools import count
+
+
+class PriorityFrontier:
+    """Crawl frontier that hands out the most valuable URLs first.
+
+    URLs are kept in a heap ordered by their priority, ties are broken
+    by insertion order. A URL is only accepted once, so a partial run
+    still covers the top of the frontier without repeating itself.
+    """
+
+    def __init__(self) -> None:
+        self._heap: list[tuple[float, int, str]] = []
+        self._counter = count()
+        self._seen_urls: set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, url: str, priority: float) -> None:
+        """Add a URL to the frontier.
+
+        :param url: A URL to scrape.
+        :param priority: Priority of the URL, the higher the sooner.
+        :return: None.
+        """
+        if url in self._seen_urls:
+            return
+
+        self._seen_urls.add(url)
+
+        heapq.heappush(self._heap, (-priority, next(self._counter), url))
+
+    def pop_urls(self) -> Iterator[str]:
+        """Lazily pop the URLs in the order of their priority.
+
+        :return: Iterator over URLs.
+        """
+        while self._heap:
+            _, _, url = heapq.heappop(self._heap)
+
+            yield url
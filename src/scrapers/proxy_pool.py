@@ -0,0 +1,289 @@
+import asyncio
+import math
+import time
+from collections.abc import AsyncIterator, MutableSequence
+from contextlib import AsyncExitStack, asynccontextmanager, nullcontext
+from typing import Any
+
+from httpx import AsyncClient, Limits
+
+from common.constants import BaseConstants, ProxyConstants
+
+
+class Proxy:
+    """Egress endpoint of the requests, either a proxy or the direct
+    connection, with its own rate limit, concurrency cap and health.
+    """
+
+    def __init__(
+        self,
+        url: str | None = None,
+        max_connections: int | None = None,
+        request_delay: float | None = None,
+    ) -> None:
+        """Create an egress endpoint.
+
+        :param url: URL of the proxy, None for the direct connection.
+        :param max_connections: Maximum number of concurrent requests,
+            the pool-wide number if not specified.
+        :param request_delay: Delay in seconds between starting two
+            requests, the pool-wide delay if not specified.
+        """
+        self.url = url
+        self.name = url or "direct"
+        self.client: AsyncClient | None = None
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.latency = ProxyConstants.INITIAL_LATENCY
+        self.error_rate = 0.0
+        self._max_connections = max_connections
+        self._request_delay = request_delay
+        # Start time of the next request slot, kept in a sequence that
+        # may be shared with other processes.
+        self._schedule: MutableSequence[float] = [0.0]
+        self._slot = 0
+        self._schedule_lock = nullcontext()
+        self.max_connections = max_connections or BaseConstants.MAX_CONNECTIONS
+        self.request_delay = (
+            BaseConstants.REQUEST_DELAY
+            if request_delay is None
+            else request_delay
+        )
+
+    def configure(self, max_connections: int, request_delay: float) -> None:
+        """Set the limits the proxy does not override.
+
+        :param max_connections: Maximum number of concurrent requests.
+        :param request_delay: Delay in seconds between two requests.
+        :return: None.
+        """
+        self.max_connections = self._max_connections or max_connections
+
+        if self._request_delay is None:
+            self.request_delay = request_delay
+
+    def share_schedule(
+        self, schedule: MutableSequence[float], slot: int
+    ) -> None:
+        """Keep the request slots in a shared array, so the processes
+        sending requests through the proxy keep to one rate limit.
+
+        :param schedule: Shared array, e.g. 'multiprocessing.Array'.
+        :param slot: Index of the proxy in the array.
+        :return: None.
+        """
+        self._schedule = schedule
+        self._slot = slot
+        self._schedule_lock = schedule.get_lock()
+
+    def get_score(self, now: float) -> float:
+        """Get the expected time until a request through the proxy
+        completes, the lower the better. Errors make the proxy look
+        slower than it is.
+
+        :param now: Current time.
+        :return: Score of the proxy.
+        """
+        wait = max(0.0, self._schedule[self._slot] - now)
+        penalty = 1 + ProxyConstants.ERROR_PENALTY * self.error_rate
+
+        return wait + self.latency * penalty
+
+    def reserve(self, now: float) -> float:
+        """Reserve a request slot of the proxy.
+
+        :param now: Current time.
+        :return: Delay in seconds until the request may start.
+        """
+        with self._schedule_lock:
+            start_at = max(now, self._schedule[self._slot])
+
+            self._schedule[self._slot] = start_at + self.request_delay
+
+        self.in_flight += 1
+        self.requests += 1
+
+        return start_at - now
+
+    def record(self, success: bool, latency: float) -> None:
+        """Record the outcome of a request through the proxy.
+
+        :param success: Whether the request succeeded.
+        :param latency: Time the request took in seconds.
+        :return: None.
+        """
+        alpha = ProxyConstants.SMOOTHING
+
+        self.in_flight -= 1
+        self.errors += not success
+        self.error_rate = (1 - alpha) * self.error_rate + alpha * (not success)
+
+        if success:
+            self.latency = (1 - alpha) * self.latency + alpha * latency
+
+
+class ProxyPool:
+    """Pool of egress endpoints. Each request goes through the proxy
+    expected to complete it first, among the ones under their
+    concurrency cap, so the healthiest proxies get the most traffic.
+    """
+
+    def __init__(self, proxies: list[Proxy]) -> None:
+        self.proxies = proxies
+        self._available: asyncio.Condition | None = None
+
+    @classmethod
+    def from_config(cls) -> "ProxyPool":
+        """Create a pool from the configured proxies, or with the
+        direct connection only if there are none.
+
+        :return: Proxy pool.
+        """
+        proxies = []
+
+        for spec in ProxyConstants.PROXIES or [None]:
+            if isinstance(spec, dict):
+                proxies.append(Proxy(**spec))
+            else:
+                proxies.append(Proxy(url=spec))
+
+        return cls(proxies=proxies)
+
+    def share_schedule(self, schedule: MutableSequence[float]) -> None:
+        """Keep the request slots of the proxies in a shared array, one
+        item per proxy, so several processes keep to one rate budget.
+        The monotonic clock is the same for all the processes.
+
+        :param schedule: Shared array, e.g. 'multiprocessing.Array'.
+        :return: None.
+        """
+        for slot, proxy in enumerate(self.proxies):
+            proxy.share_schedule(schedule=schedule, slot=slot)
+
+    @asynccontextmanager
+    async def open(self, max_connections: int) -> AsyncIterator[None]:
+        """Open an HTTP client for each proxy.
+
+        :param max_connections: Maximum number of concurrent requests
+            per proxy that does not set its own.
+        :return: None.
+        """
+        self._available = asyncio.Condition()
+
+        async with AsyncExitStack() as stack:
+            for proxy in self.proxies:
+                proxy.configure(
+                    max_connections=max_connections,
+                    request_delay=BaseConstants.REQUEST_DELAY,
+                )
+                limits = Limits(
+                    max_connections=proxy.max_connections,
+                    max_keepalive_connections=min(
+                        proxy.max_connections,
+                        BaseConstants.MAX_KEEPALIVE_CONNECTIONS,
+                    ),
+                )
+                proxy.client = await stack.enter_async_context(
+                    AsyncClient(limits=limits, proxy=proxy.url)
+                )
+
+            yield
+
+            for proxy in self.proxies:
+                proxy.client = None
+
+    async def acquire(self) -> Proxy:
+        """Wait for the best proxy with a free connection and for its
+        rate limit.
+
+        :return: Proxy to send the request through.
+        """
+        async with self._available:
+            while True:
+                now = time.monotonic()
+                free_proxies = [
+                    proxy
+                    for proxy in self.proxies
+                    if proxy.in_flight < proxy.max_connections
+                ]
+
+                if free_proxies:
+                    break
+
+                await self._available.wait()
+
+            proxy = min(free_proxies, key=lambda item: item.get_score(now))
+            delay = proxy.reserve(now=now)
+
+        await asyncio.sleep(delay=delay)
+
+        return proxy
+
+    async def release(
+        self, proxy: Proxy, success: bool, latency: float
+    ) -> None:
+        """Give the proxy back to the pool.
+
+        :param proxy: Proxy the request went through.
+        :param success: Whether the request succeeded.
+        :param latency: Time the request took in seconds.
+        :return: None.
+        """
+        async with self._available:
+            proxy.record(success=success, latency=latency)
+
+            self._available.notify()
+
+    async def cancel(self, proxy: Proxy) -> None:
+        """Give the proxy back to the pool without sending the request,
+        leaving its health as it is.
+
+        :param proxy: Proxy the request was to go through.
+        :return: None.
+        """
+        async with self._available:
+            proxy.in_flight -= 1
+            proxy.requests -= 1
+
+            self._available.notify()
+
+    def get_max_useful_connections(
+        self, latencies: dict[str, float]
+    ) -> int | None:
+        """Get the number of connections per proxy beyond which the
+        rate limits cap the throughput. A proxy starts a request every
+        'request_delay' seconds and each takes 'latency' seconds, so at
+        most 'latency / request_delay' requests are ever in flight.
+
+        :param latencies: Measured latency in seconds by the proxy
+            name, the running estimate of a proxy if missing.
+        :return: Number of connections, None if a proxy has no rate
+            limit.
+        """
+        max_connections = []
+
+        for proxy in self.proxies:
+            if proxy.request_delay <= 0:
+                return None
+
+            latency = latencies.get(proxy.name, proxy.latency)
+            max_connections.append(math.ceil(latency / proxy.request_delay))
+
+        return max(max_connections)
+
+    def get_stats(self) -> dict[str, dict[str, Any]]:
+        """Get the traffic and health of each proxy.
+
+        :return: Statistics by the proxy name.
+        """
+        stats = {
+            proxy.name: {
+                "requests": proxy.requests,
+                "errors": proxy.errors,
+                "latency": round(proxy.latency, 3),
+            }
+            for proxy in self.proxies
+        }
+
+        return stats
@@ -0,0 +1,43 @@
+import json
+import unittest
+
+import pandas as pd
+import pyarrow as pa
+
+from parsers.book_details_parser import BookDetailsParser
+
+
+class FlattenEntityTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.parser = BookDetailsParser()
+
+    def test_lists_are_json_in_every_row(self) -> None:
+        works = [
+            {"details": {"awardsWon": [], "places": ["Paris"]}},
+            {
+                "details": {
+                    "awardsWon": [{"name": "Hugo Award"}],
+                    "places": [],
+                }
+            },
+        ]
+
+        rows = [self.parser.flatten_entity(entity=work) for work in works]
+        table = pa.Table.from_pandas(pd.DataFrame(rows))
+
+        self.assertEqual(
+            table.schema.field("details_awards_won").type, "string"
+        )
+        self.assertEqual(table.schema.field("details_places").type, "string")
+        self.assertEqual(
+            [json.loads(row["details_awards_won"]) for row in rows],
+            [[], [{"name": "Hugo Award"}]],
+        )
+        self.assertEqual(
+            [json.loads(row["details_places"]) for row in rows],
+            [["Paris"], []],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,191 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from common.constants import BaseConstants, DatasetConstants, IndexConstants
+from common.dataset_lookup import DatasetLookup
+from common.parquet_dataset import ParquetDataset
+from uploader.s3_stream import S3MultipartWriter
+from uploader.uploader import Uploader
+
+try:
+    from moto import mock_aws
+except ImportError:
+    mock_aws = None
+
+BUCKET = "test-bucket"
+# The smallest part S3 accepts for all parts but the last one.
+PART_SIZE = 5 * 1024 * 1024
+
+
+@unittest.skipIf(mock_aws is None, "requires the 'moto' package")
+class S3TestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        env = mock.patch.dict(
+            os.environ,
+            {
+                "AWS_ACCESS_KEY_ID": "testing",
+                "AWS_SECRET_ACCESS_KEY": "testing",
+                "AWS_DEFAULT_REGION": "us-east-1",
+            },
+        )
+        env.start()
+        self.addCleanup(env.stop)
+
+        aws = mock_aws()
+        aws.start()
+        self.addCleanup(aws.stop)
+
+        bucket = mock.patch.object(BaseConstants, "S3_BUCKET", BUCKET)
+        bucket.start()
+        self.addCleanup(bucket.stop)
+
+        self.uploader = Uploader()
+        self.client = self.uploader._init_client()
+        self.client.create_bucket(Bucket=BUCKET)
+
+    def get_object(self, key: str) -> dict:
+        return self.client.get_object(Bucket=BUCKET, Key=key)
+
+
+class S3MultipartWriterTest(S3TestCase):
+    def test_small_file_is_put_as_single_object(self) -> None:
+        with S3MultipartWriter(
+            client=self.client, bucket=BUCKET, key="small", part_size=PART_SIZE
+        ) as f:
+            f.write(b"data")
+
+        response = self.get_object(key="small")
+
+        self.assertEqual(response["Body"].read(), b"data")
+        self.assertNotIn("-", response["ETag"])
+
+    def test_large_file_is_uploaded_in_parts(self) -> None:
+        data = os.urandom(2 * PART_SIZE + 1024)
+
+        with S3MultipartWriter(
+            client=self.client, bucket=BUCKET, key="large", part_size=PART_SIZE
+        ) as f:
+            for offset in range(0, len(data), 1024 * 1024):
+                f.write(data[offset : offset + 1024 * 1024])
+
+        response = self.get_object(key="large")
+
+        self.assertEqual(response["Body"].read(), data)
+        self.assertTrue(response["ETag"].strip('"').endswith("-3"))
+
+    def test_failed_write_aborts_upload(self) -> None:
+        with self.assertRaises(RuntimeError):
+            with S3MultipartWriter(
+                client=self.client,
+                bucket=BUCKET,
+                key="failed",
+                part_size=PART_SIZE,
+            ) as f:
+                f.write(os.urandom(PART_SIZE + 1024))
+                raise RuntimeError
+
+        uploads = self.client.list_multipart_uploads(Bucket=BUCKET)
+
+        self.assertNotIn("Uploads", uploads)
+        self.assertNotIn(
+            "Contents", self.client.list_objects_v2(Bucket=BUCKET)
+        )
+
+
+class StreamTest(S3TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.data_dir = Path(tmp_dir.name)
+
+        for target, name, value in (
+            (BaseConstants, "DATA_DIR", self.data_dir),
+            (DatasetConstants, "MAX_ROWS_PER_FILE", 250),
+            (IndexConstants, "ROW_GROUP_SIZE", 100),
+        ):
+            patcher = mock.patch.object(target, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.dataset = ParquetDataset(
+            name="books", base_dir=self.data_dir.joinpath("processed")
+        )
+        self.df = pd.DataFrame(
+            {
+                "book_url": [f"/book/{i}" for i in range(600)],
+                "title": [f"Title {i}" for i in range(600)],
+            }
+        )
+
+    def download(self, file_keys: list[str]) -> None:
+        for file_key in file_keys:
+            filepath = self.data_dir.joinpath(file_key)
+            os.makedirs(filepath.parent, exist_ok=True)
+            filepath.write_bytes(self.get_object(key=file_key)["Body"].read())
+
+    def test_partition_is_streamed_with_index(self) -> None:
+        file_keys = self.dataset.stream(
+            df=self.df,
+            open_file=self.uploader.open_stream,
+            partition_date="2025-01-31",
+            index_column="book_url",
+        )
+        index_key = (
+            f"processed/books/date=2025-01-31/{IndexConstants.FILENAME}"
+        )
+
+        self.assertEqual(
+            file_keys,
+            [
+                f"processed/books/date=2025-01-31/part-0000{i}.parquet"
+                for i in range(3)
+            ],
+        )
+
+        self.download(file_keys=[*file_keys, index_key])
+
+        self.assertEqual(
+            [
+                pq.ParquetFile(self.data_dir.joinpath(file_key)).num_row_groups
+                for file_key in file_keys
+            ],
+            [3, 3, 1],
+        )
+        pd.testing.assert_frame_equal(
+            self.dataset.read(start_date="2025-01-31")[self.df.columns],
+            self.df,
+        )
+
+        lookup = DatasetLookup(
+            name="books",
+            partition_date="2025-01-31",
+            base_dir=self.data_dir.joinpath("processed"),
+        )
+
+        self.assertEqual(lookup.index.column, "book_url")
+        self.assertEqual(len(lookup.index), len(self.df))
+        self.assertEqual(lookup.get(key="/book/420")["title"], "Title 420")
+
+    def test_empty_partition_is_streamed(self) -> None:
+        file_keys = self.dataset.stream(
+            df=self.df.iloc[:0],
+            open_file=self.uploader.open_stream,
+            partition_date="2025-01-31",
+        )
+
+        self.download(file_keys=file_keys)
+
+        self.assertEqual(len(file_keys), 1)
+        self.assertTrue(self.dataset.read(start_date="2025-01-31").empty)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+import io
+from typing import TYPE_CHECKING
+
+from common.constants import DatasetConstants
+
+if TYPE_CHECKING:
+    from botocore.client import BaseClient
+
+
+class S3MultipartWriter(io.RawIOBase):
+    """Writable file that streams its content to an S3 object.
+
+    The written bytes are buffered until they fill a part, which is
+    then uploaded as a part of a multipart upload, so at most one part
+    is held in memory and nothing is written to the local disk. The
+    object appears only once the file is closed; a file closed due to
+    an exception aborts the upload instead.
+    """
+
+    def __init__(
+        self,
+        client: "BaseClient",
+        bucket: str,
+        key: str,
+        part_size: int = DatasetConstants.S3_PART_SIZE,
+    ) -> None:
+        super().__init__()
+        self.key = key
+        self._client = client
+        self._bucket = bucket
+        self._part_size = part_size
+        self._buffer = bytearray()
+        self._position = 0
+        self._upload_id: str | None = None
+        self._parts: list[dict] = []
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is not None:
+            self.abort()
+
+        super().__exit__(exc_type, exc_value, traceback)
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def write(self, data: bytes | memoryview) -> int:
+        """Buffer the data and upload the full parts.
+
+        :param data: Data to write.
+        :return: Number of the written bytes.
+        """
+        if self.closed:
+            raise ValueError("I/O operation on closed file")
+
+        self._buffer += data
+        self._position += len(data)
+
+        while len(self._buffer) >= self._part_size:
+            self._upload_part(data=self._buffer[: self._part_size])
+            del self._buffer[: self._part_size]
+
+        return len(data)
+
+    def _upload_part(self, data: bytearray) -> None:
+        """Upload a part, starting the multipart upload if needed.
+
+        :param data: Content of the part.
+        :return: None.
+        """
+        if self._upload_id is None:
+            response = self._client.create_multipart_upload(
+                Bucket=self._bucket, Key=self.key
+            )
+            self._upload_id = response["UploadId"]
+
+        part_number = len(self._parts) + 1
+
+        response = self._client.upload_part(
+            Bucket=self._bucket,
+            Key=self.key,
+            UploadId=self._upload_id,
+            PartNumber=part_number,
+            Body=bytes(data),
+        )
+
+        self._parts.append(
+            {"ETag": response["ETag"], "PartNumber": part_number}
+        )
+
+    def close(self) -> None:
+        """Upload the rest of the data and complete the object. Data
+        smaller than a part is uploaded as a single object.
+
+        :return: None.
+        """
+        if self.closed:
+            return
+
+        try:
+            if self._upload_id is None:
+                self._client.put_object(
+                    Bucket=self._bucket, Key=self.key, Body=bytes(self._buffer)
+                )
+            else:
+                if self._buffer:
+                    self._upload_part(data=self._buffer)
+
+                self._client.complete_multipart_upload(
+                    Bucket=self._bucket,
+                    Key=self.key,
+                    UploadId=self._upload_id,
+                    MultipartUpload={"Parts": self._parts},
+                )
+        except Exception:
+            self.abort()
+            raise
+        finally:
+            self._buffer.clear()
+            super().close()
+
+    def abort(self) -> None:
+        """Discard the written data and the uploaded parts.
+
+        :return: None.
+        """
+        if self._upload_id is not None:
+            self._client.abort_multipart_upload(
+                Bucket=self._bucket, Key=self.key, UploadId=self._upload_id
+            )
+
+        self._upload_id = None
+        self._buffer.clear()
+
+        if not self.closed:
+            super().close()
@@ -2,12 +2,15 @@ import os
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-import boto3
-from botocore.client import BaseClient
 from structlog import get_logger
 
 from common.constants import BaseConstants
+from uploader.s3_stream import S3MultipartWriter
+
+if TYPE_CHECKING:
+    from botocore.client import BaseClient
 
 
 class Uploader:
@@ -16,12 +19,17 @@ class Uploader:
         self._bucket = BaseConstants.S3_BUCKET
         self._logger = get_logger(__name__)
 
-    def _init_client(self) -> BaseClient:
-        """Initialize an S3 client.
+    def _init_client(self) -> "BaseClient":
+        """Initialize an S3 client. boto3 is imported here, since it
+        takes a while to load and is not needed until the first upload.
 
         :return: S3 client.
         """
-        s3_client = boto3.client(self._client_name)
+        import boto3
+
+        s3_client = boto3.client(
+            self._client_name, endpoint_url=BaseConstants.S3_ENDPOINT_URL
+        )
 
         return s3_client
 
@@ -43,10 +51,9 @@ class Uploader:
 
             filepath = base_dir.joinpath(filename)
 
-            s3_inner_dir = filepath.parent
-            s3_dir = s3_inner_dir.parent
-
-            file_key = f"{s3_dir.name}/{s3_inner_dir.name}/{filename}"
+            # Mirror the layout of the data directory, e.g.
+            # 'processed/books/date=2025-01-31/part-00000.parquet'.
+            file_key = filepath.relative_to(BaseConstants.DATA_DIR).as_posix()
 
             file_keys.append({"filepath": filepath, "file_key": file_key})
 
@@ -68,6 +75,41 @@ class Uploader:
             Filename=filepath, Bucket=self._bucket, Key=file_key
         )
 
+    def open_stream(self, file_key: str) -> S3MultipartWriter:
+        """Open a file that streams its content to an S3 object.
+
+        :param file_key: S3 key of the object.
+        :return: Writable file.
+        """
+        s3_writer = S3MultipartWriter(
+            client=self._init_client(), bucket=self._bucket, key=file_key
+        )
+
+        return s3_writer
+
+    def download_file(self, obj: dict[str, str]) -> None:
+        """Download a file from an S3 bucket if it exists.
+
+        :param obj: An object that contains a path
+            to the file and an S3 key.
+        :return: None.
+        """
+        from botocore.exceptions import ClientError
+
+        s3_client = self._init_client()
+
+        filepath = obj.get("filepath")
+        file_key = obj.get("file_key")
+
+        try:
+            s3_client.download_file(
+                Bucket=self._bucket, Key=file_key, Filename=filepath
+            )
+        except ClientError as exc:
+            self._logger.info(
+                "Skipped downloading a file", file_key=file_key, error=exc
+            )
+
     def upload_files(self, file_keys: list[dict]) -> None:
         """Upload multiple files to an S3 bucket.
 
@@ -76,8 +118,9 @@ class Uploader:
         """
         start = time.perf_counter()
         self._logger.info(
-            f"Uploading '{len(file_keys)}' files to '{self._bucket}' "
-            f"bucket have been started"
+            "Uploading files has been started",
+            files=len(file_keys),
+            bucket=self._bucket,
         )
 
         with ThreadPoolExecutor(
@@ -97,9 +140,14 @@ class Uploader:
                     future.result()
                 except Exception as exc:
                     self._logger.error(
-                        f"An exception occurred while uploading '{filename}'"
-                        f"due to '{exc}'"
+                        "An exception occurred while uploading a file",
+                        filename=filename,
+                        error=exc,
                     )
 
         end = time.perf_counter()
-        self._logger.info(f"Uploading files took {end - start:.3f} seconds")
+        self._logger.info(
+            "Uploading files finished",
+            files=len(file_keys),
+            seconds=round(end - start, 3),
+        )